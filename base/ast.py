@@ -1,2 +1,2 @@
 class AST(object):
-	pass
+	__slots__ = ('_num',)	# _num is set by generateAstDots.py
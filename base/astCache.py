@@ -0,0 +1,114 @@
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+
+from base.version import INTERPRETER_VERSION
+
+CACHE_DIR = '__swarmcache__'
+MAGIC = b'SWARMAST'
+
+# Packages whose classes are pickled with the AST: nodes, tokens and symbols.
+FRONT_END_PACKAGES = ('base', 'lexer', 'parser', 'semanticAnalyzer')
+
+
+def _sources_digest(packages):
+	"""Hash the sources of packages, so that editing a node or symbol class evicts old entries."""
+	project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	digest = hashlib.sha256()
+	for package in packages:
+		package_dir = os.path.join(project_root, package)
+		for file_name in sorted(os.listdir(package_dir)):
+			if file_name.endswith('.py'):
+				with open(os.path.join(package_dir, file_name), 'rb') as f:
+					digest.update(f.read())
+	return digest.hexdigest()
+
+
+class ASTCache(object):
+	"""On-disk cache of analyzed ASTs, similar to __pycache__.
+
+	The AST of `source_path` is stored in a __swarmcache__ directory next
+	to it, after the SemanticAnalyzer has bound the symbols of its nodes.
+	An entry is keyed by the hash of the source text and the interpreter
+	version; stale or corrupt entries are deleted when they are found.
+	"""
+	suffix = 'pickle'
+	packages = FRONT_END_PACKAGES
+
+	def __init__(self, source_path):
+		source_dir, source_name = os.path.split(os.path.abspath(source_path))
+		self.cache_dir = os.path.join(source_dir, CACHE_DIR)
+		self.path = os.path.join(self.cache_dir, f'{source_name}.{sys.implementation.cache_tag}.{self.suffix}')
+		self._version = None
+
+	@property
+	def version(self):
+		if self._version is None:
+			self._version = f'{INTERPRETER_VERSION}:{sys.implementation.cache_tag}:{_sources_digest(self.packages)}'
+		return self._version
+
+	def dump(self, tree, f):
+		pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+	def read(self, f):
+		return pickle.load(f)
+
+	def key(self, text):
+		digest = hashlib.sha256()
+		digest.update(self.version.encode('utf-8'))
+		digest.update(b'\0')
+		digest.update(text.encode('utf-8'))
+		return digest.hexdigest().encode('ascii')
+
+	def load(self, text):
+		"""Return the cached AST of `text`, or None on a miss."""
+		try:
+			with open(self.path, 'rb') as f:
+				header = f.readline().rstrip(b'\n')
+				if header != MAGIC + self.key(text):
+					self.evict()	# stale entry, the source or the interpreter has changed
+					return None
+				return self.read(f)
+		except FileNotFoundError:
+			return None
+		except Exception:
+			self.evict()	# corrupt entry
+			return None
+
+	def store(self, text, tree):
+		"""Write the analyzed AST of `text`, replacing any previous entry."""
+		try:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+			try:
+				with os.fdopen(fd, 'wb') as f:
+					f.write(MAGIC + self.key(text) + b'\n')
+					self.dump(tree, f)
+				os.replace(tmp_path, self.path)
+			except BaseException:
+				os.unlink(tmp_path)
+				raise
+		except (OSError, pickle.PicklingError, RecursionError, ValueError):
+			# the cache is an optimization, a read-only source directory is fine
+			pass
+
+	def evict(self):
+		try:
+			os.unlink(self.path)
+		except OSError:
+			pass
+
+
+class CodeCache(ASTCache):
+	"""On-disk cache of the Python code object generated for an analyzed AST."""
+	suffix = 'code'
+	packages = FRONT_END_PACKAGES + ('interpreter',)
+
+	def dump(self, code, f):
+		marshal.dump(code, f)
+
+	def read(self, f):
+		return marshal.load(f)
@@ -9,9 +9,12 @@ class ErrorCode(Enum):
 	OUT_OF_RANGE = 'Out of range'
 	ABILITIY_NOT_DEFINE_IN_AGENT = 'Ability not define in agent'
 	LIBRARY_CANNOT_BE_ASSIGNED = 'Library cannot be assigned'
+	QUEUE_CAPACITY_MISMATCH = 'KnowledgeQueue declared with another capacity'
+	WATCH_UNDER_LOCK = 'Watch in a Compound holding Knowledge locks'
 
 class Error(Exception):
 	def __init__(self, error_code=None, token=None, message=None):
+		super().__init__(error_code, token, message)		# raised again as it was by a worker process
 		self.error_code = error_code
 		self.token = token
 		# add exception class name before the message
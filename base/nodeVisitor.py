@@ -1,8 +1,23 @@
 class NodeVisitor(object):
-	def visit(self, node, **kwargs):
-		method_name = 'visit_' + type(node).__name__
-		visitor = getattr(self, method_name, self.generic_visit)
-		return visitor(node, **kwargs)
+	_dispatch = {}
 
-	def generic_visit(self, node, **kwargs):
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		cls._dispatch = {}	# node class -> visit function, filled on first visit
+
+	def visit(self, node, *args, **kwargs):
+		try:
+			visitor = self._dispatch[type(node)]
+		except KeyError:
+			visitor = self._resolve(type(node))
+		return visitor(self, node, *args, **kwargs)
+
+	@classmethod
+	def _resolve(cls, node_class):
+		method_name = 'visit_' + node_class.__name__
+		visitor = getattr(cls, method_name, cls.generic_visit)
+		cls._dispatch[node_class] = visitor
+		return visitor
+
+	def generic_visit(self, node, *args, **kwargs):
 		raise Exception('No visit_{} method'.format(type(node).__name__))
@@ -0,0 +1,2 @@
+# Version of the interpreter, part of the key of every cached AST
+INTERPRETER_VERSION = '0.1.0'
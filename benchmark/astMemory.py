@@ -0,0 +1,109 @@
+""" AST memory benchmark, compares the __slots__ nodes with dict-backed ones """
+import argparse
+import os
+import sys
+import tracemalloc
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from base.ast import AST
+from benchmark.generator import generate_program
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+
+def slot_names(node):
+	for cls in type(node).__mro__:
+		for name in getattr(cls, '__slots__', ()):
+			if hasattr(node, name):
+				yield name
+
+
+def walk(tree):
+	"""Yield every node of the tree once."""
+	seen, stack = set(), [tree]
+	while stack:
+		node = stack.pop()
+		if isinstance(node, AST):
+			if id(node) in seen:
+				continue
+			seen.add(id(node))
+			yield node
+			stack.extend(getattr(node, name) for name in slot_names(node))
+		elif isinstance(node, list):
+			stack.extend(node)
+
+
+_dict_classes = {}
+
+
+def dict_backed(node):
+	"""Copy the fields of a node into an instance of a plain class, as the nodes were before __slots__."""
+	cls = type(node)
+	if cls not in _dict_classes:
+		_dict_classes[cls] = type(cls.__name__, (object,), {})
+	mirror = _dict_classes[cls]()
+	for name in slot_names(node):
+		setattr(mirror, name, getattr(node, name))
+	return mirror
+
+
+def slotted(node):
+	cls = type(node)
+	copy = cls.__new__(cls)
+	for name in slot_names(node):
+		setattr(copy, name, getattr(node, name))
+	return copy
+
+
+def allocated(function, nodes):
+	"""Return the bytes allocated by copying every node with function."""
+	tracemalloc.start()
+	copies = [function(node) for node in nodes]
+	current, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	del copies
+	return current
+
+
+def build(text):
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+	return tree
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Measure the memory held by the AST'
+	)
+	argParser.add_argument('inputfile', nargs='?', help='Swarm source file, a synthetic program is generated if omitted')
+	argParser.add_argument('--statements', type=int, default=10000, help='size of the synthetic program')
+	args = argParser.parse_args()
+
+	if args.inputfile:
+		text = open(args.inputfile, 'r', encoding='utf-8').read()
+	else:
+		text = generate_program(args.statements)
+
+	tracemalloc.start()
+	tree = build(text)
+	tree_bytes, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	nodes = list(walk(tree))
+	slots_bytes = allocated(slotted, nodes)
+	dict_bytes = allocated(dict_backed, nodes)
+
+	print(f'{len(text)} chars, {len(nodes)} nodes')
+	print(f'analyzed AST: {tree_bytes / 2**20:.1f} MiB allocated in total')
+	print(f'__slots__ nodes: {slots_bytes / 2**20:.1f} MiB, {slots_bytes / len(nodes):.0f} bytes/node')
+	print(f'dict-backed nodes: {dict_bytes / 2**20:.1f} MiB, {dict_bytes / len(nodes):.0f} bytes/node')
+	print(f'saved {(dict_bytes - slots_bytes) / 2**20:.1f} MiB ({1 - slots_bytes / dict_bytes:.0%} of the node memory)')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,129 @@
+""" asyncio engine benchmark, thousands of simulated drones waiting in testUav.flyTo_API """
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.asyncInterpreter import AsyncInterpreter
+from interpreter.interpreter import Interpreter
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+ENGINES = {
+	'tree': Interpreter,
+	'async': AsyncInterpreter,
+}
+
+SWARM_TEMPLATE = """\
+import testUav
+
+Action flyTo_Action(x){{
+	testUav.flyTo_API(x);
+}}
+
+Action report_Action(s){{
+	testUav.log_API(s);
+}}
+
+Agent drone {{
+	flyTo_Action, report_Action;
+}}
+
+Behavior patrol_Behavior(rounds){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= rounds
+	}}
+	@routine{{
+		flyTo_Action(step);
+		report_Action(step);
+		step = step + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		x = 0;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			patrol_Behavior({rounds});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~{agents}]}});
+}}
+"""
+
+
+def rss():
+	"""Resident set size of this process in MB."""
+	with open('/proc/self/statm') as f:
+		pages = int(f.read().split()[1])
+	return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def sample(peak, stop):
+	while not stop.wait(0.05):
+		peak['threads'] = max(peak['threads'], threading.active_count() - 1)		# without the sampler
+		peak['rss'] = max(peak['rss'], rss())
+
+
+def run(engine, agents, rounds, workers):
+	tree = Parser(Lexer(SWARM_TEMPLATE.format(agents=agents, rounds=rounds))).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+	interpreter = ENGINES[engine](tree, workers=workers)
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+
+	start_rss = rss()
+	peak, stop = {'threads': 0, 'rss': start_rss}, threading.Event()
+	sampler = threading.Thread(target=sample, args=(peak, stop))
+	sampler.start()
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		interpreter.interpret()
+	elapsed = time.perf_counter() - start
+	stop.set()
+	sampler.join()
+	return elapsed, peak['threads'], peak['rss'] - start_rss
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare the threaded and the asyncio engine on drones waiting in flyTo_API'
+	)
+	argParser.add_argument('--agents', type=int, default=1000, help='number of drones')
+	argParser.add_argument('--rounds', type=int, default=2, help='flights of every drone, 3 s each')
+	argParser.add_argument('--workers', type=int, default=None, help='worker threads of the engines')
+	argParser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES), help='engines to run')
+	args = argParser.parse_args()
+
+	print(f'{args.agents} drones, {args.rounds} flights of 3 s each')
+	for engine in args.engines:
+		# a process of its own for every engine, the threads and memory of the previous one are gone
+		with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+			elapsed, threads, memory = pool.submit(run, engine, args.agents, args.rounds, args.workers).result()
+		print(f'{engine:>6}: {elapsed:6.2f} s, peak {threads} threads, +{memory:.1f} MB RSS '
+			  f'({memory * 1024 / args.agents:.1f} KB per drone)')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,136 @@
+""" CallStack benchmark, 1,000 agents accessing knowledge through nested child call stacks """
+import argparse
+import os
+import sys
+import threading
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.memory import ARType, ActivationRecord, CallStack
+
+
+class LegacyCallStack(CallStack):
+	"""CallStack before the cached parent chain, every lookup walks the parents."""
+
+	def peek(self):
+		if len(self._records) == 0:
+			return self.parent.peek()
+		return self._records[-1]
+
+	def bottom(self):
+		p = self
+		while p.parent is not None:
+			p = p.parent
+		return p._records[0]
+
+	def get_base_level(self):
+		p = self.parent
+		cnt = 0
+		while p is not None:
+			cnt += len(p._records)
+			p = p.parent
+		return cnt
+
+
+def counting(call_stack_class):
+	"""Subclass of call_stack_class that counts the reads of .parent."""
+	class Counting(call_stack_class):
+		reads = 0
+
+		@property
+		def parent(self):
+			Counting.reads += 1
+			return self._parent
+
+		@parent.setter
+		def parent(self, value):
+			self._parent = value
+	return Counting
+
+
+def push(call_stack, name, category, knowledge=()):
+	ar = ActivationRecord(
+		name=name, category=category, nesting_level=call_stack.get_base_level() + len(call_stack._records),
+		knowledge=knowledge,
+	)
+	call_stack.push(ar)
+	return ar
+
+
+def agent_stacks(call_stack_class, agents, depth):
+	"""Program/Main/Task records, then for every agent `depth` nested Behaviors each running in a child call stack."""
+	root = call_stack_class()
+	push(root, 'Program', ARType.PROGRAM, knowledge=('findCount',))['findCount'] = 0
+	push(root, 'Main', ARType.MAIN)
+	push(root, 'mission', ARType.TASK)
+	stacks = []
+	for agent in range(agents):
+		call_stack = root.create_child(f'drone:{agent}')
+		for level in range(depth):
+			push(call_stack, f'behavior_{level}', ARType.BEHAVIOR)['step'] = level
+			call_stack = call_stack.create_child(f'drone_{agent}')
+		stacks.append(call_stack)
+	return stacks
+
+
+def knowledge_access(call_stack, steps):
+	"""What a count Action does: push, lock and get/put the knowledge, read a variable of the Behavior, pop."""
+	for _ in range(steps):
+		step = call_stack.peek()['step']
+		ar = push(call_stack, 'count_Action', ARType.ACTION)
+		ar['step'] = step
+		program = call_stack.bottom()
+		program.knowledge.acquire(('findCount',), ('findCount',))
+		cnt = call_stack.bottom().get_knowledge('findCount')
+		call_stack.bottom().put_knowledge('findCount', cnt + 1)
+		program.knowledge.release(('findCount',), ('findCount',))
+		call_stack.pop()
+
+
+def run(call_stack_class, agents, depth, steps):
+	stacks = agent_stacks(call_stack_class, agents, depth)
+	threads = [threading.Thread(target=knowledge_access, args=(call_stack, steps)) for call_stack in stacks]
+	start = time.perf_counter()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	elapsed = time.perf_counter() - start
+	assert stacks[0].bottom().members['findCount'] == agents * steps
+	return elapsed
+
+
+def parent_reads(call_stack_class, depth, steps):
+	"""Reads of .parent per knowledge access of one agent, outside of the timed runs."""
+	counting_class = counting(call_stack_class)
+	call_stack = agent_stacks(counting_class, 1, depth)[0]
+	counting_class.reads = 0
+	knowledge_access(call_stack, steps)
+	return counting_class.reads / steps
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare the cached CallStack parent chain with walking it on every lookup'
+	)
+	argParser.add_argument('--agents', type=int, default=1000, help='number of agent threads')
+	argParser.add_argument('--depth', type=int, default=4, help='nested Behaviors of every agent')
+	argParser.add_argument('--steps', type=int, default=200, help='knowledge accesses of every agent')
+	args = argParser.parse_args()
+
+	operations = args.agents * args.steps
+	legacy = run(LegacyCallStack, args.agents, args.depth, args.steps)
+	cached = run(CallStack, args.agents, args.depth, args.steps)
+	print(f'{args.agents} agents, {args.depth} nested Behaviors, {operations} knowledge accesses')
+	print(f'parent walk: {legacy * 1000:.0f} ms, {legacy / operations * 1e6:.2f} us/access, '
+		  f'{parent_reads(LegacyCallStack, args.depth, args.steps):.0f} parent reads/access')
+	print(f'cached:      {cached * 1000:.0f} ms, {cached / operations * 1e6:.2f} us/access, '
+		  f'{parent_reads(CallStack, args.depth, args.steps):.0f} parent reads/access ({legacy / cached:.2f}x)')
+
+
+if __name__ == '__main__':
+	main()
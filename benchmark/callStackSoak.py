@@ -0,0 +1,142 @@
+""" CallStack soak benchmark, RSS over 10^5 Behavior invocations """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.codegen import GeneratedInterpreter
+from interpreter.compiler import CompiledInterpreter
+from interpreter.interpreter import Interpreter
+from interpreter.memory import CallStack
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+ENGINES = {
+	'tree': Interpreter,
+	'compiled': CompiledInterpreter,
+	'codegen': GeneratedInterpreter,
+}
+
+SOAK_TEMPLATE = """\
+Action rest_Action(){{
+	r = 0;
+}}
+
+Agent drone {{
+	rest_Action;
+}}
+
+Behavior step_Behavior(){{
+	@init{{
+		done = 0;
+	}}
+	@goal{{
+		$ done >= 1
+	}}
+	@routine{{
+		done = done + 1;
+	}}
+}}
+
+Behavior soak_Behavior(n){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= n
+	}}
+	@routine{{
+		step_Behavior();
+		step = step + 1;
+	}}
+}}
+
+Task soak({{agt[st~ed]}}){{
+	@init{{
+		round = 0;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			soak_Behavior({invocations});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	soak({{drone[0~{agents}]}});
+}}
+"""
+
+
+def rss():
+	"""Resident set size of this process in MB."""
+	with open('/proc/self/statm') as f:
+		pages = int(f.read().split()[1])
+	return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def sample_rss(samples, stop, interval):
+	start = time.perf_counter()
+	while not stop.wait(interval):
+		samples.append((time.perf_counter() - start, rss()))
+
+
+def soak(engine, agents, invocations, interval):
+	text = SOAK_TEMPLATE.format(agents=agents, invocations=invocations)
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+
+	samples, stop = [(0.0, rss())], threading.Event()
+	sampler = threading.Thread(target=sample_rss, args=(samples, stop, interval))
+	sampler.start()
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		ENGINES[engine](tree).interpret()
+	elapsed = time.perf_counter() - start
+	stop.set()
+	sampler.join()
+	samples.append((elapsed, rss()))
+	return elapsed, samples
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Track the RSS while agents invoke a Behavior 10^5 times in total'
+	)
+	argParser.add_argument('--engine', choices=ENGINES, default='tree', help='execution engine')
+	argParser.add_argument('--agents', type=int, default=10, help='number of agents')
+	argParser.add_argument('--invocations', type=int, default=10000, help='Behavior invocations of every agent')
+	argParser.add_argument('--interval', type=float, default=1.0, help='seconds between two RSS samples')
+	argParser.add_argument(
+		'--retain',
+		help='Keep every finished child call stack, as before they were released',
+		action='store_true',
+	)
+	args = argParser.parse_args()
+
+	if args.retain:
+		CallStack.back_to_parent = lambda self: self.parent
+
+	elapsed, samples = soak(args.engine, args.agents, args.invocations, args.interval)
+	print(f'{args.engine}: {args.agents * args.invocations} Behavior invocations in {elapsed:.1f} s'
+		  f'{", finished child call stacks retained" if args.retain else ""}')
+	for seconds, mb in samples:
+		print(f'{seconds:8.1f} s  {mb:8.1f} MB')
+	print(f'RSS growth: {samples[-1][1] - samples[0][1]:.1f} MB')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,71 @@
+""" Synthetic Swarm programs for the benchmarks """
+
+
+STATEMENTS_PER_ACTION = 10
+
+ACTION_TEMPLATE = """\
+Action act_{n}(a, b){{
+	x = a + b * 2;
+	y = x - a % 7;
+	/* knowledge shared between the agents */
+	get c from count_{k};
+	put c + 1 to count_{k};
+	if(x >= y and c != 0){{
+		put "done" to log_{k}[];
+	}}
+	else{{
+		z = x / 3;
+	}}
+	flag = True;
+	testUav.takeOff_API(x, 1.5, flag);
+	return x + y;
+}}
+
+"""
+
+FOOTER = """\
+Agent drone {{
+	{abilities};
+}}
+
+Behavior work_Behavior(h){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= h
+	}}
+	@routine{{
+		r = act_0(step, h);
+		step = step + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		put 0 to count_0;
+	}}
+	@goal{{}}
+	@routine{{
+		each agt[st~ed] {{
+			work_Behavior(1);
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone 1;
+	mission({{drone[0~1]}});
+}}
+"""
+
+
+def generate_program(statements, knowledge=10):
+	"""Return the text of a valid Swarm program with about `statements` statements."""
+	actions = max(1, statements // STATEMENTS_PER_ACTION)
+	parts = ['import testUav\n\n']
+	for n in range(actions):
+		parts.append(ACTION_TEMPLATE.format(n=n, k=n % knowledge))
+	abilities = ', '.join(f'act_{n}' for n in range(actions))
+	parts.append(FOOTER.format(abilities=abilities))
+	return ''.join(parts)
@@ -0,0 +1,128 @@
+""" Goal period benchmark, drones with an empty routine waiting for a drone in flight """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.interpreter import Interpreter
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+SWARM_TEMPLATE = """\
+import testUav
+
+Action flyTo_Action(x){{
+	testUav.flyTo_API(x);
+}}
+
+Action land_Action(){{
+	put True to landed;
+}}
+
+Action landed_Action(){{
+	get done from landed;
+	return done;
+}}
+
+Agent drone {{
+	flyTo_Action, land_Action, landed_Action;
+}}
+
+Behavior fly_Behavior(){{
+	@init{{
+		flights = 0;
+	}}
+	@goal{{
+		$ flights >= 1
+	}}
+	@routine{{
+		flyTo_Action(1);
+		land_Action();
+		flights = flights + 1;
+	}}
+}}
+
+Behavior wait_Behavior(){{
+	@init{{
+		done = False;
+	}}
+	@goal{{
+		done = landed_Action();
+		$ done
+	}}
+	@routine{{
+	}}
+}}
+
+Task mission({{agtA[stA~edA], agtB[stB~edB]}}){{
+	@init{{
+		put False to landed;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agtA[stA~edA] {{
+			fly_Behavior();
+		}}
+	}}
+	||
+	{{
+		each agtB[stB~edB] {{
+			wait_Behavior();
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~1], drone[1~{agents}]}});
+}}
+"""
+
+
+class CountingInterpreter(Interpreter):
+	evaluations = 0
+
+	def visit_GoalBlock(self, node, ctx):
+		self.evaluations += 1
+		return super().visit_GoalBlock(node, ctx)
+
+
+def run(tree, goal_period, workers):
+	"""Wall and CPU seconds to interpret the tree, and the number of goal evaluations."""
+	interpreter = CountingInterpreter(tree, workers=workers, goal_period=goal_period)
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+	start, start_cpu = time.perf_counter(), time.process_time()
+	with contextlib.redirect_stdout(io.StringIO()):
+		interpreter.interpret()
+	return time.perf_counter() - start, time.process_time() - start_cpu, interpreter.evaluations
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Measure the CPU used by drones waiting in a Behavior with an empty routine'
+	)
+	argParser.add_argument('--agents', type=int, default=10, help='number of drones, one of them flies')
+	argParser.add_argument('--workers', type=int, default=None, help='worker threads of the interpreter')
+	argParser.add_argument('--goal-periods', type=float, nargs='+', default=[0, 0.05], help='--goal-period values')
+	args = argParser.parse_args()
+
+	tree = Parser(Lexer(SWARM_TEMPLATE.format(agents=args.agents))).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+	print(f'{args.agents - 1} drones waiting for a 3 s flight')
+	for goal_period in args.goal_periods:
+		elapsed, cpu, evaluations = run(tree, goal_period, args.workers)
+		print(f'--goal-period {goal_period:<4}: {elapsed:5.2f} s, {cpu:5.2f} s CPU, {evaluations:7} goal evaluations')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,134 @@
+""" Goal evaluation benchmark, drones with 3-branch Behaviors whose goal queries the platform """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+import libs.testUav
+from interpreter.context import context_api
+from interpreter.interpreter import Interpreter
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+SWARM_TEMPLATE = """\
+import testUav
+
+Action getPosition_Action(){{
+	pos = testUav.getPosition_API();
+	return pos;
+}}
+
+Action getFindCount_Action(){{
+	get cnt from findCount;
+	return cnt;
+}}
+
+Action found_Action(){{
+	get cnt from findCount;
+	put cnt + 1 to findCount;
+}}
+
+Agent drone {{
+	getPosition_Action, getFindCount_Action, found_Action;
+}}
+
+Behavior search_Behavior(target){{
+	@init{{
+		covered = 0;
+		seen = 0;
+		hover = 0;
+	}}
+	@goal{{
+		pos = getPosition_Action();
+		find_cnt = getFindCount_Action();
+		$ find_cnt >= target
+	}}
+	@routine{{
+		covered = covered + 1;
+	}}
+	||
+	{{
+		seen = seen + 1;
+		if(seen % {find_every} == 0){{
+			found_Action();
+		}}
+	}}
+	||
+	{{
+		hover = hover + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		put 0 to findCount;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			search_Behavior({target});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~{agents}]}});
+}}
+"""
+
+
+def run(tree, goal_interval, workers):
+	"""Seconds to interpret the tree, and the number of goal evaluations."""
+	interpreter = Interpreter(tree, workers=workers, goal_interval=goal_interval)
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		interpreter.interpret()
+	return time.perf_counter() - start
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Count the goal evaluations with and without the dependency watch'
+	)
+	argParser.add_argument('--agents', type=int, default=20, help='number of drones')
+	argParser.add_argument('--finds', type=int, default=2, help='targets found by every drone before the goal is reached')
+	argParser.add_argument('--find-every', type=int, default=50, help='rounds of the search routine per target found')
+	argParser.add_argument('--latency', type=float, default=0.002, help='seconds of the getPosition_API call in the goal')
+	argParser.add_argument('--workers', type=int, default=None, help='worker threads of the interpreter')
+	argParser.add_argument('--goal-intervals', type=float, nargs='+', default=[0, 0.5], help='--goal-interval values')
+	args = argParser.parse_args()
+
+	calls = [0]
+
+	@context_api
+	def getPosition_API(ctx, *swarm_args):
+		calls[0] += 1
+		time.sleep(args.latency)		# a query to the simulator
+		return (0, 0, 0)
+	libs.testUav.getPosition_API = getPosition_API
+
+	text = SWARM_TEMPLATE.format(agents=args.agents, target=args.agents * args.finds, find_every=args.find_every)
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+	print(f'{args.agents} drones, 3 routines, goal reached after {args.agents * args.finds} finds, '
+		  f'{args.latency * 1000:.0f} ms per platform query')
+	for goal_interval in args.goal_intervals:
+		calls[0] = 0
+		elapsed = run(tree, goal_interval, args.workers)
+		print(f'--goal-interval {goal_interval:<4}: {elapsed:6.2f} s, {calls[0]:6} goal evaluations')
+
+
+if __name__ == '__main__':
+	main()
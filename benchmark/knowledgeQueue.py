@@ -0,0 +1,74 @@
+""" KnowledgeQueue benchmark, drones pushing detections that a few drones drain one by one or in batches """
+import argparse
+import os
+import sys
+import threading
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.knowledge import ItemQueue
+
+
+def produce(queue, detections, burst):
+	"""`put each targets to found[N];`, a burst of detections per scan."""
+	for start in range(0, detections, burst):
+		queue.put(list(range(start, min(start + burst, detections))))
+
+
+def consume(queue, limit, hold, counts):
+	"""`get each(limit) targets from found[] within 0.2 else 0;` and a routine round of `hold` seconds per get."""
+	count = 0
+	while True:
+		items = queue.get(limit, 0.2)
+		if not items:
+			break
+		count += len(items)
+		time.sleep(hold)
+	counts.append(count)
+
+
+def run(producers, consumers, detections, burst, capacity, limit, hold):
+	queue = ItemQueue(capacity)
+	counts = []
+	threads = [threading.Thread(target=produce, args=(queue, detections, burst)) for _ in range(producers)]
+	threads += [threading.Thread(target=consume, args=(queue, limit, hold, counts)) for _ in range(consumers)]
+	start = time.perf_counter()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	elapsed = time.perf_counter() - start - 0.2		# the last get of every consumer times out
+	assert sum(counts) == producers * detections
+	return elapsed, queue.stats()
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare draining a KnowledgeQueue one item per get with batch gets, under a capacity'
+	)
+	argParser.add_argument('--producers', type=int, default=20, help='threads putting detections')
+	argParser.add_argument('--consumers', type=int, default=4, help='threads getting detections')
+	argParser.add_argument('--detections', type=int, default=500, help='detections put by every producer')
+	argParser.add_argument('--burst', type=int, default=10, help='detections put by one put each')
+	argParser.add_argument('--capacity', type=int, default=1000, help='capacity of the queue, 0 for none')
+	argParser.add_argument('--batch', type=int, default=50, help='items of one batch get')
+	argParser.add_argument('--hold', type=float, default=0.001, help='seconds of a routine round after a get')
+	args = argParser.parse_args()
+
+	total = args.producers * args.detections
+	print(f'{args.producers} producers, {args.consumers} consumers, {total} detections, '
+		  f'capacity {args.capacity or "unbounded"}, {args.hold * 1000:.1f} ms per get')
+	for name, limit in (('one', 1), (f'each({args.batch})', args.batch)):
+		elapsed, stats = run(
+			args.producers, args.consumers, args.detections, args.burst, args.capacity, limit, args.hold
+		)
+		print(f'{name:>9}: {elapsed:6.2f} s, {total / elapsed:8.0f} detections/s, max depth {stats["max_depth"]}, '
+			  f'put wait {stats["put_wait"]:.2f} s, get wait {stats["get_wait"]:.2f} s')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,74 @@
+""" Knowledge contention benchmark, many drones reading a Knowledge few of them write """
+import argparse
+import os
+import sys
+import threading
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.knowledge import KnowledgeStore
+
+NAMES = ('findCount',)
+
+
+def read(store, rounds, hold, exclusive):
+	"""A Compound that gets findCount and calls an API, `get cnt from findCount; testUav.hover_API(cnt);`."""
+	for _ in range(rounds):
+		if exclusive:		# one lock per name held for the whole Compound, as before the KnowledgeStore
+			store.acquire(NAMES, NAMES)
+			store.get('findCount')
+			time.sleep(hold)
+			store.release(NAMES, NAMES)
+		else:
+			store.snapshot(NAMES)['findCount']
+			time.sleep(hold)
+
+
+def write(store, rounds, hold):
+	"""A Compound that counts a target found, `get cnt from findCount; put cnt + 1 to findCount;`."""
+	for _ in range(rounds):
+		store.acquire(NAMES, NAMES)
+		store.put('findCount', store.get('findCount') + 1)
+		time.sleep(hold)
+		store.release(NAMES, NAMES)
+
+
+def run(readers, writers, rounds, hold, exclusive):
+	store = KnowledgeStore(NAMES)
+	store.put('findCount', 0)
+	threads = [threading.Thread(target=read, args=(store, rounds, hold, exclusive)) for _ in range(readers)]
+	threads += [threading.Thread(target=write, args=(store, rounds, hold)) for _ in range(writers)]
+	start = time.perf_counter()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	elapsed = time.perf_counter() - start
+	assert store.get('findCount') == writers * rounds
+	return elapsed
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare exclusive Knowledge locks with the snapshot reads of the KnowledgeStore'
+	)
+	argParser.add_argument('--readers', type=int, default=1000, help='threads running a Compound that only gets')
+	argParser.add_argument('--writers', type=int, default=10, help='threads running a Compound that puts')
+	argParser.add_argument('--rounds', type=int, default=3, help='Compounds run by every thread')
+	argParser.add_argument('--hold', type=float, default=0.001, help='seconds a Compound runs after its get')
+	args = argParser.parse_args()
+
+	compounds = (args.readers + args.writers) * args.rounds
+	print(f'{args.readers} readers, {args.writers} writers, {args.rounds} Compounds each, '
+		  f'{args.hold * 1000:.1f} ms per Compound')
+	for name, exclusive in (('exclusive', True), ('snapshot', False)):
+		elapsed = run(args.readers, args.writers, args.rounds, args.hold, exclusive)
+		print(f'{name:>9}: {elapsed:6.2f} s, {compounds / elapsed:8.0f} Compounds/s')
+
+
+if __name__ == '__main__':
+	main()
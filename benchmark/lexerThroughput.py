@@ -0,0 +1,83 @@
+""" Lexer throughput benchmark, reports tokens/sec """
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from benchmark.generator import generate_program
+from lexer.lexer import Lexer
+from lexer.token import TokenType
+from lexer.tokenArray import TokenArray
+
+
+def tokenize(text):
+	lexer = Lexer(text)
+	count = 0
+	while lexer.get_next_token().category != TokenType.EOF:
+		count += 1
+	return count
+
+
+def prelex(text):
+	return len(TokenArray(Lexer(text)))
+
+
+def token_list(text):
+	lexer = Lexer(text)
+	tokens = [lexer.get_next_token()]
+	while tokens[-1].category != TokenType.EOF:
+		tokens.append(lexer.get_next_token())
+	return tokens
+
+
+def allocated(function, text):
+	"""Return the bytes still allocated by the result of function(text) and the peak."""
+	tracemalloc.start()
+	result = function(text)
+	current, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	del result
+	return current, peak
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Measure the lexer throughput in tokens/sec'
+	)
+	argParser.add_argument('inputfile', nargs='?', help='Swarm source file, a synthetic program is generated if omitted')
+	argParser.add_argument('--statements', type=int, default=10000, help='size of the synthetic program')
+	argParser.add_argument('--repeat', type=int, default=5, help='number of timed runs, the best one is reported')
+	argParser.add_argument('--prelex', help='tokenize the whole input into a TokenArray', action='store_true')
+	args = argParser.parse_args()
+
+	if args.inputfile:
+		text = open(args.inputfile, 'r', encoding='utf-8').read()
+	else:
+		text = generate_program(args.statements)
+
+	run = prelex if args.prelex else tokenize
+	best = float('inf')
+	for _ in range(args.repeat):
+		start = time.perf_counter()
+		count = run(text)
+		best = min(best, time.perf_counter() - start)
+
+	lines = text.count('\n') + 1
+	print(f'{len(text)} chars, {lines} lines, {count} tokens')
+	print(f'best of {args.repeat}: {best * 1000:.1f} ms')
+	print(f'{count / best:,.0f} tokens/sec, {lines / best:,.0f} lines/sec')
+	if args.prelex:
+		array_bytes, array_peak = allocated(lambda text: TokenArray(Lexer(text)), text)
+		list_bytes, list_peak = allocated(token_list, text)
+		print(f'TokenArray: {array_bytes / count:.1f} bytes/token, peak {array_peak / 2**20:.1f} MiB')
+		print(f'Token list: {list_bytes / count:.1f} bytes/token, peak {list_peak / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+	main()
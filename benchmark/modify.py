@@ -0,0 +1,123 @@
+""" Shared counter benchmark, drones counting into a Knowledge around a platform call """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+import libs.testUav
+from interpreter.context import context_api
+from interpreter.interpreter import Interpreter
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+COUNTERS = {
+	# the Compound holds the findCount lock across the platform call
+	'get/put': """
+	get cnt from findCount;
+	testUav.scan_API();
+	put cnt + 1 to findCount;""",
+	# findCount is locked for the increment only
+	'modify': """
+	testUav.scan_API();
+	modify cnt from findCount to cnt + 1;""",
+}
+
+SWARM_TEMPLATE = """\
+import testUav
+
+Action count_Action(){{{counter}
+	counted = cnt + 1;
+	if(counted == {total}){{
+		testUav.log_API(counted);
+	}}
+}}
+
+Agent drone {{
+	count_Action;
+}}
+
+Behavior count_Behavior(rounds){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= rounds
+	}}
+	@routine{{
+		count_Action();
+		step = step + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		put 0 to findCount;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			count_Behavior({rounds});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~{agents}]}});
+}}
+"""
+
+
+def run(text, workers):
+	"""Seconds to interpret the program, and the increments counted, the findCount logged by the last one."""
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+	interpreter = Interpreter(tree, workers=workers)
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+	output = io.StringIO()
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(output):
+		interpreter.interpret()
+	elapsed = time.perf_counter() - start
+	totals = [line.rsplit(', ', 1)[1] for line in output.getvalue().splitlines() if 'log_API' in line]
+	return elapsed, ' '.join(totals) or 'lost increments'
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare a get/put counter with the modify statement, around a platform call'
+	)
+	argParser.add_argument('--agents', type=int, default=200, help='number of drones')
+	argParser.add_argument('--rounds', type=int, default=5, help='increments of every drone')
+	argParser.add_argument('--latency', type=float, default=0.005, help='seconds of the scan_API call')
+	argParser.add_argument('--workers', type=int, default=None, help='worker threads of the interpreter')
+	args = argParser.parse_args()
+
+	@context_api
+	def scan_API(ctx, *swarm_args):
+		with ctx.blocking():
+			time.sleep(args.latency)		# a query to the simulator
+
+	libs.testUav.scan_API = scan_API
+
+	print(f'{args.agents} drones, {args.rounds} increments each, {args.latency * 1000:.0f} ms per platform call')
+	for name, counter in COUNTERS.items():
+		text = SWARM_TEMPLATE.format(
+			counter=counter, agents=args.agents, rounds=args.rounds, total=args.agents * args.rounds
+		)
+		elapsed, total = run(text, args.workers)
+		print(f'{name:>8}: {elapsed:6.2f} s, findCount {total}')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,99 @@
+""" Distributed runtime benchmark, drones counting into the Knowledge of the coordinator from nodes on a Unix or a TCP transport """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.processInterpreter import ProcessInterpreter
+from interpreter.transport import TRANSPORTS
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+SWARM_TEMPLATE = """\
+Action count_Action(){{
+	modify cnt from seenCount to cnt + 1;
+}}
+
+Agent drone {{
+	count_Action;
+}}
+
+Behavior count_Behavior(rounds){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= rounds
+	}}
+	@routine{{
+		count_Action();
+		step = step + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		put 0 to seenCount;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			count_Behavior({rounds});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~{agents}]}});
+}}
+"""
+
+
+def run(tree, transport, nodes):
+	"""Seconds to interpret the program, the count in the Knowledge and the node_stats()."""
+	interpreter = ProcessInterpreter(tree, processes=nodes, transport=TRANSPORTS[transport]())
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		interpreter.interpret()
+	return time.perf_counter() - start, interpreter.knowledge.get('seenCount'), interpreter.node_stats()
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Per node throughput and Knowledge latency of the process engine, on each transport'
+	)
+	argParser.add_argument('--agents', type=int, default=32, help='number of drones')
+	argParser.add_argument('--rounds', type=int, default=20, help='counts of every drone')
+	argParser.add_argument('--nodes', type=int, default=2, help='nodes started by the coordinator')
+	args = argParser.parse_args()
+
+	text = SWARM_TEMPLATE.format(agents=args.agents, rounds=args.rounds)
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+
+	print(f'{args.agents} drones, {args.rounds} counts each, {args.nodes} nodes, {os.cpu_count()} CPUs')
+	for transport in sorted(TRANSPORTS):
+		elapsed, count, nodes = run(tree, transport, args.nodes)
+		print(f'{transport:>5}: {elapsed:6.2f} s, {count} counts')
+		for stats in nodes:
+			calls = stats['knowledge_calls']
+			latency = stats['knowledge_seconds'] / calls * 1000 if calls else 0.0
+			print(f'       {stats["name"]}: {stats["agents"]} agents, busy {stats["busy"]:.2f} s, '
+				  f'{calls / stats["busy"] if stats["busy"] else 0.0:8.0f} knowledge calls/s, '
+				  f'latency {latency:.3f} ms, slowest {stats["knowledge_slowest"] * 1000:.3f} ms')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,58 @@
+""" Parser scaling benchmark, shows that parsing does linear work in the input size """
+import argparse
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from benchmark.generator import generate_program
+from lexer.lexer import Lexer
+from parser.parser import Parser
+
+
+class CountingLexer(Lexer):
+	"""Lexer that counts the characters it scans, lookahead included."""
+
+	def __init__(self, text):
+		super().__init__(text)
+		self.scanned_chars = 0
+		self.scanned_tokens = 0
+
+	def scan(self):
+		pos = self.pos
+		scanned = super().scan()
+		self.scanned_chars += self.pos - pos
+		self.scanned_tokens += 1
+		return scanned
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Measure the parser work for growing Swarm programs'
+	)
+	argParser.add_argument('--statements', type=int, default=1000, help='size of the smallest synthetic program')
+	argParser.add_argument('--steps', type=int, default=5, help='number of times the program size is doubled')
+	args = argParser.parse_args()
+
+	print(f'{"statements":>10} {"chars":>10} {"tokens":>8} {"chars/len":>9} {"ms":>9} {"us/token":>9}')
+	statements = args.statements
+	for _ in range(args.steps):
+		text = generate_program(statements)
+		lexer = CountingLexer(text)
+		parser = Parser(lexer)
+		start = time.perf_counter()
+		parser.parse()
+		elapsed = time.perf_counter() - start
+		# chars/len is 1.00 when every character is scanned exactly once
+		print(f'{statements:>10} {len(text):>10} {lexer.scanned_tokens:>8} '
+			  f'{lexer.scanned_chars / len(text):>9.2f} {elapsed * 1000:>9.1f} '
+			  f'{elapsed * 1e6 / lexer.scanned_tokens:>9.2f}')
+		statements *= 2
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,104 @@
+""" Scaling benchmark, drones planning their tours on worker threads or on 1 to N worker processes """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.interpreter import Interpreter
+from interpreter.processInterpreter import ProcessInterpreter
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+SWARM_TEMPLATE = """\
+import testUav
+
+Action plan_Action(){{
+	length = testUav.plan_API({waypoints});
+	modify cnt from plannedCount to cnt + 1;
+}}
+
+Agent drone {{
+	plan_Action;
+}}
+
+Behavior plan_Behavior(rounds){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= rounds
+	}}
+	@routine{{
+		plan_Action();
+		step = step + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		put 0 to plannedCount;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			plan_Behavior({rounds});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~{agents}]}});
+}}
+"""
+
+
+def run(tree, processes):
+	"""Seconds to interpret the program and the tours planned, on threads only if processes is 0."""
+	if processes:
+		interpreter = ProcessInterpreter(tree, processes=processes)
+	else:
+		interpreter = Interpreter(tree)
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		interpreter.interpret()
+	return time.perf_counter() - start, interpreter.knowledge.get('plannedCount')
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare the tree engine with the process engine on 1 to N processes, for CPU bound agents'
+	)
+	argParser.add_argument('--agents', type=int, default=16, help='number of drones')
+	argParser.add_argument('--rounds', type=int, default=2, help='tours planned by every drone')
+	argParser.add_argument('--waypoints', type=int, default=400, help='waypoints of a tour')
+	argParser.add_argument('--max-processes', type=int, default=os.cpu_count(), help='most worker processes tried')
+	args = argParser.parse_args()
+
+	text = SWARM_TEMPLATE.format(agents=args.agents, rounds=args.rounds, waypoints=args.waypoints)
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+
+	print(f'{args.agents} drones, {args.rounds} tours of {args.waypoints} waypoints each, {os.cpu_count()} CPUs')
+	elapsed, planned = run(tree, 0)
+	print(f'      threads: {elapsed:6.2f} s, {planned} tours')
+	processes = 1
+	while processes <= args.max_processes:
+		elapsed, planned = run(tree, processes)
+		print(f'{processes:>3} processes: {elapsed:6.2f} s, {planned} tours')
+		processes *= 2
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,118 @@
+""" Scheduler benchmark, 500 drones running 2-branch Behaviors on a bounded worker pool """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.interpreter import Interpreter
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+SWARM_TEMPLATE = """\
+import testUav
+
+Action count_Action(){{
+	get cnt from findCount;
+	put cnt + 1 to findCount;
+}}
+
+Action report_Action(s){{
+	testUav.log_API(s);
+}}
+
+Agent drone {{
+	count_Action, report_Action;
+}}
+
+Behavior patrol_Behavior(rounds){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= rounds
+	}}
+	@routine{{
+		count_Action();
+	}}
+	||
+	{{
+		report_Action(step);
+		step = step + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		put 0 to findCount;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			patrol_Behavior({rounds});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~{agents}]}});
+}}
+"""
+
+
+def analyze(agents, rounds):
+	tree = Parser(Lexer(SWARM_TEMPLATE.format(agents=agents, rounds=rounds))).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+	return tree
+
+
+def sample_threads(peak, stop):
+	while not stop.wait(0.01):
+		peak[0] = max(peak[0], threading.active_count())
+
+
+def run(tree, workers):
+	"""Seconds to interpret the tree after the agents are created, and the peak number of threads."""
+	interpreter = Interpreter(tree, workers=workers)
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+	peak, stop = [threading.active_count()], threading.Event()
+	sampler = threading.Thread(target=sample_threads, args=(peak, stop))
+	sampler.start()
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		interpreter.interpret()
+	elapsed = time.perf_counter() - start
+	stop.set()
+	sampler.join()
+	return elapsed, peak[0] - 1		# without the sampler
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Run drones with 2-branch Behaviors for several worker pool sizes'
+	)
+	argParser.add_argument('--agents', type=int, default=500, help='number of drones')
+	argParser.add_argument('--rounds', type=int, default=20, help='routine rounds of every Behavior')
+	argParser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16, 64], help='worker pool sizes')
+	args = argParser.parse_args()
+
+	tree = analyze(args.agents, args.rounds)
+	print(f'{args.agents} drones, 2 routines, {args.rounds} rounds')
+	for workers in args.workers:
+		elapsed, threads = run(tree, workers)
+		print(f'{workers:4} workers: {elapsed * 1000:8.0f} ms, peak {threads} threads')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,95 @@
+""" Virtual time benchmark, a mission of 3 s flights run by the async engine in real time and on a virtual clock """
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.asyncInterpreter import AsyncInterpreter
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+SWARM_TEMPLATE = """\
+import testUav
+
+Action fly_Action(){{
+	testUav.flyTo_API(1);
+	modify cnt from flightCount to cnt + 1;
+}}
+
+Agent drone {{
+	fly_Action;
+}}
+
+Behavior fly_Behavior(rounds){{
+	@init{{
+		step = 0;
+	}}
+	@goal{{
+		$ step >= rounds
+	}}
+	@routine{{
+		fly_Action();
+		step = step + 1;
+	}}
+}}
+
+Task mission({{agt[st~ed]}}){{
+	@init{{
+		put 0 to flightCount;
+	}}
+	@goal{{
+		$ True
+	}}
+	@routine{{
+		each agt[st~ed] {{
+			fly_Behavior({rounds});
+		}}
+	}}
+}}
+
+Main {{
+	Agent drone {agents};
+	mission({{drone[0~{agents}]}});
+}}
+"""
+
+
+def run(tree, virtual_time):
+	"""Wall clock seconds of the mission, the flights and the simulated seconds on a virtual clock."""
+	interpreter = AsyncInterpreter(tree, virtual_time=virtual_time)
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		interpreter.interpret()
+	elapsed = time.perf_counter() - start
+	simulated = interpreter.clock.now() if virtual_time else elapsed
+	return elapsed, interpreter.knowledge.get('flightCount'), simulated
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare a mission of the async engine in real time with the same mission on a virtual clock'
+	)
+	argParser.add_argument('--agents', type=int, default=20, help='number of drones')
+	argParser.add_argument('--rounds', type=int, default=3, help='flights of 3 s of every drone')
+	args = argParser.parse_args()
+
+	text = SWARM_TEMPLATE.format(agents=args.agents, rounds=args.rounds)
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+
+	print(f'{args.agents} drones, {args.rounds} flights of 3 s each, 2 s of platform setup')
+	for name, virtual_time in (('real', False), ('virtual', True)):
+		elapsed, flights, simulated = run(tree, virtual_time)
+		print(f'{name:>7}: {elapsed:6.2f} s, {flights} flights, {simulated:6.2f} s of mission time')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,91 @@
+""" Visitor dispatch micro-benchmark, compares the cached dispatch with getattr on every visit """
+import argparse
+import os
+import sys
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from base.nodeVisitor import NodeVisitor
+from benchmark.astMemory import walk
+from benchmark.generator import generate_program
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+
+class LegacyDispatch(object):
+	"""The dispatch of NodeVisitor before the cache."""
+
+	def visit(self, node, **kwargs):
+		method_name = 'visit_' + type(node).__name__
+		visitor = getattr(self, method_name, self.generic_visit)
+		return visitor(node, **kwargs)
+
+
+class NullVisitor(NodeVisitor):
+	"""Visits nothing but dispatches to a method for every node class."""
+
+	def generic_visit(self, node, **kwargs):
+		return None
+
+
+for _name in ['Program', 'Compound', 'Var', 'Num', 'String', 'Boolean', 'BinOp', 'UnaryOp', 'NoOp', 'IfElse',
+			  'Return', 'FunctionCall', 'LibraryCall', 'Knowledge', 'KnowledgeQueue', 'Action', 'FormalParams']:
+	setattr(NullVisitor, 'visit_' + _name, lambda self, node, **kwargs: None)
+
+
+class LegacyNullVisitor(LegacyDispatch, NullVisitor):
+	pass
+
+
+class LegacySemanticAnalyzer(LegacyDispatch, SemanticAnalyzer):
+	pass
+
+
+def best_of(repeat, function):
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare the cost of cached and getattr visitor dispatch'
+	)
+	argParser.add_argument('--statements', type=int, default=10000, help='size of the synthetic program')
+	argParser.add_argument('--repeat', type=int, default=5, help='number of timed runs, the best one is reported')
+	args = argParser.parse_args()
+
+	text = generate_program(args.statements)
+	tree = Parser(Lexer(text)).parse()
+	nodes = list(walk(tree))
+
+	def dispatch(visitor):
+		visit = visitor.visit
+		for node in nodes:
+			visit(node, agent='drone', id=0)
+
+	def analyze(analyzer_class):
+		analyzer_class(log_or_not=False).visit(tree)
+
+	legacy = best_of(args.repeat, lambda: dispatch(LegacyNullVisitor()))
+	cached = best_of(args.repeat, lambda: dispatch(NullVisitor()))
+	print(f'{len(nodes)} nodes')
+	print(f'dispatch, getattr: {legacy / len(nodes) * 1e9:.0f} ns/visit')
+	print(f'dispatch, cached:  {cached / len(nodes) * 1e9:.0f} ns/visit ({legacy / cached:.2f}x)')
+
+	legacy = best_of(args.repeat, lambda: analyze(LegacySemanticAnalyzer))
+	cached = best_of(args.repeat, lambda: analyze(SemanticAnalyzer))
+	print(f'analyze, getattr: {legacy * 1000:.1f} ms')
+	print(f'analyze, cached:  {cached * 1000:.1f} ms ({legacy / cached:.2f}x)')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,76 @@
+""" Idle drones waiting on a Knowledge, polling it with get or sleeping in a watch """
+import argparse
+import os
+import sys
+import threading
+import time
+
+# add the project root to the Python search path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.append(project_root)
+
+from interpreter.knowledge import KnowledgeStore
+
+NAMES = ('deliveryCount',)
+
+
+def poll(store, target, period, woken):
+	"""`@goal{ get cnt from deliveryCount; $ cnt >= target }` of an empty routine, evaluated every period."""
+	while store.snapshot(NAMES)['deliveryCount'] < target:
+		time.sleep(period)
+	woken.append(time.perf_counter())
+
+
+def watch(store, target, period, woken):
+	"""`@goal{ watch cnt from deliveryCount until cnt >= target; $ True }`."""
+	for value in store.watch('deliveryCount'):
+		if value >= target:
+			break
+	woken.append(time.perf_counter())
+
+
+def deliver(store, deliveries, pause):
+	for _ in range(deliveries):
+		time.sleep(pause)
+		store.acquire(NAMES, NAMES)
+		store.put('deliveryCount', store.get('deliveryCount') + 1)
+		store.release(NAMES, NAMES)
+	return time.perf_counter()
+
+
+def run(waiter, agents, deliveries, pause, period):
+	store = KnowledgeStore(NAMES)
+	store.put('deliveryCount', 0)
+	woken = []
+	threads = [threading.Thread(target=waiter, args=(store, deliveries, period, woken)) for _ in range(agents)]
+	for thread in threads:
+		thread.start()
+	cpu = time.process_time()
+	delivered = deliver(store, deliveries, pause)
+	for thread in threads:
+		thread.join()
+	cpu = time.process_time() - cpu
+	latency = sum(at - delivered for at in woken) / len(woken)
+	return cpu, latency
+
+
+def main():
+	argParser = argparse.ArgumentParser(
+		description='Compare goals polling a Knowledge with a watch woken by its writes'
+	)
+	argParser.add_argument('--agents', type=int, default=200, help='idle drones waiting for the deliveries')
+	argParser.add_argument('--deliveries', type=int, default=3, help='deliveries the drones wait for')
+	argParser.add_argument('--pause', type=float, default=0.5, help='seconds between two deliveries')
+	argParser.add_argument('--period', type=float, default=0.001, help='seconds between two polls')
+	args = argParser.parse_args()
+
+	print(f'{args.agents} drones waiting for {args.deliveries} deliveries, {args.pause:.1f} s apart, '
+		  f'polled every {args.period * 1000:.1f} ms')
+	for name, waiter in (('get', poll), ('watch', watch)):
+		cpu, latency = run(waiter, args.agents, args.deliveries, args.pause, args.period)
+		print(f'{name:>5}: {cpu:6.2f} s CPU, woken {latency * 1000:6.2f} ms after the last delivery')
+
+
+if __name__ == '__main__':
+	main()
@@ -461,6 +461,26 @@ class ASTVisualizer(NodeVisitor):
 			s = '  node{} -> node{}\n'.format(node._num, child_node._num)
 			self.dot_body.append(s)
 
+	def statement(self, node, label, children):
+		s = '  node{} [label="{}"]\n'.format(self.ncount, label)
+		self.dot_body.append(s)
+		node._num = self.ncount
+		self.ncount += 1
+		for child_node in children:
+			self.visit(child_node)
+		for child_node in children:
+			s = '  node{} -> node{}\n'.format(node._num, child_node._num)
+			self.dot_body.append(s)
+
+	def visit_Assign(self, node):
+		self.statement(node, node.token.value, (node.left, node.right))
+
+	def visit_Put(self, node):
+		self.statement(node, node.token.value, (node.value, node.knowledge))
+
+	def visit_Get(self, node):
+		self.statement(node, node.token.value, (node.var, node.knowledge))
+
 	def visit_UnaryOp(self, node):
 		s = '  node{} [label="unary {}"]\n'.format(self.ncount, node.op.value)
 		self.dot_body.append(s)
@@ -0,0 +1,455 @@
+import asyncio
+import concurrent.futures
+import threading
+
+from base.ast import AST
+from base.error import ErrorCode
+from interpreter import clock
+from interpreter.clock import VirtualClock, VirtualTimeLoop
+from interpreter.context import ExecutionContext, call_api_async
+from interpreter.goalWatch import DEFAULT_GOAL_INTERVAL, DEFAULT_GOAL_PERIOD, GoalWatch
+from interpreter.interpreter import Interpreter, LogLock
+from interpreter.memory import ARType, ActivationRecord
+from parser.element import (Behavior, Compound, FunctionCall, Knowledge, KnowledgeQueue, LibraryCall, Main,
+							Program, Task, TaskCall, TaskEach, TaskOrder)
+from parser.operator import Get, Modify, Put, Watch
+from semanticAnalyzer.semanticAnalyzer import children
+from semanticAnalyzer.symbol import SymbolCategory
+
+SUSPENDING_NODES = (Program, Main, TaskCall, Task, Behavior, FunctionCall, LibraryCall, TaskOrder, TaskEach)
+
+
+def suspending_nodes(tree):
+	"""ids of the nodes whose evaluation may await: calls, KnowledgeQueues, knowledge locks and their ancestors."""
+	found = set()
+
+	def mark(node):
+		suspends = False
+		for value in children(node):
+			for item in (value if isinstance(value, list) else [value]):
+				if isinstance(item, AST) and mark(item):
+					suspends = True
+		if isinstance(node, SUSPENDING_NODES):
+			suspends = True
+		elif isinstance(node, (Put, Get)) and isinstance(node.knowledge, KnowledgeQueue):
+			suspends = True
+		elif isinstance(node, Modify) and not node.locked:
+			suspends = True
+		elif isinstance(node, Watch):
+			suspends = True
+		elif isinstance(node, Compound) and node.knowledge:
+			suspends = True
+		if suspends:
+			found.add(id(node))
+		return suspends
+
+	mark(tree)
+	return found
+
+
+async def gather(coroutines):
+	"""Run the coroutines as tasks, the first exception cancels the others and is raised."""
+	tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+	try:
+		await asyncio.gather(*tasks)
+	except BaseException:
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
+		raise
+
+
+class AsyncInterpreter(Interpreter):
+	"""Interpreter running every agent and routine as a coroutine on one asyncio event loop.
+
+	Nodes that may wait are visited by the avisit_ methods: calls, KnowledgeQueue
+	put/get and Compounds locking Knowledge. The other nodes are evaluated by the
+	visit_ methods of Interpreter. A routine yields to the others after every round.
+	`async def` library APIs are awaited, the others run in a thread pool of
+	`workers` threads as they may block. With `virtual_time` the loop runs on
+	a VirtualClock, the sleeps of the routines, libraries and platform take no
+	real time.
+	"""
+	_async_dispatch = {}
+
+	def __init__(self, tree, log_or_not=False, workers=None, goal_interval=DEFAULT_GOAL_INTERVAL,
+				 goal_period=DEFAULT_GOAL_PERIOD, virtual_time=False):
+		super().__init__(
+			tree, log_or_not=log_or_not, workers=workers, goal_interval=goal_interval, goal_period=goal_period
+		)
+		self.workers = self.scheduler.workers
+		self.clock = VirtualClock() if virtual_time else None
+		self.suspending = set()
+		self.executor = None
+		self.queue_conditions = {}		# KnowledgeQueue name -> asyncio.Condition notified by put
+		self.knowledge_changed = None	# asyncio.Event set by a write of the Knowledge, and replaced
+
+	async def avisit(self, node, ctx=None):
+		if id(node) not in self.suspending:
+			return self.visit(node, ctx)
+		try:
+			visitor = self._async_dispatch[type(node)]
+		except KeyError:
+			visitor = self._async_dispatch[type(node)] = getattr(type(self), 'avisit_' + type(node).__name__, None)
+		if visitor is None:
+			return self.visit(node, ctx)
+		return await visitor(self, node, ctx)
+
+	def log_stack(self, call_stack, msg=None):
+		if self.log_or_not:
+			with LogLock:
+				if msg is not None:
+					self.log(msg)
+				self.log(str(call_stack))
+
+	async def avisit_Program(self, node, ctx=None):
+		self.visit(node.platform)
+		call_stack = self.call_stack
+
+		self.log('ENTER: Program')
+		call_stack.push(ActivationRecord(
+			name='Program', category=ARType.PROGRAM, nesting_level=0, knowledge=node.knowledge, lock_type=asyncio.Lock,
+			queues=node.queues,
+		))
+		self.knowledge = call_stack.peek().knowledge
+		self.knowledge_changed = asyncio.Event()
+		self.knowledge.listeners.append(self.notify_knowledge_changed)
+		await self.avisit(node.main, ExecutionContext(
+			wrapper=self.wrapper, call_stack=call_stack, goal_interval=self.goal_interval, goal_period=self.goal_period
+		))
+		self.log_stack(call_stack)
+		call_stack.pop()
+		self.log_stack(call_stack, 'LEAVE: Program')
+
+	async def avisit_Main(self, node, ctx):
+		call_stack = ctx.call_stack
+		call_stack.push(ActivationRecord(
+			name='Main',
+			category=ARType.MAIN,
+			nesting_level=call_stack.get_base_level() + len(call_stack._records),
+			layout=node.layout,
+		))
+		self.log('ENTER: Main')
+		for agent_call_node in node.agent_call_list.children:
+			self.visit(agent_call_node, ctx)
+		self.log_stack(call_stack)
+
+		goal_reached = {'Tasks': {}, 'Behaviors': {}}
+		await self.avisit(node.task_call, ctx.replace(goal_reached=goal_reached))
+		self.log_stack(call_stack)
+		call_stack.pop()
+		self.log_stack(call_stack, 'LEAVE: Main')
+
+	async def avisit_TaskCall(self, node, ctx):
+		call_stack = ctx.call_stack
+		call_stack.push(self.task_record(node, ctx))
+		self.log_stack(call_stack, f'ENTER: Task {node.name}')
+		await self.avisit(node.symbol.ast, ctx)
+		call_stack.pop()
+		self.log_stack(call_stack, f'LEAVE: Task {node.name}')
+
+	async def avisit_Task(self, node, ctx):
+		my_goal_reached = threading.Event()
+		ctx.goal_reached['Tasks'][node.name] = my_goal_reached
+		await self.avisit(node.init_block, ctx)
+		await self.run_routines_async(node, ctx, node.name, my_goal_reached)
+
+	async def avisit_Behavior(self, node, ctx):
+		my_goal_reached = threading.Event()
+		ctx.goal_reached['Behaviors'].setdefault(node.name, {})[ctx.vehicle_name] = my_goal_reached
+		await self.avisit(node.init_block, ctx)
+		await self.run_routines_async(node, ctx, ctx.vehicle_name, my_goal_reached)
+
+	async def run_routines_async(self, node, ctx, stack_name, my_goal_reached):
+		goal_watch = GoalWatch.of(node.goal_block, ctx)
+
+		async def routine(child, child_ctx, goal_ctx):
+			delay = 0 if child.children else goal_watch.period		# an empty routine waits for the next goal check
+			while True:
+				await self.avisit(child, child_ctx)
+				await asyncio.sleep(delay)		# let the other routines and agents run a round
+				if my_goal_reached.is_set():
+					break
+				if goal_watch.due(goal_ctx) and await self.avisit(node.goal_block, goal_ctx):
+					my_goal_reached.set()
+					break
+
+		child_call_stacks = [ctx.call_stack.create_child(stack_name) for _ in node.routine_block.children]
+		goal_call_stacks = [ctx.call_stack.create_child(stack_name) for _ in node.routine_block.children]
+		try:
+			await gather(
+				routine(child, ctx.replace(call_stack=child_call_stack), ctx.replace(call_stack=goal_call_stack))
+				for child, child_call_stack, goal_call_stack
+				in zip(node.routine_block.children, child_call_stacks, goal_call_stacks)
+			)
+		finally:
+			for child_call_stack in child_call_stacks + goal_call_stacks:
+				child_call_stack.back_to_parent()
+
+	async def avisit_FunctionCall(self, node, ctx):
+		call_stack = ctx.call_stack
+		function_symbol = node.symbol
+		args = [await self.avisit(argument_node, ctx) for argument_node in node.actual_params]
+		call_stack.push(self.function_record(node, ctx, args))
+
+		is_action = function_symbol.category == SymbolCategory.ACTION
+		category = 'Action' if is_action else 'Behavior'
+		self.log_stack(call_stack, f'{ctx.vehicle_name} ENTER: {category} {node.name}')
+		if is_action and node.name not in self.agent_abilities[ctx.agent]:
+			self.error(error_code=ErrorCode.ABILITIY_NOT_DEFINE_IN_AGENT, token=node.token)
+
+		await self.avisit(function_symbol.ast, ctx)
+		call_stack.pop()
+		self.log_stack(call_stack, f'LEAVE: {category} {node.name}')
+
+	async def avisit_Action(self, node, ctx):
+		await self.avisit(node.compound_statement, ctx)
+
+	async def avisit_TaskOrder(self, node, ctx):
+		agent_s_e, start, end = self.visit(node.agent_range, ctx)
+		for now in range(start, end):
+			await self.avisit(node.function_call_statements, ctx.replace(agent=agent_s_e[0], id=now))
+
+	async def avisit_TaskEach(self, node, ctx):
+		agent_s_e, start, end = self.visit(node.agent_range, ctx)
+		child_call_stacks = [ctx.call_stack.create_child(f'{agent_s_e[0]}:{now}') for now in range(start, end)]
+		try:
+			await gather(
+				self.avisit(node.function_call_statements, ctx.replace(call_stack=child_call_stack, agent=agent_s_e[0], id=now))
+				for now, child_call_stack in zip(range(start, end), child_call_stacks)
+			)
+		finally:
+			for child_call_stack in child_call_stacks:
+				child_call_stack.back_to_parent()
+
+	async def avisit_InitBlock(self, node, ctx):
+		await self.avisit(node.compound_statement, ctx)
+
+	async def avisit_GoalBlock(self, node, ctx):
+		await self.avisit(node.statements, ctx)
+		result = await self.avisit(node.goal, ctx)
+		if result == None:
+			return True
+		return result
+
+	async def avisit_Compound(self, node, ctx):
+		call_stack = ctx.call_stack
+
+		# knowledge locks are asyncio.Locks, a routine may wait while holding them. A compound that only gets
+		# knowledge reads a snapshot, under the locks only if a suspended writer holds it
+		knowledge_names, puts = node.knowledge, node.knowledge_puts
+		get_ctx = ctx
+		locks = []		# acquired, released even if the routine is cancelled while it waits for the next one
+		writing = False
+		try:
+			if knowledge_names:
+				store = call_stack.bottom().knowledge
+				snapshot = None if puts else store.try_snapshot(knowledge_names)
+				if snapshot is None:
+					for knowledge_name in knowledge_names:
+						lock = store.locks[knowledge_name]
+						await lock.acquire()
+						locks.append(lock)
+				if puts:
+					store.begin_write(puts)
+					writing = True
+				else:
+					if snapshot is None:
+						snapshot = {knowledge_name: store.get(knowledge_name) for knowledge_name in knowledge_names}
+						while locks:
+							locks.pop().release()
+					get_ctx = ctx.replace(snapshot=snapshot)
+
+			for child in node.children:
+				current_level = call_stack.peek()
+				if current_level.category == ARType.TASK:
+					if ctx.goal_reached['Tasks'][current_level.name].is_set():
+						break
+				elif current_level.category == ARType.BEHAVIOR:
+					if ctx.goal_reached['Behaviors'][current_level.name][ctx.vehicle_name].is_set():
+						break
+				await self.avisit(child, get_ctx if isinstance(child, Get) else ctx)
+				self.log_stack(call_stack)
+		finally:
+			if writing:
+				store.end_write(puts)
+			for lock in reversed(locks):
+				lock.release()
+
+	async def avisit_IfElse(self, node, ctx):
+		if await self.avisit(node.expression, ctx):
+			await self.avisit(node.true_compound, ctx)
+		elif node.false_compound is not None:
+			await self.avisit(node.false_compound, ctx)
+
+	async def avisit_Return(self, node, ctx):
+		self.return_value = await self.avisit(node.expression, ctx)
+
+	async def avisit_Expression(self, node, ctx):
+		return await self.avisit(node.expr, ctx)
+
+	async def avisit_BinOp(self, node, ctx):
+		return node.fn(await self.avisit(node.left, ctx), await self.avisit(node.right, ctx))
+
+	async def avisit_UnaryOp(self, node, ctx):
+		return node.fn(await self.avisit(node.expr, ctx))
+
+	async def avisit_LibraryCall(self, node, ctx):
+		attr = self.library_attr(node, ctx)
+		if node.arguments is None:
+			return attr
+		args = [await self.avisit(arg, ctx) for arg in node.arguments]
+		return await call_api_async(attr, args, ctx, self.executor)
+
+	async def avisit_Assign(self, node, ctx):
+		if isinstance(node.right, FunctionCall):
+			await self.avisit(node.right, ctx)
+			var_value = self.return_value
+		else:
+			var_value = await self.avisit(node.right, ctx)
+		ctx.call_stack.peek().slots[node.left.slot] = var_value
+
+	def queue_condition(self, knowledge_queue):
+		condition = self.queue_conditions.get(knowledge_queue)
+		if condition is None:
+			condition = self.queue_conditions[knowledge_queue] = asyncio.Condition()
+		return condition
+
+	async def avisit_Put(self, node, ctx):
+		knowledge_name = node.knowledge.value
+		expr_value = await self.avisit(node.value, ctx)
+		ar = ctx.call_stack.bottom()
+		if isinstance(node.knowledge, Knowledge):
+			ar.put_knowledge(knowledge=knowledge_name, value=expr_value)
+		else:	# isinstance(node.knowledge, KnowledgeQueue), wait for room without blocking the event loop
+			values = list(expr_value) if node.each else [expr_value]
+			queue = ar.knowledge.queues[knowledge_name]
+			condition = self.queue_condition(knowledge_name)
+			async with condition:
+				count = queue.try_put(values)
+				condition.notify_all()
+				if count < len(values):
+					start = clock.now()
+					while count < len(values):
+						await condition.wait_for(lambda: not queue.full())
+						count += queue.try_put(values[count:])
+						condition.notify_all()
+					queue.waited(clock.now() - start, getting=False)
+
+	async def avisit_Get(self, node, ctx):
+		knowledge_name = node.knowledge.value
+		ar = ctx.call_stack.bottom()
+		if isinstance(node.knowledge, Knowledge):
+			if ctx.snapshot is None:
+				var_value = ar.get_knowledge(knowledge=knowledge_name)
+			else:
+				var_value = ctx.snapshot[knowledge_name]
+		else:	# isinstance(node.knowledge, KnowledgeQueue), wait for an item without blocking the event loop
+			limit = 1 if node.limit is None else node.limit
+			queue = ar.knowledge.queues[knowledge_name]
+			condition = self.queue_condition(knowledge_name)
+			async with condition:
+				items = queue.try_get(limit)
+				if not items and node.timeout != 0:
+					start = clock.now()
+					try:
+						await asyncio.wait_for(condition.wait_for(lambda: len(queue)), node.timeout)
+						items = queue.try_get(limit)
+					except asyncio.TimeoutError:
+						pass
+					queue.waited(clock.now() - start)
+				if items:
+					condition.notify_all()		# room for the producers
+			if not items and node.default is not None:
+				var_value = await self.avisit(node.default, ctx)
+			else:
+				var_value = items if node.limit is not None else items[0]
+		if var_value is None:
+			self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.knowledge.token)
+		ctx.call_stack.peek().slots[node.var.slot] = var_value
+
+	def notify_knowledge_changed(self):
+		event, self.knowledge_changed = self.knowledge_changed, asyncio.Event()
+		event.set()
+
+	async def written(self, store, knowledge_name, version):
+		"""Return once knowledge_name was written since `version`, see KnowledgeStore.watch."""
+		store.watchers += 1
+		try:
+			while not store.written(knowledge_name, version):
+				await self.knowledge_changed.wait()
+		finally:
+			store.watchers -= 1
+
+	async def avisit_Watch(self, node, ctx):
+		# KnowledgeStore.watch, sleeping on the event loop instead of a thread
+		knowledge_name = node.knowledge.value
+		names = (knowledge_name,)
+		slots = ctx.call_stack.peek().slots
+		store = ctx.call_stack.bottom().knowledge
+		deadline = None if node.timeout is None else clock.now() + node.timeout
+		changed = node.condition is None
+		while True:
+			version = store.versions[knowledge_name]
+			if not changed:
+				snapshot = store.try_snapshot(names)
+				if snapshot is not None and snapshot[knowledge_name] is not None:
+					slots[node.var.slot] = snapshot[knowledge_name]
+					if node.condition is None or await self.avisit(node.condition, ctx):
+						return
+			changed = False
+			remaining = None if deadline is None else deadline - clock.now()
+			if remaining is not None and remaining <= 0:
+				break
+			try:
+				await asyncio.wait_for(self.written(store, knowledge_name, version), remaining)
+			except asyncio.TimeoutError:
+				break
+		var_value = store.get(knowledge_name)		# timed out
+		if var_value is None:
+			self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.knowledge.token)
+		slots[node.var.slot] = var_value
+
+	async def avisit_Modify(self, node, ctx):
+		# under the asyncio.Lock of the name, unless the Compound holds it
+		knowledge_name = node.knowledge.value
+		store = ctx.call_stack.bottom().knowledge
+		if node.locked:
+			await self.modify(node, ctx, store)
+			return
+		async with store.locks[knowledge_name]:
+			store.begin_write((knowledge_name,))
+			try:
+				await self.modify(node, ctx, store)
+			finally:
+				store.end_write((knowledge_name,))
+
+	async def modify(self, node, ctx, store):
+		knowledge_name = node.knowledge.value
+		var_value = store.get(knowledge_name)
+		if var_value is None:
+			self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.knowledge.token)
+		ctx.call_stack.peek().slots[node.var.slot] = var_value
+		if node.guard is None or await self.avisit(node.guard, ctx):
+			store.put(knowledge_name, await self.avisit(node.value, ctx))
+
+	def interpret(self):
+		tree = self.tree
+		if tree is None:
+			return ''
+		self.suspending = suspending_nodes(tree)
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+		if self.clock is None:
+			try:
+				return asyncio.run(self.avisit(tree))
+			finally:
+				self.executor.shutdown(wait=False, cancel_futures=True)
+		loop = VirtualTimeLoop(self.clock)
+		previous = clock.use(self.clock)
+		try:
+			return loop.run_until_complete(self.avisit(tree))
+		finally:
+			clock.use(previous)
+			self.executor.shutdown(wait=False, cancel_futures=True)
+			loop.run_until_complete(loop.shutdown_asyncgens())
+			loop.close()
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import selectors
+import threading
+import time
+
+
+class WallClock(object):
+	"""Real time, for every engine unless the run asks for virtual time."""
+
+	def now(self):
+		return time.monotonic()
+
+	def sleep(self, seconds):
+		time.sleep(seconds)
+
+	def running(self):
+		return contextlib.nullcontext()
+
+
+class VirtualClock(object):
+	"""Simulated time of a run on the event loop of a VirtualTimeLoop, for --virtual-time.
+
+	Time stands still while the loop has work or a library call runs in a
+	thread, see running(). When every coroutine waits for a timer, the loop
+	jumps to the first one instead of sleeping, so the events keep their
+	order and the mission takes no longer than its computations. sleep()
+	waits for a timer of the loop, from the threads of the library calls, and
+	moves the time forward on the thread of the loop, where nothing else runs.
+	"""
+
+	def __init__(self):
+		self.time = 0.0
+		self.lock = threading.Lock()
+		self.busy = 0			# library calls running in a thread, not sleeping
+		self.loop = None
+		self.loop_thread = None
+
+	def now(self):
+		return self.time
+
+	def advance(self, seconds):
+		self.time += seconds
+
+	@contextlib.contextmanager
+	def running(self):
+		"""Around the await of a library call run in a thread, on the thread of the loop."""
+		with self.lock:
+			self.busy += 1
+		try:
+			yield
+		finally:
+			with self.lock:
+				self.busy -= 1
+
+	def sleep(self, seconds):
+		if self.loop is None or threading.get_ident() == self.loop_thread:
+			self.advance(seconds)
+			return
+		woken = threading.Event()
+
+		def wake():
+			with self.lock:
+				self.busy += 1		# before the loop runs again
+			woken.set()
+
+		loop = self.loop
+		# the time cannot move while this thread is busy, the timer is due `seconds` from now
+		loop.call_soon_threadsafe(loop.call_at, self.time + seconds, wake)
+		with self.lock:
+			self.busy -= 1
+		loop.call_soon_threadsafe(lambda: None)		# the loop may wait for this thread
+		woken.wait()
+
+
+class VirtualTimeSelector(selectors.DefaultSelector):
+	"""Selector of a VirtualTimeLoop, moving the VirtualClock instead of waiting for the next timer."""
+
+	def __init__(self, clock):
+		super().__init__()
+		self.clock = clock
+
+	def select(self, timeout=None):
+		if timeout is not None and timeout <= 0:
+			return super().select(timeout)
+		busy = self.clock.busy		# read first, a thread wakes the loop before it stops being busy
+		events = super().select(0)
+		if events:
+			return events
+		if busy or timeout is None:
+			return super().select(None)		# woken by the threads of the library calls
+		self.clock.advance(timeout)
+		return []
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+	"""Event loop whose time() is a VirtualClock."""
+
+	def __init__(self, clock):
+		self.clock = clock
+		super().__init__(VirtualTimeSelector(clock))
+		clock.loop = self
+		clock.loop_thread = threading.get_ident()
+
+	def time(self):
+		return self.clock.now()
+
+
+_clock = WallClock()
+
+
+def use(clock):
+	"""Make clock the one of now() and sleep(), return the previous one."""
+	global _clock
+	previous, _clock = _clock, clock
+	return previous
+
+
+def current():
+	return _clock
+
+
+def now():
+	return _clock.now()
+
+
+def sleep(seconds):
+	"""time.sleep for the libraries and the platform, simulated in a run with virtual time."""
+	_clock.sleep(seconds)
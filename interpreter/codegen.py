@@ -0,0 +1,528 @@
+from base.error import ErrorCode, InterpreterError
+from base.nodeVisitor import NodeVisitor
+from interpreter.compiler import call_library, run_each, run_order, run_routine
+from interpreter.goalWatch import DEFAULT_GOAL_INTERVAL, DEFAULT_GOAL_PERIOD
+from interpreter.interpreter import Interpreter, LogLock
+from interpreter.memory import ARType, ActivationRecord
+from lexer.token import Token, TokenType
+from parser.element import FunctionCall, IfElse, Knowledge, KnowledgeQueue, LibraryCall, TaskCall
+from parser.operator import Assign, Get, Modify, Watch, logical_and, logical_or
+from semanticAnalyzer.symbol import SymbolCategory
+
+BINARY_OPERATORS = {
+	TokenType.PLUS: '+',
+	TokenType.MINUS: '-',
+	TokenType.MUL: '*',
+	TokenType.DIV: '//',
+	TokenType.MOD: '%',
+	TokenType.LESS: '<',
+	TokenType.GREATER: '>',
+	TokenType.LESS_EQUAL: '<=',
+	TokenType.GREATER_EQUAL: '>=',
+	TokenType.IS_EQUAL: '==',
+	TokenType.NOT_EQUAL: '!=',
+}
+
+CALLED_OPERATORS = {	# operands of and/or are both evaluated, as by the tree-walker
+	TokenType.AND: '_logical_and',
+	TokenType.OR: '_logical_or',
+}
+
+UNARY_OPERATORS = {
+	TokenType.PLUS: '+',
+	TokenType.MINUS: '-',
+	TokenType.NOT: 'not ',
+}
+
+
+def task_calls(tree):
+	"""TaskCall nodes inside Task bodies, in the order the CodeGenerator numbers them."""
+	calls = []
+	stack = [task for task in reversed(tree.task_list.children)]
+	while stack:
+		node = stack.pop()
+		if isinstance(node, TaskCall):
+			calls.append(node)
+		elif isinstance(node, IfElse):
+			stack.extend(c for c in (node.false_compound, node.true_compound) if c is not None)
+		elif hasattr(node, 'children'):
+			stack.extend(reversed(node.children))
+		elif hasattr(node, 'routine_block'):
+			stack.extend([node.routine_block, node.goal_block.statements, node.init_block.compound_statement])
+	return calls
+
+
+def routines(tree):
+	"""Behavior and Task nodes, in the order the CodeGenerator numbers them."""
+	return tree.behavior_list.children + tree.task_list.children
+
+
+class CodeGenerator(NodeVisitor):
+	"""Translate the analyzed AST into the source of a Python module.
+
+	Every Action becomes a function whose Swarm variables are Python locals,
+	expressions become native Python expressions. Variables of Behaviors and
+	Tasks stay in their ActivationRecord, shared by the parallel routines,
+	each of their Compounds becomes a function that returns once the goal is
+	reached. The module runs with the names set up by GeneratedInterpreter.
+	"""
+
+	def __init__(self, tree):
+		self.tree = tree
+		self.names = {}			# Action/Behavior/Task name -> function name
+		self.definitions = []
+		self.lines = None
+		self.indent = 0
+		self.scope = None		# (ARType, name) of the Behavior or Task, None inside an Action
+		self.locals = {}		# Swarm variable -> Python local, inside an Action
+		self.depth = 0
+		self.snapshot = None	# local holding the Knowledge snapshot of the Compound being emitted
+		self.count = 0
+		self.task_calls = {id(node): index for index, node in enumerate(task_calls(tree))}
+		self.routines = {id(node): index for index, node in enumerate(routines(tree))}
+
+	def generate(self):
+		tree = self.tree
+		for prefix, nodes in (('action', tree.action_list.children), ('behavior', tree.behavior_list.children), ('task', tree.task_list.children)):
+			for node in nodes:
+				self.names[node.name] = f'_{prefix}_{len(self.names)}'
+		for node in tree.action_list.children + tree.behavior_list.children + tree.task_list.children:
+			self.visit(node)
+		tasks = ', '.join(f'{task.name!r}: {self.names[task.name]}' for task in tree.task_list.children)
+		self.definitions.append(f'TASKS = {{{tasks}}}\n')
+		return '\n'.join(self.definitions)
+
+	def emit(self, line):
+		self.lines.append('\t' * self.indent + line)
+
+	def begin(self, header, comment=None):
+		"""Start a new function, return the enclosing one to end() with."""
+		enclosing = (self.lines, self.indent, self.depth)
+		self.lines, self.indent, self.depth = [], 0, 0
+		self.emit(header)
+		self.indent = 1
+		if comment is not None:
+			self.emit(f'# {comment}')
+		return enclosing
+
+	def end(self, enclosing):
+		self.definitions.append('\n'.join(self.lines) + '\n')
+		self.lines, self.indent, self.depth = enclosing
+
+	def counter(self):
+		self.count += 1
+		return self.count
+
+	@staticmethod
+	def position(token):
+		return f'{token.value!r}, {token.lineno!r}, {token.column!r}'
+
+	# Actions, Behaviors and Tasks
+
+	def visit_Action(self, node):
+		self.scope = None
+		self.locals = {}
+		params = []
+		for param in node.formal_params.children:
+			params.append(self.local(param.value))
+		for name in self.assigned(node.compound_statement):
+			self.local(name)
+		enclosing = self.begin(f'def {self.names[node.name]}({", ".join(["_ctx"] + params)}):', f'Action {node.name}')
+		for name, local in self.locals.items():
+			if local not in params:
+				self.emit(f'{local} = None')
+		self.inline_compound(node.compound_statement)
+		self.end(enclosing)
+
+	def local(self, name):
+		if name not in self.locals:
+			self.locals[name] = f'v_{name}' if name.isascii() else f'v{len(self.locals)}'
+		return self.locals[name]
+
+	def assigned(self, compound):
+		"""Names of the variables assigned by the statements of an Action body."""
+		names = []
+		for statement in compound.children:
+			if isinstance(statement, Assign):
+				names.append(statement.left.value)
+			elif isinstance(statement, (Get, Modify, Watch)):
+				names.append(statement.var.value)
+			elif isinstance(statement, IfElse):
+				names.extend(self.assigned(statement.true_compound))
+				if statement.false_compound is not None:
+					names.extend(self.assigned(statement.false_compound))
+		return names
+
+	def visit_Behavior(self, node):
+		self.routine(node, ARType.BEHAVIOR)
+
+	def visit_Task(self, node):
+		self.routine(node, ARType.TASK)
+
+	def routine(self, node, category):
+		self.scope = (category, node.name)
+		init = self.compound_function(node.init_block.compound_statement)
+		goal = self.goal_function(node.goal_block)
+		children = ''.join(f'{self.compound_function(child)}, ' for child in node.routine_block.children)
+		enclosing = self.begin(f'def {self.names[node.name]}(_ctx):', f'{category.value.capitalize()} {node.name}')
+		self.emit(f'_routine(_ctx, _routines[{self.routines[id(node)]}], {init}, {goal}, ({children}))')
+		self.end(enclosing)
+
+	def goal_function(self, node):
+		statements = self.compound_function(node.statements)
+		name = f'_goal_{self.counter()}'
+		enclosing = self.begin(f'def {name}(_ctx):')
+		self.emit(f'{statements}(_ctx)')
+		self.emit('_s = _ctx.call_stack.peek().slots')
+		self.emit(f'_r = {self.visit(node.goal)}')
+		self.emit('if _r == None:')
+		self.emit('\treturn True')
+		self.emit('return _r')
+		self.end(enclosing)
+		return name
+
+	# Compounds
+
+	def goal_check(self):
+		category, name = self.scope
+		if category == ARType.TASK:
+			return f"_ctx.goal_reached['Tasks'][{name!r}].is_set()"
+		return f"_ctx.goal_reached['Behaviors'][{name!r}][_ctx.vehicle_name].is_set()"
+
+	def compound_function(self, node):
+		"""Compound of a Behavior or Task as a function, returns its name."""
+		name = f'_compound_{self.counter()}'
+		enclosing = self.begin(f'def {name}(_ctx):')
+		self.emit('_s = _ctx.call_stack.peek().slots')
+		goal_check = self.goal_check()
+
+		def statement(child):
+			self.emit(f'if {goal_check}:')
+			self.emit('\treturn')
+			self.statement(child)
+		self.locked(node, statement)
+		self.end(enclosing)
+		return name
+
+	def inline_compound(self, node):
+		"""Compound of an Action, in the body of the enclosing function."""
+		if not node.children:
+			self.emit('pass')
+		self.locked(node, self.statement)
+
+	def locked(self, node, statement):
+		"""Emit the statements of a Compound holding the locks of its knowledge, or its snapshot, as visit_Compound."""
+		knowledge_names, puts = node.knowledge, tuple(sorted(node.knowledge_puts))
+		enclosing_snapshot, self.snapshot = self.snapshot, None
+		if knowledge_names and not puts:
+			self.snapshot = f'_snap{self.depth}'
+			self.emit(f'{self.snapshot} = _ctx.call_stack.bottom().knowledge.snapshot({knowledge_names!r})')
+		elif knowledge_names:
+			self.emit('_store = _ctx.call_stack.bottom().knowledge')
+			self.emit(f'_store.acquire({knowledge_names!r}, {puts!r})')
+			self.emit('try:')
+			self.indent += 1
+		self.depth += 1
+		for child in node.children:
+			statement(child)
+			self.emit('if _log:')
+			self.emit('\t_log_stack(_ctx)')
+		self.depth -= 1
+		if puts:
+			self.indent -= 1
+			self.emit('finally:')
+			self.emit(f'\t_store.release({knowledge_names!r}, {puts!r})')
+		self.snapshot = enclosing_snapshot
+
+	# Statements
+
+	def statement(self, node):
+		if isinstance(node, LibraryCall):
+			self.emit(self.visit(node))
+		else:
+			self.visit(node)
+
+	def store(self, var, value):
+		if self.scope is None:
+			self.emit(f'{self.local(var.value)} = {value}')
+		else:
+			self.emit(f'_s[{var.slot}] = {value}')
+
+	def visit_IfElse(self, node):
+		self.emit(f'if {self.visit(node.expression)}:')
+		self.block(node.true_compound)
+		if node.false_compound is not None:
+			self.emit('else:')
+			self.block(node.false_compound)
+
+	def block(self, compound):
+		self.indent += 1
+		if self.scope is None:
+			self.inline_compound(compound)
+		else:
+			self.emit(f'{self.compound_function(compound)}(_ctx)')
+		self.indent -= 1
+
+	def visit_Return(self, node):
+		self.emit(f'_interp.return_value = {self.visit(node.expression)}')
+
+	def visit_FunctionCall(self, node):
+		symbol = node.symbol
+		function = self.names[node.name]
+		args = [self.visit(arg) for arg in node.actual_params]
+		if symbol.category == SymbolCategory.BEHAVIOR:
+			params = ''.join(f'{symbol.ast.layout[param.name]!r}, ' for param in symbol.formal_params)
+			self.emit(f'_call_behavior(_ctx, {node.name!r}, ({params}), ({"".join(arg + ", " for arg in args)}), {function})')
+			return
+		temporaries = [f'_a{index}' for index in range(len(args))]
+		for temporary, arg in zip(temporaries, args):
+			self.emit(f'{temporary} = {arg}')
+		self.emit('if _log:')
+		self.emit(f"\t_enter(_ctx, 'Action', {node.name!r})")
+		self.emit(f"if {node.name!r} not in _abilities[_ctx.agent]:")
+		self.emit(f'\t_no_ability({self.position(node.token)})')
+		self.emit(f'{function}(_ctx{"".join(", " + t for t in temporaries)})')
+		self.emit('if _log:')
+		self.emit(f"\t_leave(_ctx, 'Action', {node.name!r})")
+
+	def visit_TaskCall(self, node):
+		self.emit(f'_task_call(_ctx, {self.task_calls[id(node)]})')
+
+	def visit_TaskOrder(self, node):
+		self.emit(f'_order(_ctx, {self.visit(node.agent_range)}, {self.compound_function(node.function_call_statements)})')
+
+	def visit_TaskEach(self, node):
+		self.emit(f'_each(_ctx, {self.visit(node.agent_range)}, {self.compound_function(node.function_call_statements)})')
+
+	def visit_AgentRange(self, node):
+		return f'({self.visit(node.agent)}, {self.visit(node.start)}, {self.visit(node.end)})'
+
+	def visit_Assign(self, node):
+		if isinstance(node.right, FunctionCall):
+			self.visit(node.right)
+			self.store(node.left, '_interp.return_value')
+		else:
+			self.store(node.left, self.visit(node.right))
+
+	def visit_Put(self, node):
+		if isinstance(node.knowledge, Knowledge):
+			self.emit(f'_ctx.call_stack.bottom().put_knowledge({node.knowledge.value!r}, {self.visit(node.value)})')
+			return
+		values = f'list({self.visit(node.value)})' if node.each else f'[{self.visit(node.value)}]'
+		self.emit(f'_queue = _ctx.call_stack.bottom().knowledge.queues[{node.knowledge.value!r}]')
+		self.emit('if _queue.capacity:')		# waits for room
+		self.emit('\twith _ctx.blocking():')
+		self.emit(f'\t\t_queue.put({values})')
+		self.emit('else:')
+		self.emit(f'\t_queue.put({values})')
+
+	def visit_Get(self, node):
+		if isinstance(node.knowledge, KnowledgeQueue):
+			limit = 1 if node.limit is None else node.limit
+			self.emit(f'_queue = _ctx.call_stack.bottom().knowledge.queues[{node.knowledge.value!r}]')
+			if node.timeout == 0:
+				self.emit(f'_items = _queue.get({limit}, 0)')
+			else:
+				self.emit('with _ctx.blocking():')
+				self.emit(f'\t_items = _queue.get({limit}, {node.timeout!r})')
+			got = '_items[0]' if node.limit is None else '_items'
+			if node.default is None:
+				self.emit(f'_v = {got}')
+			else:
+				self.emit(f'_v = {got} if _items else {self.visit(node.default)}')
+		elif self.snapshot is not None:
+			self.emit(f'_v = {self.snapshot}[{node.knowledge.value!r}]')
+		else:
+			self.emit(f'_v = _ctx.call_stack.bottom().get_knowledge({node.knowledge.value!r})')
+		self.emit('if _v is None:')
+		self.emit(f'\t_undefined({self.position(node.knowledge.token)})')
+		self.store(node.var, '_v')
+
+	def visit_Modify(self, node):
+		"""The write lock of the Knowledge around the statement, unless the Compound holds it, see KnowledgeStore.update."""
+		knowledge_name = node.knowledge.value
+		self.emit('_store = _ctx.call_stack.bottom().knowledge')
+		if not node.locked:
+			self.emit(f'_store.acquire(({knowledge_name!r},), ({knowledge_name!r},))')
+			self.emit('try:')
+			self.indent += 1
+		self.emit(f'_v = _store.get({knowledge_name!r})')
+		self.emit('if _v is None:')
+		self.emit(f'\t_undefined({self.position(node.knowledge.token)})')
+		self.store(node.var, '_v')
+		if node.guard is not None:
+			self.emit(f'if {self.visit(node.guard)}:')
+			self.indent += 1
+		self.emit(f'_store.put({knowledge_name!r}, {self.visit(node.value)})')
+		if node.guard is not None:
+			self.indent -= 1
+		if not node.locked:
+			self.indent -= 1
+			self.emit('finally:')
+			self.emit(f'\t_store.release(({knowledge_name!r},), ({knowledge_name!r},))')
+
+	def visit_Watch(self, node):
+		"""A loop over KnowledgeStore.watch, its else clause for a timeout, as visit_Watch."""
+		knowledge_name = node.knowledge.value
+		self.emit('_store = _ctx.call_stack.bottom().knowledge')
+		self.emit('with _ctx.blocking():')
+		self.indent += 1
+		self.emit(f'for _v in _store.watch({knowledge_name!r}, {node.timeout!r}, {node.condition is None!r}):')
+		self.indent += 1
+		self.emit('if _v is None:')
+		self.emit('\tcontinue')
+		self.store(node.var, '_v')
+		if node.condition is None:
+			self.emit('break')
+		else:
+			self.emit(f'if {self.visit(node.condition)}:')
+			self.emit('\tbreak')
+		self.indent -= 1
+		self.emit('else:')
+		self.indent += 1
+		self.emit(f'_v = _store.get({knowledge_name!r})')
+		self.emit('if _v is None:')
+		self.emit(f'\t_undefined({self.position(node.knowledge.token)})')
+		self.store(node.var, '_v')
+		self.indent -= 2
+
+	# Expressions
+
+	def visit_BinOp(self, node):
+		category = node.op.category
+		if category in CALLED_OPERATORS:
+			return f'{CALLED_OPERATORS[category]}({self.visit(node.left)}, {self.visit(node.right)})'
+		return f'({self.visit(node.left)} {BINARY_OPERATORS[category]} {self.visit(node.right)})'
+
+	def visit_UnaryOp(self, node):
+		return f'({UNARY_OPERATORS[node.op.category]}{self.visit(node.expr)})'
+
+	def visit_Expression(self, node):
+		return self.visit(node.expr)
+
+	def visit_LibraryCall(self, node):
+		postfixes = ''.join(f'{postfix.value!r}, ' for postfix in node.postfixes)
+		args = 'None'
+		if node.arguments is not None:
+			args = '(' + ''.join(f'{self.visit(arg)}, ' for arg in node.arguments) + ')'
+		return f'_library_call(_ctx, {node.library.value!r}, ({postfixes}), {args})'
+
+	def visit_Var(self, node):
+		position = self.position(node.token)
+		if self.scope is not None:
+			if node.slot is None:
+				return f'_undefined({position})'
+			return f'(_v if (_v := _s[{node.slot}]) is not None else _undefined({position}))'
+		local = self.locals.get(node.value)
+		if local is None:
+			return f'_undefined({position})'
+		return f'({local} if {local} is not None else _undefined({position}))'
+
+	def constant(self, node):
+		return repr(node.value)
+
+	visit_Boolean = visit_Num = visit_String = constant
+
+	def visit_NoOp(self, node):
+		return 'None'
+
+
+def undefined(name, lineno, column):
+	token = Token(TokenType.ID, name, lineno, column)
+	error_code = ErrorCode.ID_NOT_FOUND
+	raise InterpreterError(error_code=error_code, token=token, message=f'{error_code.value} -> {token}')
+
+
+def no_ability(name, lineno, column):
+	token = Token(TokenType.ID, name, lineno, column)
+	error_code = ErrorCode.ABILITIY_NOT_DEFINE_IN_AGENT
+	raise InterpreterError(error_code=error_code, token=token, message=f'{error_code.value} -> {token}')
+
+
+def generate(tree):
+	"""Compile the module generated for tree into a code object."""
+	return compile(CodeGenerator(tree).generate(), '<swarm>', 'exec')
+
+
+class GeneratedInterpreter(Interpreter):
+	"""Interpreter that runs the Tasks, Behaviors and Actions as generated Python code.
+
+	Actions keep their variables in Python locals, so --stack shows no
+	ActivationRecord for them.
+	"""
+
+	def __init__(self, tree, log_or_not=False, code=None, workers=None, goal_interval=DEFAULT_GOAL_INTERVAL,
+				 goal_period=DEFAULT_GOAL_PERIOD):
+		super().__init__(
+			tree, log_or_not=log_or_not, workers=workers, goal_interval=goal_interval, goal_period=goal_period
+		)
+		self.code = code
+		self.tasks = None
+		self.task_calls = None
+		self.layouts = {behavior.name: behavior.layout for behavior in tree.behavior_list.children} if tree is not None else {}
+
+	def load(self):
+		if self.code is None:
+			self.code = generate(self.tree)
+		namespace = {
+			'_interp': self,
+			'_log': self.log_or_not,
+			'_abilities': self.agent_abilities,
+			'_undefined': undefined,
+			'_no_ability': no_ability,
+			'_logical_and': logical_and,
+			'_logical_or': logical_or,
+			'_library_call': call_library,
+			'_routine': run_routine,
+			'_routines': routines(self.tree),
+			'_each': run_each,
+			'_order': run_order,
+			'_call_behavior': self.call_behavior,
+			'_task_call': self.task_call,
+			'_log_stack': self.log_stack,
+			'_enter': self.log_enter,
+			'_leave': self.log_leave,
+		}
+		exec(self.code, namespace)
+		self.tasks = namespace['TASKS']
+		self.task_calls = task_calls(self.tree)
+
+	def visit_Task(self, node, ctx):
+		if self.tasks is None:
+			self.load()
+		self.tasks[node.name](ctx)
+
+	def task_call(self, ctx, index):
+		self.visit(self.task_calls[index], ctx)
+
+	def call_behavior(self, ctx, name, slots, args, body):
+		call_stack = ctx.call_stack
+		ar = ActivationRecord(
+			name=name,
+			category=ARType.BEHAVIOR,
+			nesting_level=call_stack.get_base_level() + len(call_stack._records),
+			layout=self.layouts[name],
+		)
+		for slot, arg in zip(slots, args):
+			ar.slots[slot] = arg
+		call_stack.push(ar)
+		self.log_enter(ctx, 'Behavior', name)
+		body(ctx)
+		call_stack.pop()
+		self.log_leave(ctx, 'Behavior', name)
+
+	def log_stack(self, ctx):
+		with LogLock:
+			self.log(str(ctx.call_stack))
+
+	def log_enter(self, ctx, category, name):
+		if self.log_or_not:
+			with LogLock:
+				self.log(f'{ctx.vehicle_name} ENTER: {category} {name}')
+				self.log(str(ctx.call_stack))
+
+	def log_leave(self, ctx, category, name):
+		if self.log_or_not:
+			with LogLock:
+				self.log(f'LEAVE: {category} {name}')
+				self.log(str(ctx.call_stack))
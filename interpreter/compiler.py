@@ -0,0 +1,499 @@
+import importlib
+import threading
+
+from base.error import ErrorCode
+from base.nodeVisitor import NodeVisitor
+from interpreter.context import call_api
+from interpreter.goalWatch import DEFAULT_GOAL_INTERVAL, DEFAULT_GOAL_PERIOD, GoalWatch
+from interpreter.interpreter import Interpreter, LogLock
+from interpreter.memory import ARType, ActivationRecord
+from parser.element import Behavior, FunctionCall, Knowledge, KnowledgeQueue
+from parser.operator import Get
+from semanticAnalyzer.symbol import SymbolCategory
+
+
+class Function(object):
+	"""Call target of a FunctionCall, its body is filled in once compiled."""
+	__slots__ = ('name', 'category', 'ar_type', 'params', 'layout', 'body')
+
+	def __init__(self, symbol):
+		self.name = symbol.name
+		self.category = 'Behavior' if symbol.category == SymbolCategory.BEHAVIOR else 'Action'
+		self.ar_type = ARType.BEHAVIOR if symbol.category == SymbolCategory.BEHAVIOR else ARType.ACTION
+		self.params = [param.name for param in symbol.formal_params]
+		self.layout = symbol.ast.layout
+		self.body = None
+
+
+def run_routine(ctx, node, init, goal_block, children):
+	"""Run a Behavior or Task body: init once, then every routine one round per job until the goal is reached.
+
+	The goal is evaluated when its GoalWatch says so, an empty routine waits a
+	goal period between its rounds.
+	"""
+	name = node.name
+	goal_reached = ctx.goal_reached
+	my_goal_reached = threading.Event()
+	if isinstance(node, Behavior):
+		goal_reached['Behaviors'].setdefault(name, {})[ctx.vehicle_name] = my_goal_reached
+		stack_name = ctx.vehicle_name
+	else:
+		goal_reached['Tasks'][name] = my_goal_reached
+		stack_name = name
+
+	init(ctx)
+	goal_watch = GoalWatch.of(node.goal_block, ctx)
+
+	def routine_round(child, child_ctx, goal_ctx, delay):
+		child(child_ctx)
+		if not my_goal_reached.is_set():
+			if not (goal_watch.due(goal_ctx) and goal_block(goal_ctx)):	# goal is checked at the Behavior/Task level
+				group.spawn_after(delay, routine_round, child, child_ctx, goal_ctx, delay)
+				return
+			my_goal_reached.set()
+
+	group = ctx.scheduler.group()
+	child_ctxs = [ctx.replace(call_stack=ctx.call_stack.create_child(stack_name)) for _ in children]
+	goal_ctxs = [ctx.replace(call_stack=ctx.call_stack.create_child(stack_name)) for _ in children]
+	for child, child_ctx, goal_ctx, compound in zip(children, child_ctxs, goal_ctxs, node.routine_block.children):
+		delay = 0 if compound.children else goal_watch.period
+		group.spawn(routine_round, child, child_ctx, goal_ctx, delay)
+	try:
+		group.join()
+	finally:
+		for child_ctx in child_ctxs + goal_ctxs:
+			child_ctx.call_stack.back_to_parent()
+
+
+def run_order(ctx, agent_range, statements):
+	agent_s_e, start, end = agent_range
+	for now in range(start, end):
+		statements(ctx.replace(agent=agent_s_e[0], id=now))
+
+
+def run_each(ctx, agent_range, statements):
+	agent_s_e, start, end = agent_range
+	group = ctx.scheduler.group()
+	agent_ctxs = [
+		ctx.replace(call_stack=ctx.call_stack.create_child(f'{agent_s_e[0]}:{now}'), agent=agent_s_e[0], id=now)
+		for now in range(start, end)
+	]
+	for agent_ctx in agent_ctxs:
+		group.spawn(statements, agent_ctx)
+	try:
+		group.join()
+	finally:
+		for agent_ctx in agent_ctxs:
+			agent_ctx.call_stack.back_to_parent()
+
+
+_libraries = {}
+
+
+def call_library(ctx, library_name, postfixes, args):
+	"""Call libs.<library_name>.<postfixes>(*args), or return the attribute when args is None."""
+	library = _libraries.get(library_name)
+	if library is None:
+		library = _libraries[library_name] = importlib.import_module(f'libs.{library_name}')
+	attr = library
+	for postfix in postfixes:
+		attr = getattr(attr, postfix, ctx.wrapper)
+	if args is None:
+		return attr
+	return call_api(attr, args, ctx)
+
+
+class Compiler(NodeVisitor):
+	"""Compile Action, Behavior and Task bodies into nested closures taking an ExecutionContext.
+
+	Every closure does what the matching visit_ method of Interpreter does,
+	with operators, names and call targets resolved once at compile time.
+	`scope` is the (ARType, name) of the Behavior or Task whose goal stops
+	the statements of a Compound, None inside an Action.
+	"""
+
+	def __init__(self, interpreter):
+		self.interpreter = interpreter
+		self.functions = {}
+		self.tasks = {}
+
+	def function(self, symbol):
+		if symbol.name not in self.functions:
+			function = self.functions[symbol.name] = Function(symbol)
+			function.body = self.visit(symbol.ast)
+		return self.functions[symbol.name]
+
+	def task(self, node):
+		if node.name not in self.tasks:
+			self.tasks[node.name] = self.visit(node)
+		return self.tasks[node.name]
+
+	def visit_Action(self, node, **kwargs):
+		return self.visit(node.compound_statement, scope=None)
+
+	def visit_Behavior(self, node, **kwargs):
+		return self.routine(node, ARType.BEHAVIOR)
+
+	def visit_Task(self, node, **kwargs):
+		return self.routine(node, ARType.TASK)
+
+	def routine(self, node, category):
+		name = node.name
+		scope = (category, name)
+		init = self.visit(node.init_block.compound_statement, scope=scope)
+		goal_statements = self.visit(node.goal_block.statements, scope=scope)
+		goal = self.visit(node.goal_block.goal, scope=scope)
+		children = [self.visit(child, scope=scope) for child in node.routine_block.children]
+
+		def goal_block(ctx):
+			goal_statements(ctx)
+			result = goal(ctx)
+			if result == None:
+				return True
+			return result
+
+		def run(ctx):
+			run_routine(ctx, node, init, goal_block, children)
+		return run
+
+	def visit_Compound(self, node, scope=None, **kwargs):
+		interpreter = self.interpreter
+		knowledge_names, puts = node.knowledge, node.knowledge_puts
+		statements = tuple(self.visit(child, scope=scope) for child in node.children)
+		reads_snapshot = tuple(isinstance(child, Get) for child in node.children)
+		log_or_not = interpreter.log_or_not
+
+		if scope is None:
+			def goal_reached(ctx):
+				return False
+		elif scope[0] == ARType.TASK:
+			task_name = scope[1]
+
+			def goal_reached(ctx):
+				return ctx.goal_reached['Tasks'][task_name].is_set()
+		else:
+			behavior_name = scope[1]
+
+			def goal_reached(ctx):
+				return ctx.goal_reached['Behaviors'][behavior_name][ctx.vehicle_name].is_set()
+
+		def run(ctx, get_ctx=None):
+			call_stack = ctx.call_stack
+			for statement, reads in zip(statements, reads_snapshot):
+				if goal_reached(ctx):
+					break
+				statement(get_ctx if reads and get_ctx is not None else ctx)
+				if log_or_not:
+					with LogLock:
+						interpreter.log(str(call_stack))
+
+		if not knowledge_names:
+			return run
+		elif not puts:
+			def compound(ctx):
+				store = ctx.call_stack.bottom().knowledge
+				run(ctx, ctx.replace(snapshot=store.snapshot(knowledge_names)))
+		else:
+			def compound(ctx):
+				store = ctx.call_stack.bottom().knowledge
+				store.acquire(knowledge_names, puts)
+				try:
+					run(ctx)
+				finally:
+					store.release(knowledge_names, puts)
+		return compound
+
+	def visit_IfElse(self, node, scope=None, **kwargs):
+		expression = self.visit(node.expression)
+		true_compound = self.visit(node.true_compound, scope=scope)
+		false_compound = None
+		if node.false_compound is not None:
+			false_compound = self.visit(node.false_compound, scope=scope)
+
+		def if_else(ctx):
+			if expression(ctx):
+				true_compound(ctx)
+			elif false_compound is not None:
+				false_compound(ctx)
+		return if_else
+
+	def visit_Return(self, node, **kwargs):
+		interpreter = self.interpreter
+		expression = self.visit(node.expression)
+
+		def return_statement(ctx):
+			interpreter.return_value = expression(ctx)
+		return return_statement
+
+	def visit_FunctionCall(self, node, **kwargs):
+		interpreter = self.interpreter
+		function = self.function(node.symbol)
+		arguments = list(zip([function.layout[param] for param in function.params], [self.visit(arg) for arg in node.actual_params]))
+		is_action = node.symbol.category == SymbolCategory.ACTION
+		token = node.token
+		log_or_not = interpreter.log_or_not
+
+		def call(ctx):
+			call_stack = ctx.call_stack
+			ar = ActivationRecord(
+				name=function.name,
+				category=function.ar_type,
+				nesting_level=call_stack.get_base_level() + len(call_stack._records),
+				layout=function.layout,
+			)
+			for slot, argument in arguments:
+				ar.slots[slot] = argument(ctx)
+			call_stack.push(ar)
+			if log_or_not:
+				with LogLock:
+					interpreter.log(f'{ctx.vehicle_name} ENTER: {function.category} {function.name}')
+					interpreter.log(str(call_stack))
+			if is_action and function.name not in interpreter.agent_abilities[ctx.agent]:
+				interpreter.error(error_code=ErrorCode.ABILITIY_NOT_DEFINE_IN_AGENT, token=token)
+
+			function.body(ctx)
+
+			call_stack = call_stack.pop()
+			if log_or_not:
+				with LogLock:
+					interpreter.log(f'LEAVE: {function.category} {function.name}')
+					interpreter.log(str(call_stack))
+		return call
+
+	def visit_TaskCall(self, node, **kwargs):
+		interpreter = self.interpreter
+
+		def task_call(ctx):
+			interpreter.visit(node, ctx)
+		return task_call
+
+	def visit_TaskOrder(self, node, scope=None, **kwargs):
+		agent_range = self.visit(node.agent_range)
+		statements = self.visit(node.function_call_statements, scope=scope)
+
+		def order(ctx):
+			run_order(ctx, agent_range(ctx), statements)
+		return order
+
+	def visit_TaskEach(self, node, scope=None, **kwargs):
+		agent_range = self.visit(node.agent_range)
+		statements = self.visit(node.function_call_statements, scope=scope)
+
+		def each(ctx):
+			run_each(ctx, agent_range(ctx), statements)
+		return each
+
+	def visit_AgentRange(self, node, **kwargs):
+		agent, start, end = self.visit(node.agent), self.visit(node.start), self.visit(node.end)
+
+		def agent_range(ctx):
+			return (agent(ctx), start(ctx), end(ctx))
+		return agent_range
+
+	def visit_LibraryCall(self, node, **kwargs):
+		library_name = node.library.value
+		postfixes = [postfix.value for postfix in node.postfixes]
+		arguments = None if node.arguments is None else [self.visit(arg) for arg in node.arguments]
+
+		def library_call(ctx):
+			args = None if arguments is None else [argument(ctx) for argument in arguments]
+			return call_library(ctx, library_name, postfixes, args)
+		return library_call
+
+	def visit_Assign(self, node, **kwargs):
+		interpreter = self.interpreter
+		slot = node.left.slot
+		if isinstance(node.right, FunctionCall):
+			call = self.visit(node.right)
+
+			def expression(ctx):
+				call(ctx)
+				return interpreter.return_value
+		else:
+			expression = self.visit(node.right)
+
+		def assign(ctx):
+			value = expression(ctx)
+			ctx.call_stack.peek().slots[slot] = value
+		return assign
+
+	def visit_Put(self, node, **kwargs):
+		knowledge_name = node.knowledge.value
+		expression = self.visit(node.value)
+		if isinstance(node.knowledge, Knowledge):
+			def put(ctx):
+				value = expression(ctx)
+				ctx.call_stack.bottom().put_knowledge(knowledge=knowledge_name, value=value)
+		else:	# isinstance(node.knowledge, KnowledgeQueue)
+			each = node.each
+
+			def put(ctx):
+				value = expression(ctx)
+				values = list(value) if each else [value]
+				ar = ctx.call_stack.bottom()
+				if ar.knowledge.queues[knowledge_name].capacity:		# waits for room
+					with ctx.blocking():
+						ar.put_knowledge_queue_items(knowledge_queue=knowledge_name, values=values)
+				else:
+					ar.put_knowledge_queue_items(knowledge_queue=knowledge_name, values=values)
+		return put
+
+	def visit_Get(self, node, **kwargs):
+		interpreter = self.interpreter
+		slot = node.var.slot
+		knowledge_name = node.knowledge.value
+		token = node.knowledge.token
+		if isinstance(node.knowledge, KnowledgeQueue):
+			return self.compile_queue_get(node)
+
+		def get(ctx):
+			if ctx.snapshot is None:
+				value = ctx.call_stack.bottom().get_knowledge(knowledge=knowledge_name)
+			else:
+				value = ctx.snapshot[knowledge_name]
+			if value is None:
+				interpreter.error(error_code=ErrorCode.ID_NOT_FOUND, token=token)
+			ctx.call_stack.peek().slots[slot] = value
+		return get
+
+	def compile_queue_get(self, node):
+		interpreter = self.interpreter
+		slot = node.var.slot
+		knowledge_name = node.knowledge.value
+		token = node.knowledge.token
+		batch = node.limit is not None
+		limit = node.limit if batch else 1
+		timeout = node.timeout
+		default = None if node.default is None else self.visit(node.default)
+
+		def get(ctx):
+			ar = ctx.call_stack.bottom()
+			if timeout == 0:
+				items = ar.get_knowledge_queue_items(knowledge_queue=knowledge_name, limit=limit, timeout=0)
+			else:
+				with ctx.blocking():
+					items = ar.get_knowledge_queue_items(knowledge_queue=knowledge_name, limit=limit, timeout=timeout)
+			if not items and default is not None:
+				value = default(ctx)
+			else:
+				value = items if batch else items[0]
+			if value is None:
+				interpreter.error(error_code=ErrorCode.ID_NOT_FOUND, token=token)
+			ctx.call_stack.peek().slots[slot] = value
+		return get
+
+	def visit_Modify(self, node, **kwargs):
+		interpreter = self.interpreter
+		slot = node.var.slot
+		knowledge_name = node.knowledge.value
+		token = node.knowledge.token
+		expression = self.visit(node.value)
+		guard = None if node.guard is None else self.visit(node.guard)
+		locked = node.locked
+
+		def modify(ctx):
+			def new_value(value):
+				if value is None:
+					interpreter.error(error_code=ErrorCode.ID_NOT_FOUND, token=token)
+				ctx.call_stack.peek().slots[slot] = value
+				if guard is not None and not guard(ctx):
+					return value
+				return expression(ctx)
+
+			store = ctx.call_stack.bottom().knowledge
+			if locked:
+				store.put(knowledge_name, new_value(store.get(knowledge_name)))
+			else:
+				store.update(knowledge_name, new_value)
+		return modify
+
+	def visit_Watch(self, node, **kwargs):
+		interpreter = self.interpreter
+		slot = node.var.slot
+		knowledge_name = node.knowledge.value
+		token = node.knowledge.token
+		condition = None if node.condition is None else self.visit(node.condition)
+		timeout = node.timeout
+
+		def watch(ctx):
+			slots = ctx.call_stack.peek().slots
+			store = ctx.call_stack.bottom().knowledge
+			with ctx.blocking():
+				for value in store.watch(knowledge_name, timeout, changed=condition is None):
+					if value is None:
+						continue
+					slots[slot] = value
+					if condition is None or condition(ctx):
+						return
+			value = store.get(knowledge_name)		# timed out
+			if value is None:
+				interpreter.error(error_code=ErrorCode.ID_NOT_FOUND, token=token)
+			slots[slot] = value
+		return watch
+
+	def visit_BinOp(self, node, **kwargs):
+		function = node.fn
+		left, right = self.visit(node.left), self.visit(node.right)
+
+		def binary(ctx):
+			return function(left(ctx), right(ctx))
+		return binary
+
+	def visit_UnaryOp(self, node, **kwargs):
+		function = node.fn
+		expression = self.visit(node.expr)
+
+		def unary(ctx):
+			return function(expression(ctx))
+		return unary
+
+	def visit_Expression(self, node, **kwargs):
+		return self.visit(node.expr)
+
+	def visit_Var(self, node, **kwargs):
+		interpreter = self.interpreter
+		slot = node.slot
+		token = node.token
+
+		if slot is None:
+			def var(ctx):
+				interpreter.error(error_code=ErrorCode.ID_NOT_FOUND, token=token)
+			return var
+
+		def var(ctx):
+			value = ctx.call_stack.peek().slots[slot]
+			if value is None:
+				interpreter.error(error_code=ErrorCode.ID_NOT_FOUND, token=token)
+			return value
+		return var
+
+	def constant(self, node, **kwargs):
+		value = node.value
+
+		def constant(ctx):
+			return value
+		return constant
+
+	visit_Boolean = visit_Num = visit_String = constant
+
+	def visit_NoOp(self, node, **kwargs):
+		def no_op(ctx):
+			return None
+		return no_op
+
+
+class CompiledInterpreter(Interpreter):
+	"""Interpreter that runs the Tasks, Behaviors and Actions compiled by Compiler.
+
+	Program, Main and the TaskCalls run once and are still visited.
+	"""
+
+	def __init__(self, tree, log_or_not=False, workers=None, goal_interval=DEFAULT_GOAL_INTERVAL,
+				 goal_period=DEFAULT_GOAL_PERIOD):
+		super().__init__(
+			tree, log_or_not=log_or_not, workers=workers, goal_interval=goal_interval, goal_period=goal_period
+		)
+		self.compiler = Compiler(self)
+
+	def visit_Task(self, node, ctx):
+		self.compiler.task(node)(ctx)
@@ -0,0 +1,111 @@
+import asyncio
+import contextlib
+import inspect
+
+from interpreter import clock
+from interpreter.memory import ARType
+
+
+class ExecutionContext(object):
+	"""Execution state passed to every visit and to the library APIs, instead of **kwargs.
+
+	A context is never modified once it is shared, replace() returns an
+	updated copy, e.g. for each agent of a TaskEach or each routine thread.
+	"""
+	__slots__ = (
+		'wrapper', 'agent', 'id', 'call_stack', 'goal_reached', 'scheduler', 'goal_interval', 'goal_period',
+		'snapshot', 'vehicle_name',
+	)
+
+	def __init__(self, wrapper=None, agent=None, id=None, call_stack=None, goal_reached=None, scheduler=None,
+				 goal_interval=0.0, goal_period=0.0, snapshot=None):
+		self.wrapper = wrapper
+		self.agent = agent
+		self.id = id
+		self.call_stack = call_stack
+		self.goal_reached = goal_reached
+		self.scheduler = scheduler
+		self.goal_interval = goal_interval		# see GoalWatch
+		self.goal_period = goal_period
+		self.snapshot = snapshot		# Knowledge read by the get statements of a Compound that only gets, see KnowledgeStore
+		self.vehicle_name = None if agent is None else f'{agent}_{id}'
+
+	def replace(self, **changes):
+		fields = {
+			'wrapper': self.wrapper,
+			'agent': self.agent,
+			'id': self.id,
+			'call_stack': self.call_stack,
+			'goal_reached': self.goal_reached,
+			'scheduler': self.scheduler,
+			'goal_interval': self.goal_interval,
+			'goal_period': self.goal_period,
+			'snapshot': self.snapshot,
+		}
+		fields.update(changes)
+		return ExecutionContext(**fields)
+
+	def goal_caller(self):
+		"""('Behaviors' | 'Tasks', name) of the innermost Behavior or Task on the call stack."""
+		for ar in self.call_stack.peek_all():
+			if ar.category == ARType.BEHAVIOR:
+				return ('Behaviors', ar.name)
+			elif ar.category == ARType.TASK:
+				return ('Tasks', ar.name)
+		return None
+
+	def goal_event(self):
+		"""The goal Event of the innermost Behavior or Task, that a long running API should stop on."""
+		category, name = self.goal_caller()
+		if category == 'Tasks':
+			return self.goal_reached[category][name]
+		return self.goal_reached[category][name][self.vehicle_name]
+
+	def blocking(self):
+		"""Context manager around a call that may block, the Scheduler runs another worker meanwhile."""
+		if self.scheduler is None:
+			return contextlib.nullcontext()
+		return self.scheduler.blocking()
+
+	def as_kwargs(self):
+		"""The **kwargs given to library APIs before ExecutionContext."""
+		kwargs = {'wrapper': self.wrapper}
+		if self.goal_reached is not None:
+			kwargs['goal_reached'] = self.goal_reached
+		if self.agent is not None:
+			kwargs['agent'] = self.agent
+			kwargs['id'] = self.id
+		kwargs['call_stack'] = self.call_stack
+		return kwargs
+
+
+def context_api(function):
+	"""Mark a library API that takes the ExecutionContext as first argument: api(ctx, *swarm_args)."""
+	function.takes_context = True
+	return function
+
+
+def _invoke(api, args, ctx):
+	if getattr(api, 'takes_context', False):
+		return api(ctx, *args)
+	return api(*args, goal_caller=ctx.goal_caller(), **ctx.as_kwargs())
+
+
+def call_api(api, args, ctx):
+	"""Call a library API, APIs not marked with @context_api get the legacy (*swarm_args, **kwargs).
+
+	An `async def` API is run to completion on an event loop of its own.
+	"""
+	with ctx.blocking():
+		result = _invoke(api, args, ctx)
+		if inspect.iscoroutine(result):
+			result = asyncio.run(result)
+		return result
+
+
+async def call_api_async(api, args, ctx, executor):
+	"""Await an `async def` API, other APIs may block and run in a thread of executor."""
+	if inspect.iscoroutinefunction(api):
+		return await _invoke(api, args, ctx)
+	with clock.current().running():
+		return await asyncio.get_running_loop().run_in_executor(executor, call_api, api, args, ctx)
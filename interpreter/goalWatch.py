@@ -0,0 +1,60 @@
+import threading
+
+from interpreter import clock
+
+DEFAULT_GOAL_INTERVAL = 0.5		# seconds after which a goal is evaluated again, even if nothing it reads changed
+DEFAULT_GOAL_PERIOD = 0.0		# seconds between two evaluations of a goal at least, for a @goal without (period)
+
+
+class GoalWatch(object):
+	"""Tells the routines of a running Behavior or Task when its goal needs evaluating again.
+
+	The goal is due when a variable or Knowledge it reads, see GoalDependencies,
+	holds another object than at its last evaluation, or when `interval`
+	seconds have passed since then, for what a library call returns. With an
+	interval of 0 the goal is evaluated after every routine round. It is
+	evaluated once per `period` at most, whichever routine finishes a round.
+	Every routine checks the goal on a call stack of its own.
+	"""
+	__slots__ = ('dependencies', 'interval', 'period', 'lock', 'values', 'evaluated_at')
+
+	def __init__(self, dependencies, interval, period=DEFAULT_GOAL_PERIOD):
+		self.dependencies = dependencies
+		self.interval = interval
+		self.period = period
+		self.lock = threading.Lock()
+		self.values = None			# what the goal read at its last evaluation
+		self.evaluated_at = None	# clock.now() of the last evaluation
+
+	@classmethod
+	def of(cls, goal_block, ctx):
+		"""The GoalWatch of an analyzed GoalBlock, its (period) or the default of ctx."""
+		period = ctx.goal_period if goal_block.period is None else goal_block.period.value
+		return cls(goal_block.dependencies, ctx.goal_interval, period)
+
+	def inputs(self, ctx):
+		dependencies = self.dependencies
+		if dependencies is None:
+			return None
+		call_stack = ctx.call_stack
+		slots = call_stack.peek().slots
+		knowledge = call_stack.bottom().knowledge
+		values = [slots[slot] for slot in dependencies.slots]
+		values.extend(knowledge.get(name) for name in dependencies.knowledge)
+		return values
+
+	def due(self, ctx):
+		"""Whether the caller should evaluate the goal now."""
+		now = clock.now()
+		with self.lock:
+			values = self.inputs(ctx)
+			if self.evaluated_at is not None:
+				elapsed = now - self.evaluated_at
+				if elapsed < self.period:
+					return False
+				if (elapsed < self.interval and values is not None
+						and all(value is last for value, last in zip(values, self.values))):
+					return False
+			self.values = values
+			self.evaluated_at = now
+			return True
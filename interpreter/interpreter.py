@@ -3,26 +3,31 @@ import importlib
 
 from base.error import InterpreterError, ErrorCode
 from base.nodeVisitor import NodeVisitor
+from interpreter.context import ExecutionContext, call_api
+from interpreter.goalWatch import DEFAULT_GOAL_INTERVAL, DEFAULT_GOAL_PERIOD, GoalWatch
 from interpreter.memory import ARType, ActivationRecord, CallStack
+from interpreter.scheduler import Scheduler
 from interpreter.wrapper import Wrapper
-from lexer.token import TokenType
-from parser.element import FunctionCall, Knowledge, KnowledgeQueue
-from parser.operator import BinOp
+from parser.element import FunctionCall, Knowledge
+from parser.operator import Get
 from semanticAnalyzer.symbol import SymbolCategory
 
-# import concurrent.futures
-
 LogLock = threading.Lock()
 
 
 class Interpreter(NodeVisitor):
-	def __init__(self, tree, log_or_not=False):
+	def __init__(self, tree, log_or_not=False, workers=None, goal_interval=DEFAULT_GOAL_INTERVAL,
+				 goal_period=DEFAULT_GOAL_PERIOD):
 		self.tree = tree
 		self.agent_abilities = {}
 		self.log_or_not = log_or_not
 		self.call_stack = CallStack()
 		self.return_value = None
 		self.wrapper = Wrapper()
+		self.scheduler = Scheduler(workers)
+		self.goal_interval = goal_interval
+		self.goal_period = goal_period
+		self.knowledge = None		# KnowledgeStore of the running program, for its queue stats
 
 	def log(self, msg):
 		if self.log_or_not:
@@ -44,9 +49,15 @@ class Interpreter(NodeVisitor):
 			name="Program",
 			category=ARType.PROGRAM,
 			nesting_level=0,
+			knowledge=node.knowledge,
+			queues=node.queues,
 		)
+		self.knowledge = ar.knowledge
 		CALL_STACK.push(ar)
-		self.visit(node.main, wrapper=self.wrapper)
+		self.visit(node.main, ExecutionContext(
+			wrapper=self.wrapper, call_stack=CALL_STACK, scheduler=self.scheduler,
+			goal_interval=self.goal_interval, goal_period=self.goal_period,
+		))
 
 		self.log(str(CALL_STACK))
 		CALL_STACK = CALL_STACK.pop()
@@ -60,52 +71,40 @@ class Interpreter(NodeVisitor):
 		platform_wrapper = getattr(platform, node.name.value+"Wrapper")()
 		self.wrapper = platform_wrapper
 
-	def visit_LibraryCall(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
-
-		wrapper = kwargs["wrapper"]
-
-		goal_caller = None
-		for ar in CALL_STACK.peek_all():
-			if ar.category == ARType.BEHAVIOR:
-				goal_caller = ('Behaviors', ar.name)
-				break
-			elif ar.category == ARType.TASK:
-				goal_caller = ('Tasks', ar.name)
-				break
-
+	def library_attr(self, node, ctx):
+		"""The API or attribute named by a LibraryCall, libs.<library>.<postfixes>."""
 		library = importlib.import_module(f'libs.{node.library.value}')
-		attr = getattr(library, node.postfixes[0].value, wrapper)
+		attr = getattr(library, node.postfixes[0].value, ctx.wrapper)
 		for postfix_item in node.postfixes[1:]:
-			attr = getattr(attr, postfix_item.value, wrapper)
+			attr = getattr(attr, postfix_item.value, ctx.wrapper)
+		return attr
+
+	def visit_LibraryCall(self, node, ctx):
+		attr = self.library_attr(node, ctx)
 		if node.arguments is not None:
 			args = []
 			for arg in node.arguments:
-				actual_arg = self.visit(arg, **kwargs)
+				actual_arg = self.visit(arg, ctx)
 				args.append(actual_arg)
-			attr = attr(*args, goal_caller=goal_caller, **kwargs)
+			attr = call_api(attr, args, ctx)
 		return attr
 
-	def visit_Action(self, node, **kwargs):
-		self.visit(node.compound_statement, **kwargs)
+	def visit_Action(self, node, ctx):
+		self.visit(node.compound_statement, ctx)
 
-	def visit_Agent(self, node, **kwargs):
+	def visit_Agent(self, node, ctx=None):
 		abilities = []
 		for child in node.abilities.children:
 			abilities.append(child.value)
 		return abilities
 
-	def visit_AgentCall(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
+	def visit_AgentCall(self, node, ctx):
+		CALL_STACK = ctx.call_stack
 
 		agt_smbl = node.symbol
 		agt_name = agt_smbl.name
-		self.agent_abilities[agt_name] = self.visit(agt_smbl.ast, **kwargs)
-		cnt = self.visit(node.count, **kwargs)
+		self.agent_abilities[agt_name] = self.visit(agt_smbl.ast, ctx)
+		cnt = self.visit(node.count, ctx)
 		ar:ActivationRecord = CALL_STACK.peek()
 
 		if agt_name not in ar:
@@ -113,87 +112,47 @@ class Interpreter(NodeVisitor):
 		else:
 			self.error(error_code=ErrorCode.DUPLICATE_ID, token=node.agent.token)
 		agents_list = [f"{agt_name}_{i}" for i in range(cnt)]
-		kwargs["wrapper"].set_home(agents_list=agents_list)
+		ctx.wrapper.set_home(agents_list=agents_list)
 
-	def visit_Behavior(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
+	def visit_Behavior(self, node, ctx):
 		behavior_name = node.name
-		vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+		vehicle_name = ctx.vehicle_name
 
-		goal_reached = kwargs["goal_reached"]
+		goal_reached = ctx.goal_reached
 		if behavior_name not in goal_reached["Behaviors"]:
 			goal_reached["Behaviors"][behavior_name] = {}
 		my_goal_reached = threading.Event()
 		goal_reached["Behaviors"][behavior_name][vehicle_name] = my_goal_reached
-		kwargs["goal_reached"] = goal_reached
-
-		self.visit(node.init_block, **kwargs)
-
-		def execute_child(child, goal_block, cs: CallStack, exception_list:list):
-			try:
-				kwargs["call_stack"] = cs				# update call_stack for parallel child node in compound
-
-				self.visit(child, **kwargs)
-				while not my_goal_reached.is_set():
-					kwargs["call_stack"] = CALL_STACK	# recover call_stack for checking goal in behavior goal level
-					if self.visit(goal_block, **kwargs):
-						my_goal_reached.set()				# set shared flag True
-						break							# terminate this parallel child node when goal_reached is set
-					kwargs["call_stack"] = cs			# update call_stack for parallel child node in compound
-					self.visit(child, **kwargs)
-			except InterpreterError as e:
-				exception_list.append(e)
-
-		parent_call_stack = CALL_STACK
-		if "call_stack" in kwargs:  # for sub-behavior
-			parent_call_stack = kwargs['call_stack']
-		threads = []
-		exception_list = []
-		for child in node.routine_block.children:
-			child_call_stack = parent_call_stack.create_child(vehicle_name)
-			thread = threading.Thread(target=execute_child, args=(child, node.goal_block, child_call_stack, exception_list))
-			threads.append(thread)
-
-		# start all threads
-		for thread in threads:
-			thread.start()
-
-		# wait for all threads finish
-		for thread in threads:
-			thread.join()
-
-		if exception_list:
-			for exception in exception_list:
-				LogLock.acquire()
-				print(exception.message)
-				LogLock.release()
 
-	def visit_FunctionCall(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
+		self.visit(node.init_block, ctx)
+		self.run_routines(node, ctx, vehicle_name, my_goal_reached)
 
-		# push ar into the call_stack
-		function_name = node.name
+	def function_record(self, node, ctx, args):
+		"""ActivationRecord of a BehaviorCall or ActionCall, with the evaluated args bound to its parameters."""
+		CALL_STACK = ctx.call_stack
 		function_symbol = node.symbol
 		ar_category_switch_case = {
 			SymbolCategory.BEHAVIOR: ARType.BEHAVIOR,
 			SymbolCategory.ACTION: ARType.ACTION
 		}
 		ar = ActivationRecord(
-			name=function_name,
+			name=node.name,
 			category=ar_category_switch_case[function_symbol.category],
 			nesting_level=CALL_STACK.get_base_level() + len(CALL_STACK._records),
+			layout=function_symbol.ast.layout,
 		)
+		for param_symbol, arg in zip(function_symbol.formal_params, args):
+			ar[param_symbol.name] = arg
+		return ar
 
-		# BehaviorCall or ActionCall
-		formal_params = function_symbol.formal_params
-		actual_params = node.actual_params
-		for param_symbol, argument_node in zip(formal_params, actual_params):
-			ar[param_symbol.name] = self.visit(argument_node, **kwargs)
+	def visit_FunctionCall(self, node, ctx):
+		CALL_STACK = ctx.call_stack
 
+		# push ar into the call_stack
+		function_name = node.name
+		function_symbol = node.symbol
+		args = [self.visit(argument_node, ctx) for argument_node in node.actual_params]
+		ar = self.function_record(node, ctx, args)
 		CALL_STACK.push(ar)
 
 		log_switch_case = {
@@ -201,17 +160,17 @@ class Interpreter(NodeVisitor):
 			SymbolCategory.ACTION: "Action"
 		}
 		LogLock.acquire()
-		self.log(f'{kwargs["agent"]}_{kwargs["id"]} ENTER: {log_switch_case[function_symbol.category]} {function_name}')
+		self.log(f'{ctx.vehicle_name} ENTER: {log_switch_case[function_symbol.category]} {function_name}')
 		self.log(str(CALL_STACK))
 		LogLock.release()
 
 		# check the abilities of agent
 		if function_symbol.category == SymbolCategory.ACTION:
-			if function_name not in self.agent_abilities[kwargs["agent"]]:
+			if function_name not in self.agent_abilities[ctx.agent]:
 				self.error(error_code=ErrorCode.ABILITIY_NOT_DEFINE_IN_AGENT, token=node.token)
 
 		# evaluate function body
-		self.visit(function_symbol.ast, **kwargs)
+		self.visit(function_symbol.ast, ctx)
 
 		# self.log(str(CALL_STACK))
 		CALL_STACK = CALL_STACK.pop()
@@ -220,71 +179,59 @@ class Interpreter(NodeVisitor):
 		self.log(str(CALL_STACK))
 		LogLock.release()
 
-	def visit_Task(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
+	def visit_Task(self, node, ctx):
 		task_name = node.name
 		
-		goal_reached = kwargs["goal_reached"]
+		goal_reached = ctx.goal_reached
 		my_goal_reached = threading.Event()
 		goal_reached["Tasks"][task_name] = my_goal_reached
-		kwargs["goal_reached"] = goal_reached
-
-		self.visit(node.init_block, **kwargs)
-		def execute_child(child, goal_block, cs: CallStack, exception_list:list):
-			try:
-				kwargs["call_stack"] = cs				# update call_stack for parallel child node in compound
-				self.visit(child, **kwargs)
-				while not my_goal_reached.is_set():
-					kwargs["call_stack"] = CALL_STACK	# recover call_stack for checking goal in behavior goal level
-					if self.visit(goal_block, **kwargs):
-						my_goal_reached.set()				# set shared flag True
-						break							# terminate this parallel child node when goal_reached is set
-					kwargs["call_stack"] = cs			# update call_stack for parallel child node in compound
-					self.visit(child, **kwargs)
-			except InterpreterError as e:
-				exception_list.append(e)
-
-		parent_call_stack = CALL_STACK
-		if "call_stack" in kwargs:  # for sub-behavior
-			parent_call_stack = kwargs['call_stack']
-		threads = []
-		exception_list = []
-		for child in node.routine_block.children:
-			child_call_stack = parent_call_stack.create_child(task_name)
-			thread = threading.Thread(target=execute_child, args=(child, node.goal_block, child_call_stack, exception_list))
-			threads.append(thread)
-
-		# start all threads
-		for thread in threads:
-			thread.start()
-
-		# wait for all threads finish
-		for thread in threads:
-			thread.join()
-
-		if exception_list:
-			for exception in exception_list:
-				LogLock.acquire()
-				print(exception.message)
-				LogLock.release()
 
-	def visit_TaskCall(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
+		self.visit(node.init_block, ctx)
+		self.run_routines(node, ctx, task_name, my_goal_reached)
+
+	def run_routines(self, node, ctx, stack_name, my_goal_reached):
+		"""Run every parallel routine of a Behavior or Task, one round per job, until the goal is reached."""
+		goal_watch = GoalWatch.of(node.goal_block, ctx)
+
+		def routine_round(child, child_ctx, goal_ctx):
+			self.visit(child, child_ctx)
+			if not my_goal_reached.is_set():
+				# check goal in behavior/task goal level, once something it reads has changed
+				if not (goal_watch.due(goal_ctx) and self.visit(node.goal_block, goal_ctx)):
+					# next round, after the other routines. An empty routine waits for the next goal check, not to spin
+					delay = 0 if child.children else goal_watch.period
+					group.spawn_after(delay, routine_round, child, child_ctx, goal_ctx)
+					return
+				my_goal_reached.set()						# set shared flag True, the other routines stop
+
+		group = ctx.scheduler.group()
+		# call_stack for parallel child node in compound, and one for the Actions called by its goal checks
+		child_call_stacks = [ctx.call_stack.create_child(stack_name) for _ in node.routine_block.children]
+		goal_call_stacks = [ctx.call_stack.create_child(stack_name) for _ in node.routine_block.children]
+		for child, child_call_stack, goal_call_stack in zip(node.routine_block.children, child_call_stacks, goal_call_stacks):
+			group.spawn(
+				routine_round, child, ctx.replace(call_stack=child_call_stack), ctx.replace(call_stack=goal_call_stack)
+			)
+		try:
+			group.join()
+		finally:
+			for child_call_stack in child_call_stacks + goal_call_stacks:
+				child_call_stack.back_to_parent()
+
+	def task_record(self, node, ctx):
+		"""ActivationRecord of a TaskCall, after checking its agent ranges."""
+		CALL_STACK = ctx.call_stack
 
 		for actual_agent_node in node.actual_params_agent_list:
-			agent_range = self.visit(actual_agent_node.agent)
+			agent_range = self.visit(actual_agent_node.agent, ctx)
 			if agent_range is None:
 				self.error(error_code=ErrorCode.ID_NOT_FOUND, token=actual_agent_node.agent.token)
 
-			agent_start = self.visit(actual_agent_node.start)
+			agent_start = self.visit(actual_agent_node.start, ctx)
 			if agent_start < agent_range[1]:
 				self.error(error_code=ErrorCode.OUT_OF_RANGE, token=actual_agent_node.start.token)
 
-			agent_end = self.visit(actual_agent_node.end)
+			agent_end = self.visit(actual_agent_node.end, ctx)
 			if agent_end > agent_range[2]:
 				self.error(error_code=ErrorCode.OUT_OF_RANGE, token=actual_agent_node.end.token)
 
@@ -294,6 +241,7 @@ class Interpreter(NodeVisitor):
 			name=task_name,
 			category=ARType.TASK,
 			nesting_level=CALL_STACK.get_base_level() + len(CALL_STACK._records),
+			layout=task_symbol.ast.layout,
 		)
 
 		formal_params_agent_list = task_symbol.formal_params_agent_list
@@ -304,15 +252,21 @@ class Interpreter(NodeVisitor):
 
 		vehicle_name_list = [] # for setting task environment
 		for param_agent_symbol, argument_agent_node in zip(formal_params_agent_list, actual_params_agent_list):
-			ar[param_agent_symbol.agent] = self.visit(argument_agent_node.agent, **kwargs)
-			ar[param_agent_symbol.start] = self.visit(argument_agent_node.start, **kwargs)
-			ar[param_agent_symbol.end] = self.visit(argument_agent_node.end, **kwargs)
+			ar[param_agent_symbol.agent] = self.visit(argument_agent_node.agent, ctx)
+			ar[param_agent_symbol.start] = self.visit(argument_agent_node.start, ctx)
+			ar[param_agent_symbol.end] = self.visit(argument_agent_node.end, ctx)
 			for now in range(ar[param_agent_symbol.start], ar[param_agent_symbol.end]):
 				vehicle_name_list.append(f'{ar[param_agent_symbol.agent][0]}_{now}')
 
 		for param_symbol, argument_node in zip(formal_params, actual_params):
-			ar[param_symbol.name] = self.visit(argument_node, **kwargs)
+			ar[param_symbol.name] = self.visit(argument_node, ctx)
+		return ar
 
+	def visit_TaskCall(self, node, ctx):
+		CALL_STACK = ctx.call_stack
+		task_name = node.name
+		task_symbol = node.symbol
+		ar = self.task_record(node, ctx)
 		CALL_STACK.push(ar)
 
 		self.log(f'ENTER: Task {task_name}')
@@ -320,7 +274,7 @@ class Interpreter(NodeVisitor):
 
 		# getattr(self.wrapper, node.name)(vehicle_name_list = vehicle_name_list)
 		# evaluate task body
-		self.visit(task_symbol.ast, **kwargs)
+		self.visit(task_symbol.ast, ctx)
 
 		self.log(str(CALL_STACK))
 		CALL_STACK = CALL_STACK.pop()
@@ -329,84 +283,48 @@ class Interpreter(NodeVisitor):
 		self.log(str(CALL_STACK))
 		LogLock.release()
 
-	def visit_TaskOrder(self, node, **kwargs):
-		agent_s_e, start, end = self.visit(node.agent_range, **kwargs)
+	def visit_TaskOrder(self, node, ctx):
+		agent_s_e, start, end = self.visit(node.agent_range, ctx)
 		now = start
 		while now < end:
-			self.visit(node.function_call_statements, agent=agent_s_e[0], id=now, **kwargs)
+			self.visit(node.function_call_statements, ctx.replace(agent=agent_s_e[0], id=now))
 			now += 1
 
-	def visit_TaskEach(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
-
-		agent_s_e, start, end = self.visit(node.agent_range, **kwargs)
-
-		def agent_work(agent_id, cs: CallStack, wpr:Wrapper, exception_list:list):
-			try:
-				kwargs["call_stack"] = cs
-				self.visit(node.function_call_statements, agent=agent_s_e[0], id=agent_id, **kwargs)
-				kwargs["call_stack"] = CALL_STACK
-			except InterpreterError as e:
-				exception_list.append(e)
-
-		parent_call_stack = CALL_STACK
-		if "call_stack" in kwargs:  # for sub-each_statement
-			parent_call_stack = kwargs['call_stack']
-		threads = []
-		exception_list = []
-		for now in range(start, end):
-			child_call_stack = parent_call_stack.create_child(f'{agent_s_e[0]}:{now}')
-			child_wrapper = kwargs["wrapper"].copy()
-			thread = threading.Thread(target=agent_work, args=(now, child_call_stack, child_wrapper, exception_list))
-			threads.append(thread)
-
-		# start all threads
-		for thread in threads:
-			thread.start()
-
-		# wait for all threads finish
-		for thread in threads:
-			thread.join()
-
-		if exception_list:
-			for exception in exception_list:
-				LogLock.acquire()
-				print(exception.message)
-				LogLock.release()
-	"""
-	with concurrent.futures.ThreadPoolExecutor() as executor:
-	    futures = []
-	    # submit agent_work to thread pool
-	    for now in range(start, end):
-	        child_call_stack = parent_call_stack.create_child(f'{agent_s_e[0]}:{now}')
-	        future = executor.submit(agent_work, now, child_call_stack)
-	        futures.append(future)
-	    # wait for all futures done
-	    for future in concurrent.futures.as_completed(futures):
-	        # check if the future is completed
-	        if future.exception() is not None:
-	            print(f'Task failed: {future.exception()}')
-	        else:
-	            print(f'Task result: {future.result()}')
-	"""
-
-	def visit_AgentRange(self, node, **kwargs):
-		agent_s_e = self.visit(node.agent, **kwargs)
-		start = self.visit(node.start, **kwargs)
-		end = self.visit(node.end, **kwargs)
+	def visit_TaskEach(self, node, ctx):
+		agent_s_e, start, end = self.visit(node.agent_range, ctx)
+		self.run_each(node.function_call_statements, ctx, agent_s_e, range(start, end))
+
+	def run_each(self, statements, ctx, agent_s_e, ids):
+		"""Run the statements of a TaskEach for every agent id in parallel."""
+		CALL_STACK = ctx.call_stack
+
+		group = ctx.scheduler.group()
+		child_call_stacks = []
+		for now in ids:
+			child_call_stack = CALL_STACK.create_child(f'{agent_s_e[0]}:{now}')
+			child_call_stacks.append(child_call_stack)
+			agent_ctx = ctx.replace(call_stack=child_call_stack, agent=agent_s_e[0], id=now)
+			group.spawn(self.visit, statements, agent_ctx)
+		try:
+			group.join()
+		finally:
+			for child_call_stack in child_call_stacks:
+				child_call_stack.back_to_parent()
+
+	def visit_AgentRange(self, node, ctx):
+		agent_s_e = self.visit(node.agent, ctx)
+		start = self.visit(node.start, ctx)
+		end = self.visit(node.end, ctx)
 		return (agent_s_e, start, end)
 
-	def visit_Main(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
+	def visit_Main(self, node, ctx):
+		CALL_STACK = ctx.call_stack
 
 		ar = ActivationRecord(
 			name="Main",
 			category=ARType.MAIN,
 			nesting_level=CALL_STACK.get_base_level() + len(CALL_STACK._records),
+			layout=node.layout,
 		)
 
 		CALL_STACK.push(ar)
@@ -414,11 +332,11 @@ class Interpreter(NodeVisitor):
 		self.log(f'ENTER: Main')
 
 		for agent_call_node in node.agent_call_list.children:
-			self.visit(agent_call_node, **kwargs)
+			self.visit(agent_call_node, ctx)
 		self.log(str(CALL_STACK))
 
 		goal_reached = {"Tasks":{}, "Behaviors":{}}
-		self.visit(node.task_call, goal_reached = goal_reached, **kwargs)
+		self.visit(node.task_call, ctx.replace(goal_reached=goal_reached))
 
 		self.log(str(CALL_STACK))
 		CALL_STACK = CALL_STACK.pop()
@@ -427,170 +345,186 @@ class Interpreter(NodeVisitor):
 		self.log(str(CALL_STACK))
 		LogLock.release()
 
-	def visit_InitBlock(self, node, **kwargs):
-		self.visit(node.compound_statement, **kwargs)
+	def visit_InitBlock(self, node, ctx):
+		self.visit(node.compound_statement, ctx)
 
-	def visit_GoalBlock(self, node, **kwargs):
-		self.visit(node.statements, **kwargs)
-		result = self.visit(node.goal, **kwargs)
+	def visit_GoalBlock(self, node, ctx):
+		self.visit(node.statements, ctx)
+		result = self.visit(node.goal, ctx)
 		if result == None:
 			return True
 		return result
 
-	def visit_RoutineBlock(self, node, **kwargs):
+	def visit_RoutineBlock(self, node, ctx):
 		# each child is a parallel block as compound, should not use for statement
 		# for child in node.children:
-		# 	self.visit(child, **kwargs)
+		# 	self.visit(child, ctx)
 		pass
 
-	def visit_Compound(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
-
-		# acquire knowledge lock
-		ar:ActivationRecord = CALL_STACK.bottom()
-		knowledge_locks = {}
-		for statement in node.children:
-			if isinstance(statement, BinOp):
-				if isinstance(statement.right, Knowledge):
-					knowledge_name = statement.right.value
-					knowledge_locks[knowledge_name] = ar.get_lock(knowledge_name)
-		sorted_knowledge_locks = sorted(knowledge_locks.items())
-		for knowledge_lock_pair in sorted_knowledge_locks:
-			knowledge_lock_pair[1].acquire()
+	def visit_Compound(self, node, ctx):
+		CALL_STACK = ctx.call_stack
+
+		# acquire knowledge lock, or read a snapshot of the knowledge if the compound only gets it
+		knowledge_names, puts = node.knowledge, node.knowledge_puts
+		get_ctx = ctx
+		if knowledge_names:
+			store = CALL_STACK.bottom().knowledge
+			if puts:
+				store.acquire(knowledge_names, puts)
+			else:
+				get_ctx = ctx.replace(snapshot=store.snapshot(knowledge_names))
 
 		# multi parallel routine in Behavior or Task
-		for child in node.children:
-			current_level:ActivationRecord = CALL_STACK.peek()
-			if current_level.category == ARType.TASK:
-				GOAL_REACHED:threading.Event = kwargs["goal_reached"]["Tasks"][current_level.name]
-				if GOAL_REACHED.is_set():
-					break
-			elif current_level.category == ARType.BEHAVIOR:
-				vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-				GOAL_REACHED:threading.Event = kwargs["goal_reached"]["Behaviors"][current_level.name][vehicle_name]
-				if GOAL_REACHED.is_set():
-					break
-			self.visit(child, **kwargs)
-			LogLock.acquire()
-			self.log(str(CALL_STACK))
-			LogLock.release()
-
-		for knowledge_lock_pair in sorted_knowledge_locks:
-			knowledge_lock_pair[1].release()
-
-	def visit_IfElse(self, node, **kwargs):
-		expr_result = self.visit(node.expression, **kwargs)
+		try:
+			for child in node.children:
+				current_level:ActivationRecord = CALL_STACK.peek()
+				if current_level.category == ARType.TASK:
+					GOAL_REACHED:threading.Event = ctx.goal_reached["Tasks"][current_level.name]
+					if GOAL_REACHED.is_set():
+						break
+				elif current_level.category == ARType.BEHAVIOR:
+					GOAL_REACHED:threading.Event = ctx.goal_reached["Behaviors"][current_level.name][ctx.vehicle_name]
+					if GOAL_REACHED.is_set():
+						break
+				self.visit(child, get_ctx if isinstance(child, Get) else ctx)
+				LogLock.acquire()
+				self.log(str(CALL_STACK))
+				LogLock.release()
+		finally:
+			if puts:
+				store.release(knowledge_names, puts)
+
+	def visit_IfElse(self, node, ctx):
+		expr_result = self.visit(node.expression, ctx)
 		if expr_result:
-			self.visit(node.true_compound, **kwargs)
+			self.visit(node.true_compound, ctx)
 		else:
 			if node.false_compound is not None:
-				self.visit(node.false_compound, **kwargs)
-
-	def visit_Return(self, node, **kwargs):
-		self.return_value = self.visit(node.expression, **kwargs)
+				self.visit(node.false_compound, ctx)
 
-	def visit_Expression(self, node, **kwargs):
-		return self.visit(node.expr, **kwargs)
+	def visit_Return(self, node, ctx):
+		self.return_value = self.visit(node.expression, ctx)
 
-	def visit_Var(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
+	def visit_Expression(self, node, ctx):
+		return self.visit(node.expr, ctx)
 
-		var_name = node.value
-		ar:ActivationRecord = CALL_STACK.peek()
-		var_value = ar[var_name]
+	def visit_Var(self, node, ctx):
+		var_value = None
+		if node.slot is not None:
+			var_value = ctx.call_stack.peek().slots[node.slot]
 		if var_value is None:
-			# raise NameError(repr(var_name))
+			# raise NameError(repr(node.value))
 			self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.token)
 		else:
 			return var_value
 
-	def visit_Boolean(self, node, **kwargs):
+	def visit_Boolean(self, node, ctx):
 		return node.value
 
-	def visit_Num(self, node, **kwargs):
+	def visit_Num(self, node, ctx):
 		return node.value
 
-	def visit_String(self, node, **kwargs):
+	def visit_String(self, node, ctx):
 		return node.value
 
-	def visit_BinOp(self, node, **kwargs):
-		CALL_STACK = self.call_stack
-		if "call_stack" in kwargs:
-			CALL_STACK = kwargs["call_stack"]
-
-		if node.op.category == TokenType.PLUS:
-			return self.visit(node.left, **kwargs) + self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.MINUS:
-			return self.visit(node.left, **kwargs) - self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.MUL:
-			return self.visit(node.left, **kwargs) * self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.DIV:
-			return self.visit(node.left, **kwargs) // self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.MOD:
-			return self.visit(node.left, **kwargs) % self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.ASSIGN:
-			var_name = node.left.value
-			if not isinstance(node.right, FunctionCall):
-				var_value = self.visit(node.right, **kwargs)
+	def visit_BinOp(self, node, ctx):
+		return node.fn(self.visit(node.left, ctx), self.visit(node.right, ctx))
+
+	def visit_UnaryOp(self, node, ctx):
+		return node.fn(self.visit(node.expr, ctx))
+
+	def visit_Assign(self, node, ctx):
+		if not isinstance(node.right, FunctionCall):
+			var_value = self.visit(node.right, ctx)
+		else:
+			self.visit(node.right, ctx)
+			var_value = self.return_value
+		ar:ActivationRecord = ctx.call_stack.peek()
+		ar.slots[node.left.slot] = var_value
+
+	def visit_Put(self, node, ctx):
+		knowledge_name = node.knowledge.value
+		expr_value = self.visit(node.value, ctx)
+		ar:ActivationRecord = ctx.call_stack.bottom()
+		if isinstance(node.knowledge, Knowledge):
+			ar.put_knowledge(knowledge=knowledge_name, value=expr_value)
+		else:	# isinstance(node.knowledge, KnowledgeQueue)
+			values = list(expr_value) if node.each else [expr_value]
+			if ar.knowledge.queues[knowledge_name].capacity:		# waits for room
+				with ctx.blocking():
+					ar.put_knowledge_queue_items(knowledge_queue=knowledge_name, values=values)
 			else:
-				self.visit(node.right, **kwargs)
-				var_value = self.return_value
-			ar:ActivationRecord = CALL_STACK.peek()
-			ar[var_name] = var_value
-		elif node.op.category == TokenType.PUT:
-			knowledge_name = node.right.value
-			expr_value = self.visit(node.left, **kwargs)
-			ar:ActivationRecord = CALL_STACK.bottom()
-			if isinstance(node.right, Knowledge):
-				ar.put_knowledge(knowledge=knowledge_name, value=expr_value)
-			else:	# isinstance(node.right, KnowledgeQueue)
-				ar.put_knowledge_queue_item(knowledge_queue=knowledge_name, value=expr_value)
-		elif node.op.category == TokenType.GET:
-			var_name = node.left.value
-			knowledge_name = node.right.value
-			ar:ActivationRecord = CALL_STACK.bottom()
-			if isinstance(node.right, Knowledge):
+				ar.put_knowledge_queue_items(knowledge_queue=knowledge_name, values=values)
+
+	def visit_Get(self, node, ctx):
+		knowledge_name = node.knowledge.value
+		ar:ActivationRecord = ctx.call_stack.bottom()
+		if isinstance(node.knowledge, Knowledge):
+			if ctx.snapshot is None:
 				var_value = ar.get_knowledge(knowledge=knowledge_name)
-			else:	# isinstance(node.right, KnowledgeQueue)
-				var_value = ar.get_knowledge_queue_item(knowledge_queue=knowledge_name)
+			else:
+				var_value = ctx.snapshot[knowledge_name]
+		else:	# isinstance(node.knowledge, KnowledgeQueue)
+			limit = 1 if node.limit is None else node.limit
+			if node.timeout == 0:
+				items = ar.get_knowledge_queue_items(knowledge_queue=knowledge_name, limit=limit, timeout=0)
+			else:
+				with ctx.blocking():
+					items = ar.get_knowledge_queue_items(
+						knowledge_queue=knowledge_name, limit=limit, timeout=node.timeout
+					)
+			if not items and node.default is not None:
+				var_value = self.visit(node.default, ctx)
+			else:
+				var_value = items if node.limit is not None else items[0]
+		if var_value is None:
+			self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.knowledge.token)
+		cur_ar:ActivationRecord = ctx.call_stack.peek()
+		cur_ar.slots[node.var.slot] = var_value
+
+	def visit_Modify(self, node, ctx):
+		knowledge_name = node.knowledge.value
+		cur_ar:ActivationRecord = ctx.call_stack.peek()
+
+		def modify(var_value):
 			if var_value is None:
-				self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.right.token)
-			cur_ar:ActivationRecord = CALL_STACK.peek()
-			cur_ar[var_name] = var_value
-		elif node.op.category == TokenType.LESS:
-			return self.visit(node.left, **kwargs) < self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.GREATER:
-			return self.visit(node.left, **kwargs) > self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.LESS_EQUAL:
-			return self.visit(node.left, **kwargs) <= self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.GREATER_EQUAL:
-			return self.visit(node.left, **kwargs) >= self.visit(node.right, **kwargs)
-		elif node.op.category == TokenType.IS_EQUAL:
-			left_value = self.visit(node.left, **kwargs)
-			right_value = self.visit(node.right, **kwargs)
-			res = (left_value == right_value)
-			return res
-		elif node.op.category == TokenType.NOT_EQUAL:
-			return self.visit(node.left, **kwargs) != self.visit(node.right, **kwargs)
-
-	def visit_UnaryOp(self, node, **kwargs):
-		op = node.op.category
-		if op == TokenType.PLUS:
-			return +self.visit(node.expr, **kwargs)
-		elif op == TokenType.MINUS:
-			return -self.visit(node.expr, **kwargs)
-		elif op == TokenType.NOT:
-			return not self.visit(node.expr, **kwargs)
-
-	def visit_NoOp(self, node, **kwargs):
+				self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.knowledge.token)
+			cur_ar.slots[node.var.slot] = var_value
+			if node.guard is not None and not self.visit(node.guard, ctx):
+				return var_value
+			return self.visit(node.value, ctx)
+
+		store = ctx.call_stack.bottom().knowledge
+		if node.locked:		# the Compound holds its write lock
+			store.put(knowledge_name, modify(store.get(knowledge_name)))
+		else:
+			store.update(knowledge_name, modify)
+
+	def visit_Watch(self, node, ctx):
+		# a Knowledge not put yet is waited for, as if it did not hold the condition
+		knowledge_name = node.knowledge.value
+		cur_ar:ActivationRecord = ctx.call_stack.peek()
+		store = ctx.call_stack.bottom().knowledge
+		with ctx.blocking():
+			for var_value in store.watch(knowledge_name, node.timeout, changed=node.condition is None):
+				if var_value is None:
+					continue
+				cur_ar.slots[node.var.slot] = var_value
+				if node.condition is None or self.visit(node.condition, ctx):
+					return
+		var_value = store.get(knowledge_name)		# timed out
+		if var_value is None:
+			self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.knowledge.token)
+		cur_ar.slots[node.var.slot] = var_value
+
+	def visit_NoOp(self, node, ctx=None):
 		pass
 
 	def interpret(self):
 		tree = self.tree
 		if tree is None:
 			return ''
-		return self.visit(tree)
+		try:
+			return self.visit(tree)
+		finally:
+			self.scheduler.shutdown()
@@ -0,0 +1,281 @@
+import collections
+import threading
+import time
+
+SNAPSHOT_ATTEMPTS = 3		# optimistic reads of a snapshot before it waits for the read locks
+
+
+class ReadWriteLock(object):
+	"""Lock held by any number of readers or by one writer.
+
+	A waiting writer stops new readers, so that a stream of readers cannot
+	starve it. Not reentrant, like the threading.Lock it replaces.
+	"""
+	__slots__ = ('condition', 'readers', 'writer', 'waiting_writers')
+
+	def __init__(self):
+		self.condition = threading.Condition(threading.Lock())
+		self.readers = 0
+		self.writer = False
+		self.waiting_writers = 0
+
+	def acquire_read(self):
+		with self.condition:
+			while self.writer or self.waiting_writers:
+				self.condition.wait()
+			self.readers += 1
+
+	def release_read(self):
+		with self.condition:
+			self.readers -= 1
+			if not self.readers:
+				self.condition.notify_all()
+
+	def acquire_write(self):
+		with self.condition:
+			self.waiting_writers += 1
+			while self.writer or self.readers:
+				self.condition.wait()
+			self.waiting_writers -= 1
+			self.writer = True
+
+	def release_write(self):
+		with self.condition:
+			self.writer = False
+			self.condition.notify_all()
+
+	def locked(self):
+		return self.writer or self.readers > 0
+
+
+class ItemQueue(object):
+	"""The items of a KnowledgeQueue, first in first out, and the metrics of its use.
+
+	With a capacity, put() waits for room, the producers are held back to the
+	pace of the consumers. get() takes up to `limit` items, 0 for all of them,
+	once there is one, or none when `timeout` seconds have passed. A timeout of
+	0 never waits, None waits for ever. The try_ methods never wait, for the
+	async engine, which waits on an asyncio.Condition and reports it to waited().
+	"""
+	__slots__ = ('items', 'capacity', 'condition', 'max_depth', 'put_count', 'got_count', 'put_wait', 'get_wait')
+
+	def __init__(self, capacity=0):
+		self.items = collections.deque()
+		self.capacity = capacity	# 0 for no limit
+		self.condition = threading.Condition(threading.Lock())
+		self.max_depth = 0
+		self.put_count = 0
+		self.got_count = 0
+		self.put_wait = 0.0			# seconds producers waited for room
+		self.get_wait = 0.0			# seconds consumers waited for an item
+
+	def __len__(self):
+		return len(self.items)
+
+	def full(self):
+		return 0 < self.capacity <= len(self.items)
+
+	def try_put(self, values):
+		"""Put values while there is room, return how many."""
+		with self.condition:
+			return self._put(values)
+
+	def _put(self, values):
+		items = self.items
+		count = len(values) if not self.capacity else min(len(values), self.capacity - len(items))
+		if count <= 0:
+			return 0
+		items.extend(values[:count] if count < len(values) else values)
+		self.put_count += count
+		self.max_depth = max(self.max_depth, len(items))
+		self.condition.notify_all()
+		return count
+
+	def try_get(self, limit=1):
+		with self.condition:
+			return self._get(limit)
+
+	def _get(self, limit):
+		items = self.items
+		count = len(items) if not limit else min(limit, len(items))
+		values = [items.popleft() for _ in range(count)]
+		if count:
+			self.got_count += count
+			self.condition.notify_all()
+		return values
+
+	def put(self, values):
+		with self.condition:
+			count = self._put(values)
+			if count < len(values):
+				start = time.monotonic()
+				while count < len(values):
+					self.condition.wait_for(lambda: not self.full())
+					count += self._put(values[count:])
+				self.put_wait += time.monotonic() - start
+
+	def get(self, limit=1, timeout=None):
+		with self.condition:
+			values = self._get(limit)
+			if not values and timeout != 0:
+				start = time.monotonic()
+				if self.condition.wait_for(lambda: self.items, timeout):
+					values = self._get(limit)
+				self.get_wait += time.monotonic() - start
+			return values
+
+	def waited(self, seconds, getting=True):
+		with self.condition:
+			if getting:
+				self.get_wait += seconds
+			else:
+				self.put_wait += seconds
+
+	def stats(self):
+		return {
+			'depth': len(self.items), 'max_depth': self.max_depth, 'put': self.put_count, 'got': self.got_count,
+			'put_wait': self.put_wait, 'get_wait': self.get_wait,
+		}
+
+
+class KnowledgeStore(object):
+	"""The Knowledge of a program, with a lock and a version per name.
+
+	A Compound that puts Knowledge holds the write lock of every name it puts
+	and the read lock of every name it only gets, in sorted order, while it
+	runs. A Compound that only gets Knowledge takes a snapshot instead and
+	holds no lock: the versions of the names are read before and after their
+	values, and the read is retried when a writer was active in between. A
+	version is odd while a writer holds the name. A modify statement holds the
+	write lock of its name only while it runs, see update(), unless its
+	Compound locks Knowledge: the Compound then holds that write lock too, so
+	that every lock is taken in the sorted order. A watch waits
+	on `changed` for the versions to move, see watch(), and the writers
+	notify it only while someone watches. The values live in `values`, the
+	members of the Program ActivationRecord, with the ItemQueue of every
+	KnowledgeQueue.
+	"""
+	__slots__ = ('values', 'versions', 'locks', 'queues', 'changed', 'watchers', 'listeners')
+
+	def __init__(self, names=(), values=None, lock_type=ReadWriteLock, queues=None):
+		self.values = {} if values is None else values
+		self.versions = dict.fromkeys(names, 0)
+		self.locks = {name: lock_type() for name in names}
+		# KnowledgeQueue name -> ItemQueue, created with their capacity before any routine runs
+		self.queues = {name: ItemQueue(capacity) for name, capacity in (queues or {}).items()}
+		self.values.update(self.queues)
+		self.changed = threading.Condition(threading.Lock())
+		self.watchers = 0			# threads and coroutines waiting for a write
+		self.listeners = []			# callables of the async engine, called with `changed` notified
+
+	def get(self, name):
+		return self.values.get(name)
+
+	def put(self, name, value):
+		self.values[name] = value
+
+	def update(self, name, function):
+		"""Put function(value) of name under its write lock, for a modify statement."""
+		names = (name,)
+		self.acquire(names, names)
+		try:
+			self.put(name, function(self.get(name)))
+		finally:
+			self.release(names, names)
+
+	def acquire(self, names, puts):
+		"""Lock sorted `names` for a Compound, for writing those in `puts`."""
+		locks = self.locks
+		for name in names:
+			if name in puts:
+				locks[name].acquire_write()
+			else:
+				locks[name].acquire_read()
+		self.begin_write(puts)
+
+	def release(self, names, puts):
+		self.end_write(puts)
+		locks = self.locks
+		for name in reversed(names):
+			if name in puts:
+				locks[name].release_write()
+			else:
+				locks[name].release_read()
+
+	def begin_write(self, puts):
+		versions = self.versions
+		for name in puts:
+			versions[name] += 1
+
+	def end_write(self, puts):
+		versions = self.versions
+		for name in puts:
+			versions[name] += 1
+		if self.watchers:
+			self.notify()
+
+	def notify(self):
+		with self.changed:
+			self.changed.notify_all()
+		for listener in self.listeners:
+			listener()
+
+	def version(self, name):
+		return self.versions[name]
+
+	def written(self, name, version):
+		"""Whether name was written since its version was `version`, and no writer holds it now."""
+		current = self.versions[name]
+		return current != version and not current & 1
+
+	def wait_written(self, name, version, timeout=None):
+		"""Sleep until written(name, version), False if `timeout` seconds passed first."""
+		with self.changed:
+			self.watchers += 1
+			try:
+				return self.changed.wait_for(lambda: self.written(name, version), timeout)
+			finally:
+				self.watchers -= 1
+
+	def watch(self, name, timeout=None, changed=False):
+		"""Yield the value of name, unless changed, then again after every write of it.
+
+		The caller stops iterating once it has the value it waits for. The
+		iteration ends when `timeout` seconds have passed. The thread sleeps on
+		`changed` in between, it is not polling.
+		"""
+		names = (name,)
+		deadline = None if timeout is None else time.monotonic() + timeout
+		while True:
+			version = self.version(name)
+			if not changed:
+				snapshot = self.try_snapshot(names)
+				if snapshot is not None:
+					yield snapshot[name]
+			changed = False
+			remaining = None if deadline is None else deadline - time.monotonic()
+			if remaining is not None and remaining <= 0 or not self.wait_written(name, version, remaining):
+				return
+
+	def try_snapshot(self, names):
+		"""{name: value} of consistent values, or None if a writer held one of the names."""
+		versions, values = self.versions, self.values
+		for _ in range(SNAPSHOT_ATTEMPTS):
+			before = [versions[name] for name in names]
+			if any(version & 1 for version in before):
+				return None
+			snapshot = {name: values.get(name) for name in names}
+			if all(versions[name] == version for name, version in zip(names, before)):
+				return snapshot
+		return None
+
+	def snapshot(self, names):
+		"""{name: value} of consistent values, waiting for the read locks if writers are active."""
+		snapshot = self.try_snapshot(names)
+		if snapshot is None:
+			self.acquire(names, ())
+			try:
+				snapshot = {name: self.values.get(name) for name in names}
+			finally:
+				self.release(names, ())
+		return snapshot
@@ -1,9 +1,10 @@
 import threading
-import queue
 from enum import Enum
 import geopandas
 import geopandas.geodataframe
 
+from interpreter.knowledge import ItemQueue, KnowledgeStore, ReadWriteLock
+
 
 class ARType(Enum):  # Activation Record Type
 	PROGRAM = 'PROGRAM'
@@ -15,55 +16,69 @@ class ARType(Enum):  # Activation Record Type
 
 
 class ActivationRecord:
-	def __init__(self, name, category, nesting_level):
+	__slots__ = ('name', 'category', 'nesting_level', 'layout', 'slots', 'members', 'knowledge')
+
+	def __init__(self, name, category, nesting_level, layout=None, knowledge=(), lock_type=ReadWriteLock, queues=None):
 		self.name = name
 		self.category = category
 		self.nesting_level = nesting_level
-		# members[] is for Var type, members. put/get() is for Knowledge/KnowledgeQueue type
+		# slots[] is for Var type, indexed as resolved by the SemanticAnalyzer, layout maps their names to the index
+		self.layout = {} if layout is None else layout
+		self.slots = [None] * len(self.layout)
+		# members[] is for names outside the layout. put/get() is for Knowledge/KnowledgeQueue type
 		self.members = {}
-		self.locks = {}		# only for Knowledge, not for KnwoledgeQueue
+		# only for Knowledge, not for KnwoledgeQueue. One lock per name, created before any routine runs
+		self.knowledge = None
+		if category == ARType.PROGRAM:
+			self.knowledge = KnowledgeStore(knowledge, self.members, lock_type, queues)
 
 	def __setitem__(self, key, value):
-		self.members[key] = value
+		index = self.layout.get(key)
+		if index is None:
+			self.members[key] = value
+		else:
+			self.slots[index] = value
 
 	def __getitem__(self, key):
+		index = self.layout.get(key)
+		if index is not None:
+			return self.slots[index]
 		if key in self.members:
 			return self.members[key]
 		else:
 			return None
 	
 	def __contains__(self, key):
+		index = self.layout.get(key)
+		if index is not None:
+			return self.slots[index] is not None
 		return key in self.members
 	
-	def get_lock(self, knowledge):
-		if knowledge not in self.locks:
-			self.locks[knowledge] = threading.Lock()
-		return self.locks[knowledge]
-	
-	def put_knowledge_queue_item(self, knowledge_queue, value):
+	def items(self):
+		for name, index in self.layout.items():
+			if self.slots[index] is not None:
+				yield name, self.slots[index]
+		yield from self.members.items()
+
+	def put_knowledge_queue_items(self, knowledge_queue, values):
+		"""Put the list of values, waiting for room in a KnowledgeQueue with a capacity."""
 		assert self.category == ARType.PROGRAM
-		if knowledge_queue not in self.members:
-			self.members[knowledge_queue] = queue.Queue()
-		self.members[knowledge_queue].put(value)
+		self.knowledge.queues[knowledge_queue].put(values)
 
-	def get_knowledge_queue_item(self, knowledge_queue):
+	def get_knowledge_queue_items(self, knowledge_queue, limit=1, timeout=None):
+		"""A list of up to limit items, 0 for all, empty if none came within timeout seconds."""
 		assert self.category == ARType.PROGRAM
-		if knowledge_queue not in self.members:
-			self.members[knowledge_queue] = queue.Queue()
-		value = self.members[knowledge_queue].get()
-		return value
+		return self.knowledge.queues[knowledge_queue].get(limit, timeout)
 	
 	def put_knowledge(self, knowledge, value):
 		assert self.category == ARType.PROGRAM
-		assert self.locks[knowledge].locked() == True
-		self.members[knowledge] = value
+		assert self.knowledge.locks[knowledge].locked() == True
+		self.knowledge.put(knowledge, value)
 
 	def get_knowledge(self, knowledge):
 		assert self.category == ARType.PROGRAM
-		if knowledge not in self.members:
-			return None
-		assert self.locks[knowledge].locked() == True
-		value = self.members[knowledge]
+		value = self.knowledge.get(knowledge)
+		assert value is None or self.knowledge.locks[knowledge].locked() == True
 		return value
 
 	def _format_value(self, val):
@@ -74,8 +89,8 @@ class ActivationRecord:
 			for item in val:
 				lines.append(str(item))
 			val =  ('\n' + ' ' * 26).join(lines)
-		elif isinstance(val, queue.Queue):
-			val = str(list(val.queue))
+		elif isinstance(val, ItemQueue):
+			val = str(list(val.items))
 		elif isinstance(val, geopandas.geodataframe.GeoDataFrame):
 			val = str(type(val))
 		return val
@@ -88,7 +103,7 @@ class ActivationRecord:
 				name=self.name,
 			)
 		]
-		for name, val in self.members.items():
+		for name, val in self.items():
 			formatted_val = self._format_value(val)
 			lines.append(f'   {name:<20} : {formatted_val}')
 
@@ -100,11 +115,22 @@ class ActivationRecord:
 
 
 class CallStack:
+	"""Records of one thread, a child call stack continues the records of its parent.
+
+	A child caches what it needs from its parents when it is created: the
+	root call stack, its base level and the record on top of its parent.
+	The parent does not push or pop while its children run. A child is
+	released with back_to_parent() once its thread has finished.
+	"""
+
 	def __init__(self):
 		self.name = None
 		self._records = []
 		self.parent = None
-		self.children = []
+		self.children = set()			# running children, released by back_to_parent()
+		self.root = self				# call stack holding the Program record
+		self.base_level = 0				# number of records in the parents
+		self.parent_top = None			# top record of the parents
 
 	def push(self, ar):
 		self._records.append(ar)
@@ -121,12 +147,11 @@ class CallStack:
 			return self
 
 	def peek(self):
-		if len(self._records) == 0:
-			if self.parent is None:
-				raise Exception("CallStack has no parent.")
-			else:
-				return self.parent.peek()
-		return self._records[-1]
+		if self._records:
+			return self._records[-1]
+		if self.parent_top is None:
+			raise Exception("CallStack has no parent.")
+		return self.parent_top
 	
 	def peek_all(self):
 		peek_results = []
@@ -141,16 +166,16 @@ class CallStack:
 		return peek_results
 
 	def bottom(self):
-		p = self
-		while p.parent is not None:
-			p = p.parent
-		return p._records[0]
+		return self.root._records[0]
 
 	def create_child(self, nm):
-		child = CallStack()
+		child = type(self)()
 		child.name = nm
 		child.parent = self
-		self.children.append(child)
+		child.root = self.root
+		child.base_level = self.base_level + len(self._records)
+		child.parent_top = self._records[-1] if self._records else self.parent_top
+		self.children.add(child)
 		return child
 
 	def back_to_parent(self):
@@ -158,16 +183,11 @@ class CallStack:
 			raise MemoryError("Call stack node has no parent.")
 		else:
 			parent = self.parent
-			parent.children.remove(self)
+			parent.children.discard(self)
 			return parent
 
 	def get_base_level(self):
-		p = self.parent
-		cnt = 0
-		while p is not None:
-			cnt += len(p._records)
-			p = p.parent
-		return cnt
+		return self.base_level
 
 	def __str__(self):
 		minus = '-' * 60
@@ -0,0 +1,465 @@
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+
+from base.error import InterpreterError
+
+from interpreter.context import ExecutionContext
+from interpreter.goalWatch import DEFAULT_GOAL_INTERVAL, DEFAULT_GOAL_PERIOD
+from interpreter.interpreter import Interpreter
+from interpreter.knowledge import KnowledgeStore
+from interpreter.memory import ARType, ActivationRecord, CallStack
+from interpreter.transport import LocalTransport
+from parser.element import TaskEach
+from semanticAnalyzer.semanticAnalyzer import walk
+
+
+class KnowledgeServer(object):
+	"""Serves the KnowledgeStore of this process to the nodes, over a Transport.
+
+	A thread of a node opens one connection and sends (method, args) for every
+	call of its RemoteKnowledge, answered on a thread of the server. The locks
+	a connection still holds when it closes are released. A node joins with
+	('join', (name,)) on a connection of its own, handed to `joined`.
+	"""
+
+	def __init__(self, store, goal_events, transport, joined):
+		self.transport = transport
+		self.listener = transport.listen()
+		self.address = transport.advertised(self.listener.address)
+		self.joined = joined
+		self.closed = False
+		queues = store.queues
+		self.methods = {
+			'get': store.get,
+			'put': store.put,
+			'acquire': store.acquire,
+			'release': store.release,
+			'snapshot': store.snapshot,
+			'try_snapshot': store.try_snapshot,
+			'version': store.version,
+			'wait_written': store.wait_written,
+			'queue_put': lambda name, values: queues[name].put(values),
+			'queue_get': lambda name, limit, timeout: queues[name].get(limit, timeout),
+			'goal_reached': lambda name: goal_events[name].is_set(),		# the Events of the running Tasks
+		}
+		threading.Thread(target=self.accept, daemon=True).start()
+
+	def accept(self):
+		while True:
+			try:
+				connection = self.listener.accept()
+			except (OSError, multiprocessing.AuthenticationError):
+				if self.closed:
+					return
+				continue
+			if self.closed:
+				connection.close()
+				self.listener.close()
+				return
+			threading.Thread(target=self.serve, args=(connection,), daemon=True).start()
+
+	def serve(self, connection):
+		try:
+			method, args = connection.recv()
+		except (EOFError, OSError):
+			connection.close()
+			return
+		if method == 'join':
+			self.joined(connection, *args)
+			return
+		methods = self.methods
+		held = []		# (names, puts) acquired and not released
+		with connection:
+			try:
+				while True:
+					try:
+						answer = (True, methods[method](*args))
+					except Exception as e:
+						answer = (False, e)
+					if method == 'acquire' and answer[0]:
+						held.append(args)
+					elif method == 'release' and args in held:
+						held.remove(args)
+					connection.send(answer)
+					method, args = connection.recv()
+			except (EOFError, OSError):
+				pass
+			finally:
+				for names, puts in reversed(held):
+					methods['release'](names, puts)
+
+	def close(self):
+		self.closed = True
+		try:
+			self.transport.connect(self.address).close()		# wakes accept()
+		except (OSError, multiprocessing.AuthenticationError):
+			pass
+
+
+class RemoteLock(object):
+	"""Knowledge lock held in the server, locked() for the asserts of the ActivationRecord."""
+	__slots__ = ('count',)
+
+	def __init__(self):
+		self.count = 0		# Compounds of this process holding it
+
+	def locked(self):
+		return self.count > 0
+
+
+class RemoteQueue(object):
+	__slots__ = ('knowledge', 'name', 'capacity')
+
+	def __init__(self, knowledge, name, capacity):
+		self.knowledge = knowledge
+		self.name = name
+		self.capacity = capacity
+
+	def put(self, values):
+		self.knowledge.call('queue_put', self.name, values)
+
+	def get(self, limit=1, timeout=None):
+		return self.knowledge.call('queue_get', self.name, limit, timeout)
+
+
+class RemoteEvent(object):
+	"""The goal Event of a Task run by the coordinator, as seen from a node."""
+	__slots__ = ('knowledge', 'name')
+
+	def __init__(self, knowledge, name):
+		self.knowledge = knowledge
+		self.name = name
+
+	def is_set(self):
+		return self.knowledge.call('goal_reached', self.name)
+
+
+class RemoteKnowledge(object):
+	"""The KnowledgeStore of the coordinator, for a node. Every call is a round trip to the KnowledgeServer.
+
+	The calls are timed, stats() gives their count and latency, the time
+	spent waiting in the coordinator included.
+	"""
+	__slots__ = ('address', 'transport', 'local', 'locks', 'counting', 'queues', 'calls', 'seconds', 'slowest')
+
+	def __init__(self, address, transport, names=(), queues=None):
+		self.address = address
+		self.transport = transport
+		self.local = threading.local()		# connection of the thread
+		self.locks = {name: RemoteLock() for name in names}
+		self.counting = threading.Lock()
+		self.queues = {name: RemoteQueue(self, name, capacity) for name, capacity in (queues or {}).items()}
+		self.calls = 0
+		self.seconds = 0.0
+		self.slowest = 0.0
+
+	def call(self, method, *args):
+		connection = getattr(self.local, 'connection', None)
+		if connection is None:
+			connection = self.local.connection = self.transport.connect(self.address)
+		start = time.perf_counter()
+		connection.send((method, args))
+		ok, answer = connection.recv()
+		elapsed = time.perf_counter() - start
+		with self.counting:
+			self.calls += 1
+			self.seconds += elapsed
+			self.slowest = max(self.slowest, elapsed)
+		if not ok:
+			raise answer
+		return answer
+
+	def stats(self):
+		with self.counting:
+			return {'calls': self.calls, 'seconds': self.seconds, 'slowest': self.slowest}
+
+	def get(self, name):
+		return self.call('get', name)
+
+	def put(self, name, value):
+		self.call('put', name, value)
+
+	def acquire(self, names, puts):
+		self.call('acquire', names, puts)
+		self.count(names, 1)
+
+	def release(self, names, puts):
+		self.count(names, -1)
+		self.call('release', names, puts)
+
+	def count(self, names, held):
+		with self.counting:
+			for name in names:
+				self.locks[name].count += held
+
+	def snapshot(self, names):
+		return self.call('snapshot', names)
+
+	def try_snapshot(self, names):
+		return self.call('try_snapshot', names)
+
+	def version(self, name):
+		return self.call('version', name)
+
+	def wait_written(self, name, version, timeout=None):
+		return self.call('wait_written', name, version, timeout)
+
+	# the same steps as for the store in this process, on the calls above
+	update = KnowledgeStore.update
+	watch = KnowledgeStore.watch
+
+
+_worker = None		# Worker of this node
+
+
+class Worker(object):
+	"""What a node keeps between the TaskEach jobs it runs.
+
+	The Wrapper of the coordinator connects to the platform once per node,
+	every job runs its agents on a copy() of it sharing its clients.
+	"""
+	__slots__ = ('interpreter', 'program', 'each_nodes', 'wrapper')
+
+	def __init__(self, address, transport, tree, workers, goal_interval, goal_period, log_or_not, wrapper):
+		self.interpreter = Interpreter(
+			tree, log_or_not=log_or_not, workers=workers, goal_interval=goal_interval, goal_period=goal_period
+		)
+		self.program = ActivationRecord(name='Program', category=ARType.PROGRAM, nesting_level=0)
+		self.program.knowledge = RemoteKnowledge(address, transport, tree.knowledge, tree.queues)
+		self.interpreter.knowledge = self.program.knowledge
+		self.each_nodes = [node for node in walk(tree) if isinstance(node, TaskEach)]
+		self.wrapper = wrapper
+
+
+JOIN_ATTEMPTS = 120		# tries to reach a coordinator that does not listen yet, half a second apart
+
+
+def run_node(address, transport, name):
+	"""Join the coordinator at `address` as the node `name` and run the TaskEach jobs it sends, until it closes.
+
+	The coordinator listens from its first TaskEach on. Every job runs on a thread of its own, the TaskEach blocks of parallel
+	Task routines run at the same time. The answer of a job carries the
+	seconds it ran and the stats() of the RemoteKnowledge of the node.
+	"""
+	global _worker
+	for attempt in range(JOIN_ATTEMPTS):
+		try:
+			connection = transport.connect(address)
+			break
+		except (ConnectionRefusedError, FileNotFoundError):
+			if attempt == JOIN_ATTEMPTS - 1:
+				raise
+			time.sleep(0.5)
+	connection.send(('join', (name,)))
+	_worker = Worker(address, transport, *connection.recv())
+	sending = threading.Lock()
+
+	def run(job, args):
+		start = time.perf_counter()
+		try:
+			answer = (True, run_agents(*args))
+		except Exception as e:
+			answer = (False, e)
+		with sending:
+			try:
+				connection.send((job, answer, time.perf_counter() - start, _worker.program.knowledge.stats()))
+			except (TypeError, AttributeError, pickle.PicklingError):		# an exception that does not pickle
+				connection.send((job, (False, InterpreterError(message=repr(answer[1]))), 0.0, {}))
+
+	while True:
+		try:
+			message = connection.recv()
+		except (EOFError, OSError):
+			break
+		if message is None:
+			break
+		threading.Thread(target=run, args=message, daemon=True).start()
+	connection.close()
+
+
+def run_agents(index, records, tasks, agent_s_e, ids, agent_abilities):
+	"""Run the agents `ids` of the TaskEach `index` in this node, below copies of the records of its caller."""
+	interpreter = _worker.interpreter
+	interpreter.agent_abilities = agent_abilities
+	call_stack = CallStack()
+	call_stack.push(_worker.program)
+	for ar in records:
+		call_stack.push(ar)
+	knowledge = _worker.program.knowledge
+	ctx = ExecutionContext(
+		wrapper=_worker.wrapper.copy(), call_stack=call_stack, scheduler=interpreter.scheduler,
+		goal_reached={'Tasks': {name: RemoteEvent(knowledge, name) for name in tasks}, 'Behaviors': {}},
+		goal_interval=interpreter.goal_interval, goal_period=interpreter.goal_period,
+	)
+	try:
+		interpreter.run_each(_worker.each_nodes[index].function_call_statements, ctx, agent_s_e, ids)
+	finally:
+		sys.stdout.flush()
+
+
+class NodeLink(object):
+	"""A node joined to the coordinator: the TaskEach jobs sent to it and its metrics."""
+
+	def __init__(self, name, connection):
+		self.name = name
+		self.connection = connection
+		self.sending = threading.Lock()
+		self.pending = {}		# job -> Future
+		self.jobs = itertools.count()
+		self.agents = 0
+		self.busy = 0.0			# seconds its jobs ran
+		self.knowledge = {'calls': 0, 'seconds': 0.0, 'slowest': 0.0}
+		threading.Thread(target=self.receive, daemon=True).start()
+
+	def submit(self, args, agents):
+		future = concurrent.futures.Future()
+		with self.sending:
+			job = next(self.jobs)
+			self.pending[job] = future
+			self.agents += agents
+			self.connection.send((job, args))
+		return future
+
+	def receive(self):
+		while True:
+			try:
+				job, (ok, answer), seconds, knowledge = self.connection.recv()
+			except (EOFError, OSError):
+				break
+			self.busy += seconds
+			if knowledge:
+				self.knowledge = knowledge
+			with self.sending:
+				future = self.pending.pop(job)
+			if ok:
+				future.set_result(answer)
+			else:
+				future.set_exception(answer)
+		with self.sending:
+			pending, self.pending = self.pending, {}
+		for future in pending.values():
+			future.set_exception(InterpreterError(message=f'node {self.name} left the run'))
+
+	def close(self):
+		with self.sending:
+			try:
+				self.connection.send(None)
+			except OSError:
+				pass
+
+	def stats(self):
+		knowledge = self.knowledge
+		return {
+			'name': self.name, 'agents': self.agents, 'busy': self.busy,
+			'knowledge_calls': knowledge['calls'], 'knowledge_seconds': knowledge['seconds'],
+			'knowledge_slowest': knowledge['slowest'],
+		}
+
+
+class ProcessInterpreter(Interpreter):
+	"""Interpreter running the agents of every TaskEach on nodes, processes of this host or of others.
+
+	The agents of a TaskEach are split among the nodes, each running its share
+	on the threads of its own Scheduler, so they do not wait for one GIL. This
+	process, the coordinator, keeps the Knowledge and the KnowledgeQueues and
+	serves them to the nodes, see KnowledgeServer. It starts `processes` nodes
+	itself and waits for `remote_nodes` more to join over the `transport`, see
+	run_node(). The nodes import the libraries again, what this process changed
+	in them is not seen by the agents. node_stats() gives the agents, busy
+	seconds and Knowledge round trips of every node.
+	"""
+
+	def __init__(self, tree, log_or_not=False, workers=None, goal_interval=DEFAULT_GOAL_INTERVAL,
+				 goal_period=DEFAULT_GOAL_PERIOD, processes=None, transport=None, remote_nodes=0):
+		super().__init__(
+			tree, log_or_not=log_or_not, workers=workers, goal_interval=goal_interval, goal_period=goal_period
+		)
+		if processes is None:
+			processes = 0 if remote_nodes else os.cpu_count() or 1
+		self.processes = processes
+		self.remote_nodes = remote_nodes
+		self.transport = transport or LocalTransport()
+		self.each_nodes = {}
+		if tree is not None:
+			self.each_nodes = {id(node): index for index, node in enumerate(
+				node for node in walk(tree) if isinstance(node, TaskEach)
+			)}
+		self.goal_events = {}		# Task name -> goal Event, served to the nodes
+		self.starting = threading.Lock()
+		self.nodes_joined = threading.Condition(threading.Lock())
+		self.server = None
+		self.nodes = []				# NodeLinks
+		self.local_nodes = []		# processes started for the nodes of this host
+
+	def start_nodes(self, ctx):
+		"""The nodes, started with the KnowledgeServer by the first TaskEach."""
+		with self.starting:
+			if self.server is None:
+				self.server = KnowledgeServer(
+					ctx.call_stack.bottom().knowledge, self.goal_events, self.transport, self.joined
+				)
+				context = multiprocessing.get_context('forkserver')
+				context.set_forkserver_preload([__name__])
+				for number in range(self.processes):
+					process = context.Process(
+						target=run_node, args=(self.server.address, self.transport, f'local-{number}'), daemon=True
+					)
+					process.start()
+					self.local_nodes.append(process)
+				if self.remote_nodes:
+					print(f'waiting for {self.remote_nodes} nodes to join {self.server.address}', file=sys.stderr)
+				count = self.processes + self.remote_nodes
+				with self.nodes_joined:
+					while not self.nodes_joined.wait_for(lambda: len(self.nodes) >= count, 1):
+						if any(process.exitcode is not None for process in self.local_nodes):
+							raise InterpreterError(message='a node of this host stopped before joining')
+			return self.nodes
+
+	def joined(self, connection, name):
+		# the nodes start with the first TaskEach, once the Platform has set the homes of the agents
+		connection.send((
+			self.tree, self.scheduler.workers, self.goal_interval, self.goal_period, self.log_or_not, self.wrapper,
+		))
+		with self.nodes_joined:
+			self.nodes.append(NodeLink(name, connection))
+			self.nodes_joined.notify_all()
+
+	def visit_TaskEach(self, node, ctx):
+		agent_s_e, start, end = self.visit(node.agent_range, ctx)
+		ids = range(start, end)
+		if not ids:
+			return
+		nodes = self.start_nodes(ctx)
+		self.goal_events.update(ctx.goal_reached['Tasks'])
+		records = ctx.call_stack.peek_all()[::-1][1:]		# the Program record is served
+		count = min(len(nodes), len(ids))
+		futures = []
+		for part in range(count):
+			part_ids = ids[part * len(ids) // count:(part + 1) * len(ids) // count]
+			futures.append(nodes[part].submit((
+				self.each_nodes[id(node)], records, list(self.goal_events), agent_s_e,
+				part_ids, self.agent_abilities,
+			), len(part_ids)))
+		with ctx.blocking():
+			for future in futures:
+				future.result()
+
+	def node_stats(self):
+		return [link.stats() for link in self.nodes]
+
+	def interpret(self):
+		try:
+			return super().interpret()
+		finally:
+			if self.server is not None:
+				for link in self.nodes:
+					link.close()
+				for process in self.local_nodes:
+					process.join()
+				self.server.close()
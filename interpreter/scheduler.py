@@ -0,0 +1,226 @@
+import collections
+import contextlib
+import heapq
+import itertools
+import os
+import threading
+import time
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+IDLE_TIMEOUT = 2.0		# seconds an idle worker waits for a job before it exits
+
+
+class Group(object):
+	"""Jobs spawned together, e.g. the routines of a Behavior or the agents of a TaskEach.
+
+	join() waits until every job of the group is done, running the queued
+	ones itself meanwhile, and raises the first exception of a job.
+	"""
+	__slots__ = ('scheduler', 'jobs', 'pending', 'error', 'queued', 'changed')
+
+	def __init__(self, scheduler):
+		self.scheduler = scheduler
+		self.jobs = collections.deque()		# (function, args) not started yet
+		self.pending = 0					# jobs spawned and not finished
+		self.error = None
+		self.queued = False					# whether the group is in the run queue
+		self.changed = threading.Condition(scheduler.lock)	# a job was spawned or the last one finished
+
+	def spawn(self, function, *args):
+		self.scheduler.submit(self, function, args)
+
+	def spawn_after(self, delay, function, *args):
+		"""Spawn the job once delay seconds have passed, join() waits for it meanwhile."""
+		self.scheduler.submit_after(self, delay, function, args)
+
+	def join(self):
+		self.scheduler.join(self)
+
+
+class Scheduler(object):
+	"""Runs the jobs of all groups on a bounded pool of worker threads.
+
+	The run queue holds groups, a worker takes one job of the group in front
+	and puts the group back at the end, so the agents take turns. A routine
+	spawns its next round instead of looping, which lets the other routines
+	run in between. A thread blocked in a library call or on a KnowledgeQueue
+	gives its place to another worker while it waits, see blocking(). A job
+	spawned with spawn_after() waits in a heap until it is due, on one timer
+	thread for all groups.
+	"""
+
+	def __init__(self, workers=None):
+		self.workers = DEFAULT_WORKERS if workers is None else workers
+		if self.workers < 1:
+			raise ValueError('a Scheduler needs at least one worker')
+		self.lock = threading.Lock()
+		self.run_queue = collections.deque()
+		self.idle = []			# Events of the worker threads waiting for a job, the last one is woken first
+		self.threads = 0		# worker threads alive
+		self.running = 0		# worker threads running a job
+		self.blocked = 0		# threads waiting in blocking()
+		self.closed = False
+		self.timers = []		# heap of (due time, sequence, group, function, args) of the delayed jobs
+		self.timer_sequence = itertools.count()
+		self.timer_changed = threading.Condition(self.lock)
+		self.timer_thread = None
+
+	def group(self):
+		return Group(self)
+
+	def submit(self, group, function, args):
+		with self.lock:
+			if group.error is not None:
+				return
+			group.pending += 1
+			self._enqueue(group, function, args)
+
+	def submit_after(self, group, delay, function, args):
+		if delay <= 0:
+			self.submit(group, function, args)
+			return
+		with self.lock:
+			if group.error is not None:
+				return
+			group.pending += 1
+			heapq.heappush(self.timers, (time.monotonic() + delay, next(self.timer_sequence), group, function, args))
+			if self.timer_thread is None:
+				self.timer_thread = threading.Thread(target=self._timer, daemon=True)
+				self.timer_thread.start()
+			else:
+				self.timer_changed.notify()
+
+	def join(self, group):
+		with self.lock:
+			while True:
+				if group.jobs:
+					function, args = group.jobs.popleft()
+					self.lock.release()
+					try:
+						self._run(group, function, args)
+					finally:
+						self.lock.acquire()
+				elif group.pending:
+					group.changed.wait()
+				else:
+					break
+		if group.error is not None:
+			raise group.error
+
+	@contextlib.contextmanager
+	def blocking(self):
+		"""Let another worker run while the calling thread waits, e.g. in a library call."""
+		with self.lock:
+			self.blocked += 1
+			self._wake()
+		try:
+			yield
+		finally:
+			with self.lock:
+				self.blocked -= 1
+
+	def shutdown(self):
+		with self.lock:
+			self.closed = True
+			for wake_up in self.idle:
+				wake_up.set()
+			self.idle.clear()
+			self.timer_changed.notify()
+
+	def _has_capacity(self):
+		return self.running - self.blocked < self.workers
+
+	def _wake(self):
+		if not self.run_queue or not self._has_capacity():
+			return
+		if self.idle:
+			self.idle.pop().set()
+		else:
+			self.threads += 1
+			threading.Thread(target=self._worker, daemon=True).start()
+
+	def _next_job(self):
+		while self.run_queue:
+			group = self.run_queue.popleft()
+			if group.jobs:
+				job = group.jobs.popleft()
+				if group.jobs:
+					self.run_queue.append(group)
+				else:
+					group.queued = False
+				return group, job
+			group.queued = False
+		return None
+
+	def _worker(self):
+		wake_up = threading.Event()
+		with self.lock:
+			try:
+				while True:
+					next_job = self._next_job() if self._has_capacity() else None
+					if next_job is None:
+						if self.closed:
+							return
+						wake_up.clear()
+						self.idle.append(wake_up)
+						self.lock.release()
+						wake_up.wait(IDLE_TIMEOUT)
+						self.lock.acquire()
+						if not wake_up.is_set():		# timed out
+							self.idle.remove(wake_up)
+							if not (self.run_queue and self._has_capacity()):
+								return
+						continue
+					group, (function, args) = next_job
+					self.running += 1
+					self.lock.release()
+					try:
+						self._run(group, function, args)
+					finally:
+						self.lock.acquire()
+						self.running -= 1
+			finally:
+				self.threads -= 1
+
+	def _timer(self):
+		"""Move the delayed jobs to the run queue when they are due."""
+		with self.lock:
+			while not self.closed:
+				if not self.timers:
+					self.timer_changed.wait()
+					continue
+				delay = self.timers[0][0] - time.monotonic()
+				if delay > 0:
+					self.timer_changed.wait(delay)
+					continue
+				_, _, group, function, args = heapq.heappop(self.timers)
+				if group.error is not None:		# dropped like the queued jobs
+					self._finish(group)
+				else:
+					self._enqueue(group, function, args)
+
+	def _enqueue(self, group, function, args):
+		group.jobs.append((function, args))
+		if not group.queued:
+			group.queued = True
+			self.run_queue.append(group)
+		group.changed.notify()		# the thread in join() runs it if no worker is free
+		self._wake()
+
+	def _finish(self, group):
+		group.pending -= 1
+		if group.pending == 0:
+			group.changed.notify_all()
+
+	def _run(self, group, function, args):
+		try:
+			function(*args)
+		except Exception as e:
+			with self.lock:
+				if group.error is None:
+					group.error = e
+					group.pending -= len(group.jobs)	# drop the jobs not started yet
+					group.jobs.clear()
+		finally:
+			with self.lock:
+				self._finish(group)
@@ -0,0 +1,70 @@
+import os
+import socket
+from multiprocessing.connection import Client, Listener
+
+BACKLOG = 128		# connections waiting to be accepted, every thread of a node opens one
+
+
+class Transport(object):
+	"""How the coordinator of a ProcessInterpreter and its nodes reach each other.
+
+	listen() and connect() give the Listeners and Connections of
+	multiprocessing.connection, authenticated with the `authkey` shared by the
+	coordinator and every node. The coordinator sends its Transport to the
+	nodes it starts itself, so a Transport must pickle.
+	"""
+	family = None
+
+	def __init__(self, authkey=None):
+		self.authkey = authkey or os.urandom(32)
+
+	def bind_address(self):
+		raise NotImplementedError
+
+	def advertised(self, address):
+		"""The address the nodes connect to, for the one a listener is bound to."""
+		return address
+
+	def listen(self):
+		return Listener(self.bind_address(), family=self.family, backlog=BACKLOG, authkey=self.authkey)
+
+	def connect(self, address):
+		return Client(address, family=self.family, authkey=self.authkey)
+
+
+class LocalTransport(Transport):
+	"""Unix domain sockets, for the nodes on this machine."""
+	family = 'AF_UNIX'
+
+	def bind_address(self):
+		return None		# a new socket file
+
+
+class TcpTransport(Transport):
+	"""TCP, for nodes on other hosts."""
+	family = 'AF_INET'
+
+	def __init__(self, host='127.0.0.1', port=0, authkey=None):
+		super().__init__(authkey)
+		self.host = host
+		self.port = port	# 0 for any free port
+
+	def bind_address(self):
+		return (self.host, self.port)
+
+	def advertised(self, address):
+		host, port = address
+		if host == '0.0.0.0':
+			host = socket.getfqdn()
+		return (host, port)
+
+
+TRANSPORTS = {'local': LocalTransport, 'tcp': TcpTransport}
+
+
+def parse_address(text):
+	"""(Transport class, address) of 'host:port' for TCP, or of the path of a Unix socket."""
+	host, colon, port = text.rpartition(':')
+	if colon and port.isdigit():
+		return TcpTransport, (host, int(port))
+	return LocalTransport, text
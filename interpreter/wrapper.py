@@ -1,7 +1,8 @@
 import threading
-import time
 import copy
 
+from interpreter.clock import sleep
+
 LogLock = threading.Lock()
 
 
@@ -14,10 +15,14 @@ class Wrapper:
 		new_wrapper.home = copy.deepcopy(self.home)
 		return new_wrapper
 	
+	def __getstate__(self):
+		# sent to the worker processes of the process engine, which connect to the platform again
+		return {'home': self.home}
+
 	def set_home(self, agents_list:list):
 		group = len(self.home)
 		for i in range(len(agents_list)):
 			vhcl_nm = agents_list[i]
 			pose = (group, i*2, 0)
 			self.home[vhcl_nm] = pose
-		time.sleep(2)
\ No newline at end of file
+		sleep(2)
\ No newline at end of file
@@ -1,3 +1,5 @@
+import re
+
 from base.error import LexerError
 from lexer.token import Token, TokenType
 
@@ -32,16 +34,88 @@ def _build_reserved_keywords():
 RESERVED_KEYWORDS = _build_reserved_keywords()
 
 
+def _build_symbol_tokens():
+	"""Build a dictionary of single and double character tokens.
+
+	Every TokenType member whose value is made of punctuation is an
+	operator or delimiter, e.g. '+', ';', '<<', '/*'.
+
+	Result: {
+		'+': TokenType.PLUS,
+		';': TokenType.SEMI,
+		'<<': TokenType.DOUBLE_LESS,
+		...
+	}
+	"""
+	return {
+		token_type.value: token_type
+		for token_type in TokenType
+		if not token_type.value.isalnum()
+	}
+
+
+SYMBOL_TOKENS = _build_symbol_tokens()
+
+# Escape sequences recognized inside string literals,
+# any other escaped character stands for itself
+STRING_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+
+# The longest symbols come first so that '<=' is not scanned as '<' '='
+SYMBOL_PATTERN = '|'.join(
+	re.escape(symbol)
+	for symbol in sorted(SYMBOL_TOKENS, key=len, reverse=True)
+	if SYMBOL_TOKENS[symbol] != TokenType.L_COMMENT
+)
+
+# Leading whitespace, then one alternative per lexeme class.
+TOKEN_REGEX = re.compile(r"""
+	\s*
+	(?:
+		(?P<ID>			[^\W\d_]\w* )
+		| (?P<NUMBER>	\d+ (?P<FRACTION> \.\d* )? )
+		| (?P<COMMENT>	/\* )
+		| (?P<SYMBOL>	%s )
+		| (?P<STRING>	"(?:[^"\\]|\\.)*" | '(?:[^'\\]|\\.)*' )
+		| (?P<DECORATOR>	@\w* )
+	)
+""" % SYMBOL_PATTERN, re.VERBOSE | re.DOTALL)
+
+ESCAPE_REGEX = re.compile(r'\\(.)', re.DOTALL)
+
+_ID = TokenType.ID
+_INTEGER = TokenType.INTEGER
+_FLOAT = TokenType.FLOAT
+_STRING = TokenType.STRING
+_FALSE = TokenType.FALSE
+_TRUE = TokenType.TRUE
+
+
 class Lexer(object):
 	def __init__(self, text):
 		# client string input, e.g. "4 + 2 * 3 - 6 / 2"
 		self.text = text
 		# self.pos is an index into self.text
 		self.pos = 0
-		self.current_char = self.text[self.pos]
-		# token line number and column number
+		# token line number, column number is derived from line_start
 		self.lineno = 1
-		self.column = 1
+		# self.line_start is the index of the first character of the current line
+		self.line_start = 0
+
+	@property
+	def current_char(self):
+		if self.pos < len(self.text):
+			return self.text[self.pos]
+		return None  # Indicates end of input
+
+	@property
+	def column(self):
+		return self.column_of(self.pos)
+
+	def column_of(self, pos):
+		# the end of input is reported at the column of the last character
+		if pos < len(self.text):
+			return pos - self.line_start + 1
+		return pos - self.line_start
 
 	def error(self):
 		s = "Lexer error on '{lexeme}' line: {lineno} column: {column}".format(
@@ -51,124 +125,91 @@ class Lexer(object):
 		)
 		raise LexerError(message=s)
 
-	def advance(self):
-		"""Advance the `pos` pointer and set the `current_char` variable."""
-		if self.current_char == '\n':
-			self.lineno += 1
-			self.column = 0
-
-		self.pos += 1
-		if self.pos > len(self.text) - 1:
-			self.current_char = None  # Indicates end of input
-		else:
-			self.current_char = self.text[self.pos]
-			self.column += 1
-
-	def peek(self):
-		peek_pos = self.pos + 1
-		if peek_pos > len(self.text) - 1:
-			return None
-		else:
-			return self.text[peek_pos]
-
-	def skip_whitespace(self):
-		while self.current_char is not None and self.current_char.isspace():
-			self.advance()
-
-	def skip_comment(self):
-		while not (self.current_char == '*' and self.peek() == '/'):
-			self.advance()
-		self.advance()  # the closing R_COMMENT *
-		self.advance()	# the closing R_COMMENT /
-
-	def _id(self):
-		"""Handle identifiers and reserved keywords"""
-		# Create a new token with current line and column number
-		token = Token(category=None, value=None, lineno=self.lineno, column=self.column)
-
-		value = ''
-		while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
-			value += self.current_char
-			self.advance()
-
-		token_type = RESERVED_KEYWORDS.get(value)
-		if token_type is None:
-			token.category = TokenType.ID
-			token.value = value
-		else:
-			# reserved keyword
-			token.category = token_type
-			if token.category == TokenType.FALSE:
-				token.value = False
-			elif token.category == TokenType.TRUE:
-				token.value = True
-			else:
-				token.value = value.upper()
-
-		return token
-
-	def number(self):
-		"""Return a (multidigit) integer or float consumed from the input."""
-
-		# Create a new token with current line and column number
-		token = Token(category=None, value=None, lineno=self.lineno, column=self.column)
-
-		result = ''
-		while self.current_char is not None and self.current_char.isdigit():
-			result += self.current_char
-			self.advance()
-
-		if self.current_char == '.':
-			result += self.current_char
-			self.advance()
-
-			while self.current_char is not None and self.current_char.isdigit():
-				result += self.current_char
-				self.advance()
-
-			token.category = TokenType.FLOAT
-			token.value = float(result)
-		else:
-			token.category = TokenType.INTEGER
-			token.value = int(result)
-		return token
-
-	def string(self):
-		"""Return a string consumed from the input."""
-
-		# Create a new token with current line and column number
-		token = Token(category=None, value=None, lineno=self.lineno, column=self.column)
-
-		quote = self.current_char  # " or '
-		self.advance()
-		result = ''
-		while (self.current_char is not None) and (self.current_char != quote):
-			if self.current_char == '\\':
-				self.advance()  # Skip the backslash
-				if self.current_char is None:  # Handle the case where the backslash is at the end of the input
-					break
-				elif self.current_char == 'n':
-					result += '\n'
-				elif self.current_char == 't':
-					result += '\t'
-				elif self.current_char == 'r':
-					result += '\r'
-				else:  # For other escape sequences, simply include the escaped character
-					result += self.current_char
-				self.advance()  # Skip the character after the escape sequence
-			else:
-				result += self.current_char
-				self.advance()
-
-		# Check if the closing quote was found
-		if self.current_char != quote:
-			self.error()
-
-		self.advance()  # Move past the closing quote
-
-		token.category = TokenType.STRING
-		token.value = str(result)
-		return token
+	def skip_to(self, end):
+		"""Move `pos` to `end`, keeping track of the newlines skipped over."""
+		text = self.text
+		newlines = text.count('\n', self.pos, end)
+		if newlines:
+			self.lineno += newlines
+			self.line_start = text.rfind('\n', self.pos, end) + 1
+		self.pos = end
+
+	def scan(self):
+		"""Scan the next lexeme without building a Token.
+
+		Returns a (category, start, end, lineno, column) tuple where
+		text[start:end] is the lexeme, or None at the end of input.
+		"""
+		text = self.text
+		while True:
+			pos = self.pos
+			match = TOKEN_REGEX.match(text, pos)
+			if match is None:
+				# trailing whitespace or a character that starts no token
+				self.skip_to(len(text) - len(text[pos:].lstrip()))
+				if self.pos == len(text):
+					return None
+				if text[self.pos] in '"\'':
+					# unterminated string, report the end of input
+					self.skip_to(len(text))
+				self.error()
+
+			kind = match.lastgroup
+			start, end = match.span(kind)
+			if start != pos and text.count('\n', pos, start):
+				self.skip_to(start)
+			if kind == 'ID':
+				if not text[start].isalpha():
+					# a number that is not a digit of \d, e.g. '²', starts no token
+					self.skip_to(start)
+					self.error()
+				category = RESERVED_KEYWORDS.get(text[start:end], _ID)
+			elif kind == 'SYMBOL':
+				category = SYMBOL_TOKENS[text[start:end]]
+			elif kind == 'NUMBER':
+				category = _INTEGER if match.start('FRACTION') == -1 else _FLOAT
+			elif kind == 'STRING':
+				lineno, column = self.lineno, self.column_of(start)
+				self.skip_to(end)  # strings may span several lines
+				return _STRING, start, end, lineno, column
+			elif kind == 'COMMENT':
+				# the comment may be closed by the '*' of the opening '/*'
+				end = text.find('*/', start + 1)
+				if end == -1:
+					self.pos = start
+					self.error()
+				self.skip_to(end + 2)
+				continue
+			else:  # DECORATOR, e.g. @init, the token starts after the '@'
+				start += 1
+				category = RESERVED_KEYWORDS.get(text[start:end], _ID)
+				if start == end:
+					# a lone '@' at the end of input
+					self.pos = start
+					return category, start, end, self.lineno, self.column_of(start)
+			self.pos = end
+			return category, start, end, self.lineno, start - self.line_start + 1
+
+	def token_value(self, category, start, end):
+		"""Convert the lexeme text[start:end] into the value of a token of `category`."""
+		if category is _ID:
+			return self.text[start:end]
+		if category is _INTEGER:
+			return int(self.text[start:end])
+		if category is _FLOAT:
+			return float(self.text[start:end])
+		if category is _STRING:
+			# drop the quotes
+			value = self.text[start + 1:end - 1]
+			if '\\' in value:
+				value = ESCAPE_REGEX.sub(lambda m: STRING_ESCAPES.get(m.group(1), m.group(1)), value)
+			return value
+		if category is _FALSE:
+			return False
+		if category is _TRUE:
+			return True
+		# reserved keywords are upper-cased, symbols stand for themselves
+		return self.text[start:end].upper()
 
 	def get_next_token(self):
 		"""Lexical analyzer (also known as scanner or tokenizer)
@@ -176,86 +217,30 @@ class Lexer(object):
 		This method is responsible for breaking a sentence
 		apart into tokens. One token at a time.
 		"""
-		while self.current_char is not None:
-
-			if self.current_char.isspace():
-				self.skip_whitespace()
-				continue
-
-			if self.current_char.isalpha():
-				return self._id()
-
-			if self.current_char.isdigit():
-				return self.number()
-
-			if self.current_char == '@':
-				self.advance()
-				return self._id()
-
-			if self.current_char == '"' or self.current_char == "'":
-				return self.string()
-
-			# multi-character token
-			try:
-				peek_char = self.peek()
-				if peek_char is None:
-					raise ValueError
-				multi_char = self.current_char + peek_char
-				# get enum member by value, e.g.
-				# TokenType('<<') --> TokenType.DOUBLE_LESS
-				token_type = TokenType(multi_char)
-				if token_type == TokenType.L_COMMENT:
-					self.skip_comment()
-					continue
-			except ValueError:
-				# no enum member with value equal to multi_char
-				# check for single-character token
-				try:
-					# get enum member by value, e.g.
-					# TokenType(';') --> TokenType.SEMI
-					token_type = TokenType(self.current_char)
-				except ValueError:
-					# no enum member with value equal to self.current_char
-					self.error()
-				else:
-					# create a token with a single-character lexeme as its value
-					token = Token(
-						category=token_type,
-						value=token_type.value,  # e.g. ';', '.', etc
-						lineno=self.lineno,
-						column=self.column,
-					)
-					self.advance()
-					return token
-			else:
-				# create a token with a multi-character lexeme as its value
-				token = Token(
-					category=token_type,
-					value=token_type.value,  # e.g. '<<', '>>', etc
-					lineno=self.lineno,
-					column=self.column,
-				)
-				self.advance()
-				self.advance()
-				return token
-
-		# EOF (end-of-file) token indicates that there is no more
-		# input left for lexical analysis
-		return Token(category=TokenType.EOF, value=None)
+		scanned = self.scan()
+		if scanned is None:
+			# EOF (end-of-file) token indicates that there is no more
+			# input left for lexical analysis
+			return Token(category=TokenType.EOF, value=None)
+		category, start, end, lineno, column = scanned
+		return Token(
+			category=category,
+			value=self.token_value(category, start, end),
+			lineno=lineno,
+			column=column,
+		)
 
 	def peek_next_token(self):
 		"""Peek at the next token without consuming it."""
 		pos = self.pos
-		current_char = self.current_char
 		lineno = self.lineno
-		column = self.column
+		line_start = self.line_start
 
 		next_token = self.get_next_token()
 
 		# Restore the original state of the lexer
 		self.pos = pos
-		self.current_char = current_char
 		self.lineno = lineno
-		self.column = column
+		self.line_start = line_start
 
 		return next_token
@@ -55,6 +55,11 @@ class TokenType(Enum):
 	PUT 		= 'put'
 	FROM 		= 'from'
 	TO 			= 'to'
+	MODIFY 		= 'modify'
+	WHEN 		= 'when'
+	WITHIN 		= 'within'
+	WATCH 		= 'watch'
+	UNTIL 		= 'until'
 	ORDER 		= 'order'
 	EACH 		= 'each'
 	RETURN 		= 'return'
@@ -72,6 +77,8 @@ class TokenType(Enum):
 
 
 class Token(object):
+	__slots__ = ('category', 'value', 'lineno', 'column')
+
 	def __init__(self, category, value, lineno=None, column=None):
 		self.category = category
 		self.value = value
@@ -0,0 +1,69 @@
+from array import array
+
+from lexer.token import Token, TokenType
+
+# TokenType members by category id, in definition order
+CATEGORIES = list(TokenType)
+CATEGORY_IDS = {category: category_id for category_id, category in enumerate(CATEGORIES)}
+
+
+class TokenArray(object):
+	"""Every token of a source text, scanned up front into parallel arrays.
+
+	For each token only the category id, the offsets of its lexeme in
+	the source text and its line and column are stored. Token objects
+	are built on demand, so a TokenArray can stand in for the Lexer:
+	Parser(TokenArray(Lexer(text))).
+	"""
+
+	def __init__(self, lexer):
+		self.lexer = lexer
+		self.categories = array('B')
+		self.starts = array('I')	# lexeme is text[starts[i]:ends[i]]
+		self.ends = array('I')
+		self.linenos = array('I')
+		self.columns = array('I')
+		# index of the token returned by the next get_next_token()
+		self.pos = 0
+
+		scan = lexer.scan
+		scanned = scan()
+		while scanned is not None:
+			category, start, end, lineno, column = scanned
+			self.categories.append(CATEGORY_IDS[category])
+			self.starts.append(start)
+			self.ends.append(end)
+			self.linenos.append(lineno)
+			self.columns.append(column)
+			scanned = scan()
+
+	def __len__(self):
+		return len(self.categories)
+
+	def category(self, index):
+		if index < len(self.categories):
+			return CATEGORIES[self.categories[index]]
+		return TokenType.EOF
+
+	def __getitem__(self, index):
+		if index >= len(self.categories):
+			# EOF (end-of-file) token indicates that there is no more
+			# input left for lexical analysis
+			return Token(category=TokenType.EOF, value=None)
+		category = CATEGORIES[self.categories[index]]
+		return Token(
+			category=category,
+			value=self.lexer.token_value(category, self.starts[index], self.ends[index]),
+			lineno=self.linenos[index],
+			column=self.columns[index],
+		)
+
+	def get_next_token(self):
+		token = self[self.pos]
+		if self.pos < len(self.categories):
+			self.pos += 1
+		return token
+
+	def peek_next_token(self):
+		"""Peek at the next token without consuming it."""
+		return self[self.pos]
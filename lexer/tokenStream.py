@@ -0,0 +1,26 @@
+from collections import deque
+
+
+class TokenStream(object):
+	"""Buffer of tokens between the Lexer and the Parser.
+
+	Every token is scanned once and kept in the buffer until it is
+	consumed, so looking ahead never re-lexes the input.
+	"""
+
+	def __init__(self, lexer):
+		self.lexer = lexer
+		self.buffer = deque()
+
+	def next(self):
+		"""Consume and return the next token."""
+		if self.buffer:
+			return self.buffer.popleft()
+		return self.lexer.get_next_token()
+
+	def peek(self, n=1):
+		"""Return the n-th next token without consuming it, peek(1) is the next one."""
+		buffer = self.buffer
+		while len(buffer) < n:
+			buffer.append(self.lexer.get_next_token())
+		return buffer[n - 1]
@@ -1,8 +1,8 @@
 import airsim
 import copy
 import threading
-import time
 
+from interpreter.clock import sleep
 from interpreter.wrapper import Wrapper 
 
 
@@ -43,6 +43,14 @@ class AirsimWrapper(Wrapper):
 		new_wrapper.home = copy.deepcopy(self.home)
 		return new_wrapper
 
+	def __setstate__(self, state):
+		# in a worker process, a client of its own for every vehicle
+		self.__init__(wait_or_not=False)
+		self.home = state['home']
+		for vhcl_nm in self.home:
+			self.clients[vhcl_nm] = airsim.MultirotorClient()
+			self.locks[vhcl_nm] = threading.Lock()
+
 	def set_home(self, agents_list: list):
 		colors = [[1.0, 0, 0, 0], [0, 0, 1.0, 0]]
 		for i in range(len(agents_list)):
@@ -59,7 +67,7 @@ class AirsimWrapper(Wrapper):
 			client.armDisarm(True, vhcl_nm)
 			client.simSetTraceLine(color_rgba=colors[self.group%len(colors)], thickness=20.0, vehicle_name=vhcl_nm)
 		self.group += 1
-		time.sleep(2)
+		sleep(2)
 
 	"""
 	AirSimWrapper封装了两类实体
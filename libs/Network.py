@@ -8,24 +8,22 @@ from libs.RL.dqn import DQNAgent
 current_file_path = os.path.abspath(__file__)
 current_directory = os.path.dirname(current_file_path)
 
-def fly_circle_one_round(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+def fly_circle_one_round(ctx, *swarm_args, **kwargs):
+	vehicle_name = ctx.vehicle_name
 	getState_func = kwargs["getState_func"]
 	circle_center = kwargs["circle_center"]
 	radius = kwargs["radius"]
 	start_position = kwargs["start_position"]
 	agent:TD3Agent = kwargs["circle_agent"]
-	client = kwargs["wrapper"].clients[vehicle_name]
-	Lock = kwargs["wrapper"].locks[vehicle_name]
-	Behaviors_or_Tasks = kwargs["goal_caller"][0]
-	Behavior_or_Task_name = kwargs["goal_caller"][1]
-	my_goal_reached:threading.Event = kwargs["goal_reached"][Behaviors_or_Tasks][Behavior_or_Task_name][vehicle_name]
+	client = ctx.wrapper.clients[vehicle_name]
+	Lock = ctx.wrapper.locks[vehicle_name]
+	my_goal_reached:threading.Event = ctx.goal_event()
 
 	import math
 	import numpy as np
 	step_count = 0
 	while not my_goal_reached.is_set():
-		state = getState_func(**kwargs)
+		state = getState_func(ctx)
 		vx = state.kinematics_estimated.linear_velocity.x_val
 		vy = state.kinematics_estimated.linear_velocity.y_val
 		theta = math.atan2(vy, vx)
@@ -94,24 +92,22 @@ class Cover_Env():
 		return np.all(self.cover_map == 1)
 
 
-def cover_one_round(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+def cover_one_round(ctx, *swarm_args, **kwargs):
+	vehicle_name = ctx.vehicle_name
 	getPosition_func = kwargs["getPosition_func"]
 	flyTo_func = kwargs["flyTo_func"]
 	agent:DQNAgent = kwargs["cover_agent"]
 	scale = kwargs['scale']
 	env:Cover_Env = DQN_cover.env
 	env.set_scale(scale=scale)
-	client = kwargs["wrapper"].clients[vehicle_name]
-	Lock = kwargs["wrapper"].locks[vehicle_name]
-	Behaviors_or_Tasks = kwargs["goal_caller"][0]
-	Behavior_or_Task_name = kwargs["goal_caller"][1]
-	my_goal_reached:threading.Event = kwargs["goal_reached"][Behaviors_or_Tasks][Behavior_or_Task_name][vehicle_name]
+	client = ctx.wrapper.clients[vehicle_name]
+	Lock = ctx.wrapper.locks[vehicle_name]
+	my_goal_reached:threading.Event = ctx.goal_event()
 
 	done = False
 	while not my_goal_reached.is_set() and not done:
 	# while not done:
-		pos = getPosition_func(**kwargs)
+		pos = getPosition_func(ctx)
 		env.update(uav_name=vehicle_name, x=round(pos[0]/scale), y=round(pos[1]/scale))
 		cover_obs = env.get_obs(uav_name=vehicle_name)
 		action = agent.choose_action(state=cover_obs, epsilon=0.1)
@@ -126,7 +122,7 @@ def cover_one_round(*swarm_args, **kwargs):
 		target_x = int(np.clip(target_x, 0, 9)) * scale
 		target_y = int(np.clip(target_y, 0, 9)) * scale
 		target_xyz = (target_x, target_y, pos[2])
-		flyTo_func(target_xyz, **kwargs)
+		flyTo_func(ctx, target_xyz)
 		done = env.get_done()
 
 
@@ -1,15 +1,18 @@
 import threading
-import time
 import airsim
 import inspect
 
+from interpreter.clock import sleep
+from interpreter.context import context_api
+
 LogLock = threading.Lock()
 MIN_THRESHOLD = 2
 
-def takeOff_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-	Lock:threading.Lock = kwargs["wrapper"].locks[vehicle_name]
-	client:airsim.MultirotorClient = kwargs["wrapper"].clients[vehicle_name]
+@context_api
+def takeOff_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	Lock:threading.Lock = ctx.wrapper.locks[vehicle_name]
+	client:airsim.MultirotorClient = ctx.wrapper.clients[vehicle_name]
 
 	Lock.acquire()
 	res = client.takeoffAsync(vehicle_name=vehicle_name)
@@ -26,7 +29,7 @@ def takeOff_API(*swarm_args, **kwargs):
 	th.join()
 	'''
 	'''
-	if hasattr(kwargs["wrapper"], "clients"):
+	if hasattr(ctx.wrapper, "clients"):
 	else:
 		LogLock.acquire()
 		print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
@@ -34,33 +37,35 @@ def takeOff_API(*swarm_args, **kwargs):
 	'''
 
 
-def flyToHeight_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-	Lock:threading.Lock = kwargs["wrapper"].locks[vehicle_name]
-	client:airsim.MultirotorClient = kwargs["wrapper"].clients[vehicle_name]
+@context_api
+def flyToHeight_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	Lock:threading.Lock = ctx.wrapper.locks[vehicle_name]
+	client:airsim.MultirotorClient = ctx.wrapper.clients[vehicle_name]
 
 	while True:
 		Lock.acquire()
 		pos = client.simGetVehiclePose(vehicle_name=vehicle_name)
 		Lock.release()
-		time.sleep(0.5)
+		sleep(0.5)
 		if abs(pos.position.z_val - (-swarm_args[0])) < MIN_THRESHOLD:
 			break
 		Lock.acquire()
 		res = client.moveToPositionAsync(pos.position.x_val, pos.position.y_val, -swarm_args[0], 5, vehicle_name=vehicle_name)
 		Lock.release()
-		time.sleep(0.5)
+		sleep(0.5)
 
 
-def getPosition_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-	Lock:threading.Lock = kwargs["wrapper"].locks[vehicle_name]
-	client:airsim.MultirotorClient = kwargs["wrapper"].clients[vehicle_name]
+@context_api
+def getPosition_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	Lock:threading.Lock = ctx.wrapper.locks[vehicle_name]
+	client:airsim.MultirotorClient = ctx.wrapper.clients[vehicle_name]
 	Lock.acquire()
 	pos = client.simGetVehiclePose(vehicle_name=vehicle_name)
 	Lock.release()
-	time.sleep(0.5)
-	home = kwargs["wrapper"].home
+	sleep(0.5)
+	home = ctx.wrapper.home
 
 	pos.position.x_val += home[vehicle_name].position.x_val
 	pos.position.y_val += home[vehicle_name].position.y_val
@@ -69,16 +74,17 @@ def getPosition_API(*swarm_args, **kwargs):
 	return (pos.position.x_val, pos.position.y_val, pos.position.z_val)
 
 
-def getState_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-	Lock:threading.Lock = kwargs["wrapper"].locks[vehicle_name]
-	client:airsim.MultirotorClient = kwargs["wrapper"].clients[vehicle_name]
+@context_api
+def getState_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	Lock:threading.Lock = ctx.wrapper.locks[vehicle_name]
+	client:airsim.MultirotorClient = ctx.wrapper.clients[vehicle_name]
 
 	Lock.acquire()
 	state:airsim.MultirotorState = client.getMultirotorState(vehicle_name=vehicle_name)
 	Lock.release()
-	time.sleep(0.5)
-	home = kwargs["wrapper"].home
+	sleep(0.5)
+	home = ctx.wrapper.home
 
 	state.kinematics_estimated.position.x_val += home[vehicle_name].position.x_val
 	state.kinematics_estimated.position.y_val += home[vehicle_name].position.y_val
@@ -86,10 +92,11 @@ def getState_API(*swarm_args, **kwargs):
 	return state
 
 
-def getDestination_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-	Lock:threading.Lock = kwargs["wrapper"].locks[vehicle_name]
-	client:airsim.MultirotorClient = kwargs["wrapper"].clients[vehicle_name]
+@context_api
+def getDestination_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	Lock:threading.Lock = ctx.wrapper.locks[vehicle_name]
+	client:airsim.MultirotorClient = ctx.wrapper.clients[vehicle_name]
 
 	mapper = {
 		"search_drone_0": 0,
@@ -125,19 +132,21 @@ def getDestination_API(*swarm_args, **kwargs):
 	return (dest[0], dest[1], pos[2])
 
 
-def cover_API(*swarm_args, **kwargs):
+@context_api
+def cover_API(ctx, *swarm_args):
 	DQNagent = swarm_args[0]
 
-	DQNagent.one_round(getPosition_func = getPosition_API, flyTo_func = flyTo_API, cover_agent = DQNagent, scale = 10, **kwargs)
+	DQNagent.one_round(ctx, getPosition_func = getPosition_API, flyTo_func = flyTo_API, cover_agent = DQNagent, scale = 10)
 
 
-def flyTo_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-	Lock:threading.Lock = kwargs["wrapper"].locks[vehicle_name]
-	client:airsim.MultirotorClient = kwargs["wrapper"].clients[vehicle_name]
+@context_api
+def flyTo_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	Lock:threading.Lock = ctx.wrapper.locks[vehicle_name]
+	client:airsim.MultirotorClient = ctx.wrapper.clients[vehicle_name]
 
 	destination = swarm_args[0]	# World coordinate system
-	home = kwargs["wrapper"].home
+	home = ctx.wrapper.home
 
 	# Relative coordinate system
 	relative_destination_x = destination[0] - home[vehicle_name].position.x_val
@@ -150,34 +159,36 @@ def flyTo_API(*swarm_args, **kwargs):
 	print(f"{vehicle_name} fly to {destination[0]}, {destination[1]}, {destination[2]}")
 	LogLock.release()
 	while True:
-		pos = getPosition_API(**kwargs)
+		pos = getPosition_API(ctx)
 		import math
 		if math.dist((pos[0], pos[1], pos[2]), (destination[0], destination[1], destination[2])) < MIN_THRESHOLD:
 			break
 		Lock.acquire()
 		res = client.moveToPositionAsync(relative_destination_x, relative_destination_y, relative_destination_z, 2, vehicle_name=vehicle_name)
 		Lock.release()
-		time.sleep(0.5)
+		sleep(0.5)
 
 
-def flyCircle_API(*swarm_args, **kwargs):
+@context_api
+def flyCircle_API(ctx, *swarm_args):
 	TD3agent = swarm_args[0]
 	radius = swarm_args[1]
 	start_position = swarm_args[2]
 
 	circle_center = (round(start_position[0]), round(start_position[1]) + radius)
 
-	TD3agent.one_round(getState_func = getState_API, circle_agent = TD3agent, radius = radius, start_position = start_position, circle_center = circle_center, **kwargs)
+	TD3agent.one_round(ctx, getState_func = getState_API, circle_agent = TD3agent, radius = radius, start_position = start_position, circle_center = circle_center)
 
 
-def takePicture_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
-	Lock:threading.Lock = kwargs["wrapper"].locks[vehicle_name]
-	client:airsim.MultirotorClient = kwargs["wrapper"].clients[vehicle_name]
+@context_api
+def takePicture_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	Lock:threading.Lock = ctx.wrapper.locks[vehicle_name]
+	client:airsim.MultirotorClient = ctx.wrapper.clients[vehicle_name]
 
 	import datetime
 	# print(str(datetime.datetime.now()) + " Enter takePicture_API")
-	time.sleep(5)
+	sleep(5)
 	Lock.acquire()
 	response = client.simGetImage("bottom_center", airsim.ImageType.Scene, vehicle_name=vehicle_name)
 	Lock.release()
@@ -196,35 +207,39 @@ def takePicture_API(*swarm_args, **kwargs):
 	return filename
 
 
-def pickUp_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def pickUp_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
 	LogLock.release()
 
 
-def dropGoods_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def dropGoods_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
 	LogLock.release()
 
 
-def goHome_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def goHome_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 
-	home = kwargs["wrapper"].home[vehicle_name]
+	home = ctx.wrapper.home[vehicle_name]
 	home_as_dest = (home.position.x_val, home.position.y_val, home.position.z_val)
 
-	flyTo_API(home_as_dest, **kwargs)
+	flyTo_API(ctx, home_as_dest)
 
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
 	LogLock.release()
 
 
-def print_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def print_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	LogLock.acquire()
 	print(f"{vehicle_name} : {swarm_args}")
 	LogLock.release()
\ No newline at end of file
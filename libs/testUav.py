@@ -1,36 +1,43 @@
+import asyncio
 import inspect
 import threading
-import time
+
+from interpreter.context import context_api
 
 LogLock = threading.Lock()
 MIN_THRESHOLD = 2
 
-def takeOff_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def takeOff_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
 	LogLock.release()
 
 
-def flyToHeight_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def flyToHeight_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
 	LogLock.release()
 
 
-def getPosition_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def getPosition_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	return (0, 0, 0)
 
 
-def getState_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def getState_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	return 0
 
 
-def getDestination_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def getDestination_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 
 	mapper = {
 		"search_drone_0": 0,
@@ -64,34 +71,61 @@ def getDestination_API(*swarm_args, **kwargs):
 	return (dest[0], dest[1], pos[2])
 
 
-def flyTo_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+async def flyTo_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	destination = swarm_args[0]	# World coordinate system
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}, ({destination})")
 	LogLock.release()
-	time.sleep(3)
+	await asyncio.sleep(3)		# the flight, other agents run meanwhile with --engine async
 
 
-def flyCircle_API(*swarm_args, **kwargs):
+@context_api
+def flyCircle_API(ctx, *swarm_args):
 	TD3agent = swarm_args[0]
 	radius = swarm_args[1]
 	start_position = swarm_args[2]
 
 	circle_center = (round(start_position.position.x_val), round(start_position.position.y_val) + radius)
 
-	TD3agent.one_round(getState_func = getState_API, circle_agent = TD3agent, radius = radius, start_position = start_position, circle_center = circle_center, **kwargs)
+	TD3agent.one_round(ctx, getState_func = getState_API, circle_agent = TD3agent, radius = radius, start_position = start_position, circle_center = circle_center)
 
 
-def takePicture_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def takePicture_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
 	LogLock.release()
 	return "fake picture"
 
-def pickUp_API(*swarm_args, **kwargs):
-	vehicle_name = f'{kwargs["agent"]}_{kwargs["id"]}'
+@context_api
+def pickUp_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
 	LogLock.acquire()
 	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}")
 	LogLock.release()
+
+
+@context_api
+def log_API(ctx, *swarm_args):
+	vehicle_name = ctx.vehicle_name
+	LogLock.acquire()
+	print(f"{vehicle_name} :-> {inspect.currentframe().f_code.co_name}, {swarm_args}")
+	LogLock.release()
+
+
+@context_api
+def plan_API(ctx, *swarm_args):
+	"""Length of a nearest neighbour tour through swarm_args[0] waypoints of the vehicle, CPU work holding the GIL."""
+	import math
+	import random
+	generator = random.Random(ctx.vehicle_name)
+	points = [(generator.random(), generator.random()) for _ in range(swarm_args[0])]
+	position, length = points.pop(), 0.0
+	while points:
+		index = min(range(len(points)), key=lambda i: math.dist(position, points[i]))
+		length += math.dist(position, points[index])
+		position = points.pop(index)
+	return length
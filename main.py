@@ -1,19 +1,74 @@
 """ Swarm Interpreter """
 import argparse
+import os
+import socket
 import sys
 
+from base.astCache import ASTCache, CodeCache
 from base.error import LexerError, ParserError, SemanticError, InterpreterError
+from interpreter.asyncInterpreter import AsyncInterpreter
+from interpreter.codegen import GeneratedInterpreter, generate
+from interpreter.compiler import CompiledInterpreter
+from interpreter.goalWatch import DEFAULT_GOAL_INTERVAL, DEFAULT_GOAL_PERIOD
 from interpreter.interpreter import Interpreter
+from interpreter.processInterpreter import ProcessInterpreter, run_node
+from interpreter.scheduler import DEFAULT_WORKERS
+from interpreter.transport import TcpTransport, TRANSPORTS, parse_address
 from lexer.lexer import Lexer
+from lexer.tokenArray import TokenArray
 from parser.parser import Parser
 from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
 
 
+def analyze(text, prelex, log_scope):
+	lexer = Lexer(text)
+	try:
+		if prelex:
+			lexer = TokenArray(lexer)
+		parser = Parser(lexer)
+		tree = parser.parse()
+	except (LexerError, ParserError) as e:
+		print(e.message)
+		sys.exit(1)
+
+	semantic_analyzer = SemanticAnalyzer(log_or_not=log_scope)
+	try:
+		semantic_analyzer.visit(tree)
+	except SemanticError as e:
+		print(e.message)
+		sys.exit(1)
+	return tree
+
+
+def print_queue_stats(store):
+	for name, queue in sorted(store.queues.items()):
+		stats = queue.stats()
+		capacity = queue.capacity or 'unbounded'
+		print(f'{name}[]: capacity {capacity}, depth {stats["depth"]}, max depth {stats["max_depth"]}, '
+			  f'put {stats["put"]}, got {stats["got"]}, '
+			  f'put wait {stats["put_wait"]:.3f} s, get wait {stats["get_wait"]:.3f} s')
+
+
+def print_node_stats(nodes):
+	for stats in nodes:
+		busy, calls = stats['busy'], stats['knowledge_calls']
+		throughput = stats['agents'] / busy if busy else 0.0
+		latency = stats['knowledge_seconds'] / calls * 1000 if calls else 0.0
+		print(f'node {stats["name"]}: {stats["agents"]} agents, busy {busy:.3f} s, {throughput:.1f} agents/s, '
+			  f'{calls} knowledge calls, latency {latency:.3f} ms, slowest {stats["knowledge_slowest"] * 1000:.3f} ms')
+
+
+def authkey():
+	"""The key shared by the coordinator and the nodes of other hosts, from SWARM_AUTHKEY."""
+	key = os.environ.get('SWARM_AUTHKEY')
+	return key.encode() if key else None
+
+
 def main():
 	argParser = argparse.ArgumentParser(
 		description='Swarm Interpreter'
 	)
-	argParser.add_argument('inputfile', help='Pascal source file')
+	argParser.add_argument('inputfile', nargs='?', help='Pascal source file')
 	argParser.add_argument(
 		'--scope',
 		help='Print scope information',
@@ -24,8 +79,104 @@ def main():
 		help='Print call stack',
 		action='store_true',
 	)
+	argParser.add_argument(
+		'--prelex',
+		help='Tokenize the whole file before parsing',
+		action='store_true',
+	)
+	argParser.add_argument(
+		'--no-cache',
+		help='Do not read or write the cached AST in __swarmcache__',
+		action='store_true',
+	)
+	argParser.add_argument(
+		'--engine',
+		help='Execution engine: tree walks the AST, compiled runs closures, codegen runs generated Python code, '
+			 'async walks the AST with every agent and routine as a coroutine, '
+			 'process walks the AST with the agents of every each block on nodes, processes of this host or of others',
+		choices=['tree', 'compiled', 'codegen', 'async', 'process'],
+		default='tree',
+	)
+	argParser.add_argument(
+		'--workers',
+		help='Worker threads running the agents and routines, threads blocked in a library call are replaced. '
+			 f'The async engine runs the blocking library calls on them (default {DEFAULT_WORKERS})',
+		type=int,
+		default=DEFAULT_WORKERS,
+	)
+	argParser.add_argument(
+		'--goal-interval',
+		help='A @goal is evaluated when a variable or Knowledge it reads has changed, or after this many seconds '
+			 f'for the state of library calls. 0 evaluates it after every routine round (default {DEFAULT_GOAL_INTERVAL})',
+		type=float,
+		default=DEFAULT_GOAL_INTERVAL,
+	)
+	argParser.add_argument(
+		'--goal-period',
+		help='Seconds between two evaluations of a @goal at least, for the goals without @goal(period). '
+			 f'Empty routines wait as long between their rounds (default {DEFAULT_GOAL_PERIOD})',
+		type=float,
+		default=DEFAULT_GOAL_PERIOD,
+	)
+	argParser.add_argument(
+		'--processes',
+		help='Nodes the process engine starts on this host (default the number of CPUs, none with --nodes)',
+		type=int,
+		default=None,
+	)
+	argParser.add_argument(
+		'--transport',
+		help='How the nodes of the process engine reach this process: local over Unix sockets, '
+			 'tcp for nodes of other hosts too (default local)',
+		choices=sorted(TRANSPORTS),
+		default='local',
+	)
+	argParser.add_argument(
+		'--listen',
+		help='HOST:PORT the tcp transport listens on (default 127.0.0.1 on any free port)',
+		default=None,
+	)
+	argParser.add_argument(
+		'--nodes',
+		help='Nodes of other hosts the process engine waits for, started with --join and the same SWARM_AUTHKEY',
+		type=int,
+		default=0,
+	)
+	argParser.add_argument(
+		'--join',
+		help='Run as a node of the coordinator at HOST:PORT, or at the path of its Unix socket, instead of a program',
+		default=None,
+	)
+	argParser.add_argument(
+		'--node-stats',
+		help='Print the agents, throughput and Knowledge latency of every node of the process engine after the run',
+		action='store_true',
+	)
+	argParser.add_argument(
+		'--virtual-time',
+		help='Run the async engine on a simulated clock: the sleeps of the routines, libraries and platform '
+			 'move it forward instead of waiting, in the same order',
+		action='store_true',
+	)
+	argParser.add_argument(
+		'--queue-stats',
+		help='Print the depth, throughput and waiting time of every KnowledgeQueue after the run',
+		action='store_true',
+	)
 	args = argParser.parse_args()
 
+	if args.join:
+		transport, address = parse_address(args.join)
+		if authkey() is None:
+			print('Set SWARM_AUTHKEY to the key of the coordinator.')
+			sys.exit(1)
+		run_node(address, transport(authkey=authkey()), socket.gethostname())
+		return
+	if args.inputfile is None:
+		argParser.error('the inputfile is required, unless --join is given')
+	if args.virtual_time and args.engine != 'async':
+		argParser.error('--virtual-time runs on --engine async')
+
 	SHOULD_LOG_SCOPE, SHOULD_LOG_STACK = args.scope, args.stack
 	text = open(args.inputfile, 'r', encoding='utf-8').read()
 
@@ -33,27 +184,61 @@ def main():
 		print("Text is None.")
 		sys.exit(1)
 
-	lexer = Lexer(text)
-	try:
-		parser = Parser(lexer)
-		tree = parser.parse()
-	except (LexerError, ParserError) as e:
-		print(e.message)
-		sys.exit(1)
-
-	semantic_analyzer = SemanticAnalyzer(log_or_not=SHOULD_LOG_SCOPE)
-	try:
-		semantic_analyzer.visit(tree)
-	except SemanticError as e:
-		print(e.message)
-		sys.exit(1)
+	# The scope log is printed while analyzing, so it needs a fresh front end
+	cache = None if args.no_cache or SHOULD_LOG_SCOPE else ASTCache(args.inputfile)
+	tree = cache.load(text) if cache else None
+	if tree is None:
+		tree = analyze(text, args.prelex, SHOULD_LOG_SCOPE)
+		if cache:
+			cache.store(text, tree)
 
-	interpreter = Interpreter(tree, log_or_not=SHOULD_LOG_STACK)
+	if args.engine == 'codegen':
+		code_cache = CodeCache(args.inputfile) if cache else None
+		code = code_cache.load(text) if code_cache else None
+		if code is None:
+			code = generate(tree)
+			if code_cache:
+				code_cache.store(text, code)
+		interpreter = GeneratedInterpreter(
+			tree, log_or_not=SHOULD_LOG_STACK, code=code, workers=args.workers,
+			goal_interval=args.goal_interval, goal_period=args.goal_period,
+		)
+	elif args.engine == 'process':
+		if args.nodes and authkey() is None:
+			print('Set SWARM_AUTHKEY, the key of this process and of its nodes, for --nodes.')
+			sys.exit(1)
+		if args.listen:
+			transport, address = parse_address(args.listen)
+			if transport is not TcpTransport:
+				argParser.error('--listen takes HOST:PORT')
+			transport = TcpTransport(*address, authkey=authkey())
+		else:
+			transport = TRANSPORTS[args.transport](authkey=authkey())
+		interpreter = ProcessInterpreter(
+			tree, log_or_not=SHOULD_LOG_STACK, workers=args.workers,
+			goal_interval=args.goal_interval, goal_period=args.goal_period, processes=args.processes,
+			transport=transport, remote_nodes=args.nodes,
+		)
+	elif args.engine == 'async':
+		interpreter = AsyncInterpreter(
+			tree, log_or_not=SHOULD_LOG_STACK, workers=args.workers,
+			goal_interval=args.goal_interval, goal_period=args.goal_period, virtual_time=args.virtual_time,
+		)
+	else:
+		engines = {'tree': Interpreter, 'compiled': CompiledInterpreter}
+		interpreter = engines[args.engine](
+			tree, log_or_not=SHOULD_LOG_STACK, workers=args.workers,
+			goal_interval=args.goal_interval, goal_period=args.goal_period,
+		)
 	try:
 		interpreter.interpret()
 	except InterpreterError as e:
 		print(e.message)
 		sys.exit(1)
+	if args.queue_stats:
+		print_queue_stats(interpreter.knowledge)
+	if args.node_stats and args.engine == 'process':
+		print_node_stats(interpreter.node_stats())
 
 
 if __name__ == '__main__':
@@ -2,6 +2,9 @@ from base.ast import AST
 
 
 class Program(AST):
+	__slots__ = ('platform', 'library_list', 'action_list', 'agent_list', 'behavior_list', 'task_list', 'main', 'knowledge',
+				 'queues')
+
 	def __init__(self, platform, library_list, action_list, agent_list, behavior_list, task_list, main):
 		self.platform = platform
 		self.library_list = library_list
@@ -10,79 +13,115 @@ class Program(AST):
 		self.behavior_list = behavior_list
 		self.task_list = task_list
 		self.main = main
+		self.knowledge = ()		# sorted names of every Knowledge, set by the SemanticAnalyzer
+		self.queues = {}		# KnowledgeQueue name -> capacity, 0 for none, set by the SemanticAnalyzer
 
 
 class Platform(AST):
+	__slots__ = ('name',)
+
 	def __init__(self, name):
 		self.name = name
 
 
 class LibraryList(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class Library(AST):
-	def __init__(self, name):
+	__slots__ = ('name', 'token')
+
+	def __init__(self, name, token=None):
 		self.name = name
+		self.token = token
 
 
 class LibraryCall(AST):
+	__slots__ = ('library', 'postfixes', 'arguments', 'symbol')
+
 	def __init__(self, library, postfixes, arguments):
 		self.library = library
 		self.postfixes = postfixes
 		self.arguments = arguments
+		self.symbol = None  # a reference to library call symbol
 
 
 class ActionList(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class Action(AST):
-	def __init__(self, name, formal_params, compound_statement):
+	__slots__ = ('name', 'formal_params', 'compound_statement', 'token', 'layout')
+
+	def __init__(self, name, formal_params, compound_statement, token=None):
 		self.name = name
 		self.formal_params = formal_params
 		self.compound_statement = compound_statement
+		self.token = token
+		self.layout = None  # variable name -> slot index of its ActivationRecord, set by the semantic analyzer
 
 
 class AgentList(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class Agent(AST):
-	def __init__(self, name, abilities):
+	__slots__ = ('name', 'abilities', 'token')
+
+	def __init__(self, name, abilities, token=None):
 		self.name = name
 		self.abilities = abilities
+		self.token = token
 
 
 class AgentCall(AST):
+	__slots__ = ('agent', 'count', 'symbol')
+
 	def __init__(self, agent, count):
 		self.agent = agent
 		self.count = count
+		self.symbol = None  # a reference to agent symbol
 
 
 class AgentCallList(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class BehaviorList(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class Behavior(AST):
-	def __init__(self, name, formal_params, init_block, goal_block, routine_block):
+	__slots__ = ('name', 'formal_params', 'init_block', 'goal_block', 'routine_block', 'token', 'layout')
+
+	def __init__(self, name, formal_params, init_block, goal_block, routine_block, token=None):
 		self.name = name
 		self.formal_params = formal_params
 		self.init_block = init_block
 		self.goal_block = goal_block
 		self.routine_block = routine_block
+		self.token = token
+		self.layout = None
 
 
 class FunctionCall(AST):
+	__slots__ = ('name', 'actual_params', 'token', 'symbol')
+
 	def __init__(self, name, actual_params, token):
 		self.name = name
 		self.actual_params = actual_params  # a list of AST nodes
@@ -91,21 +130,29 @@ class FunctionCall(AST):
 
 
 class TaskList(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class Task(AST):
-	def __init__(self, name, formal_params_agent_list, formal_params, init_block, goal_block, routine_block):
+	__slots__ = ('name', 'formal_params_agent_list', 'formal_params', 'init_block', 'goal_block', 'routine_block', 'token', 'layout')
+
+	def __init__(self, name, formal_params_agent_list, formal_params, init_block, goal_block, routine_block, token=None):
 		self.name = name
 		self.formal_params_agent_list = formal_params_agent_list
 		self.formal_params = formal_params
 		self.init_block = init_block
 		self.goal_block = goal_block
 		self.routine_block = routine_block
+		self.token = token
+		self.layout = None
 
 
 class TaskCall(AST):
+	__slots__ = ('name', 'actual_params_agent_list', 'actual_params', 'token', 'symbol')
+
 	def __init__(self, name, actual_params_agent_list, actual_params, token):
 		self.name = name
 		self.actual_params_agent_list = actual_params_agent_list
@@ -115,35 +162,50 @@ class TaskCall(AST):
 
 
 class TaskOrder(AST):
+	__slots__ = ('agent_range', 'function_call_statements')
+
 	def __init__(self, agent_range, function_call_statements):
 		self.agent_range = agent_range
 		self.function_call_statements = function_call_statements
 
 
 class TaskEach(AST):
+	__slots__ = ('agent_range', 'function_call_statements')
+
 	def __init__(self, agent_range, function_call_statements):
 		self.agent_range = agent_range
 		self.function_call_statements = function_call_statements
 
 
 class Main(AST):
+	__slots__ = ('agent_call_list', 'task_call', 'layout')
+
 	def __init__(self, agent_call_list, task_call):
 		self.agent_call_list = agent_call_list
 		self.task_call = task_call
+		self.layout = None
 
 
 class InitBlock(AST):
+	__slots__ = ('compound_statement',)
+
 	def __init__(self, compound_statement):
 		self.compound_statement = compound_statement
 
 
 class GoalBlock(AST):
-	def __init__(self, statements, goal):
+	__slots__ = ('statements', 'goal', 'period', 'dependencies')
+
+	def __init__(self, statements, goal, period=None):
 		self.statements = statements
 		self.goal = goal
+		self.period = period		# Num of seconds between two evaluations at least, or None
+		self.dependencies = None
 
 
 class RoutineBlock(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
@@ -151,11 +213,17 @@ class RoutineBlock(AST):
 class Compound(AST):
 	"""Represents a list of statements"""
 
+	__slots__ = ('children', 'knowledge', 'knowledge_puts')
+
 	def __init__(self):
 		self.children = []
+		self.knowledge = ()		# sorted names of the Knowledge it locks while it runs, set by the SemanticAnalyzer
+		self.knowledge_puts = frozenset()	# those it puts, the others are only read
 
 
 class IfElse(AST):
+	__slots__ = ('expression', 'true_compound', 'false_compound')
+
 	def __init__(self, expr, true_cmpd, false_cmpd):
 		self.expression = expr
 		self.true_compound = true_cmpd
@@ -163,26 +231,36 @@ class IfElse(AST):
 
 
 class Return(AST):
+	__slots__ = ('expression',)
+
 	def __init__(self, expr):
 		self.expression = expr
 
 
 class Expression(AST):
+	__slots__ = ('expr',)
+
 	def __init__(self, expr):
 		self.expr = expr
 
 
 class FormalParams(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class AgentRangeList(AST):
+	__slots__ = ('children',)
+
 	def __init__(self):
 		self.children = []
 
 
 class AgentRange(AST):
+	__slots__ = ('agent', 'start', 'end')
+
 	def __init__(self, agent, start, end):
 		self.agent = agent
 		self.start = start
@@ -192,34 +270,48 @@ class AgentRange(AST):
 class Var(AST):
 	"""The Var node is constructed out of ID token."""
 
+	__slots__ = ('token', 'value', 'slot')
+
 	def __init__(self, token):
 		self.token = token
 		self.value = token.value
+		self.slot = None  # index in the ActivationRecord of its scope, None if never assigned there
 
 
 class Knowledge(Var):
+	__slots__ = ()
+
 	def __init__(self, token):
 		super().__init__(token)
 
 
 class KnowledgeQueue(Var):
-	def __init__(self, token):
+	__slots__ = ('capacity',)
+
+	def __init__(self, token, capacity=None):
 		super().__init__(token)
+		self.capacity = capacity	# int declared in the brackets, None if not
 
 
 class Boolean(AST):
+	__slots__ = ('token', 'value')
+
 	def __init__(self, token):
 		self.token = token
 		self.value = token.value
 
 
 class Num(AST):
+	__slots__ = ('token', 'value')
+
 	def __init__(self, token):
 		self.token = token
 		self.value = token.value
 
 
 class String(AST):
+	__slots__ = ('token', 'value')
+
 	def __init__(self, token):
 		self.token = token
 		self.value = token.value
@@ -1,18 +1,116 @@
+import operator
+
 from base.ast import AST
+from lexer.token import TokenType
+
+
+def logical_and(left, right):
+	return left and right
+
+
+def logical_or(left, right):
+	return left or right
+
+
+BINARY_OPERATORS = {
+	TokenType.PLUS: operator.add,
+	TokenType.MINUS: operator.sub,
+	TokenType.MUL: operator.mul,
+	TokenType.DIV: operator.floordiv,
+	TokenType.MOD: operator.mod,
+	TokenType.LESS: operator.lt,
+	TokenType.GREATER: operator.gt,
+	TokenType.LESS_EQUAL: operator.le,
+	TokenType.GREATER_EQUAL: operator.ge,
+	TokenType.IS_EQUAL: operator.eq,
+	TokenType.NOT_EQUAL: operator.ne,
+	TokenType.AND: logical_and,
+	TokenType.OR: logical_or,
+}
+
+UNARY_OPERATORS = {
+	TokenType.PLUS: operator.pos,
+	TokenType.MINUS: operator.neg,
+	TokenType.NOT: operator.not_,
+}
 
 
 class NoOp(AST):
-	pass
+	__slots__ = ()
 
 
 class UnaryOp(AST):
+	__slots__ = ('token', 'op', 'expr', 'fn')
+
 	def __init__(self, op, expr):
 		self.token = self.op = op
 		self.expr = expr
+		self.fn = UNARY_OPERATORS[op.category]	# resolved once, at parse time
 
 
 class BinOp(AST):
+	__slots__ = ('left', 'token', 'op', 'right', 'fn')
+
 	def __init__(self, left, op, right):
 		self.left = left
 		self.token = self.op = op
 		self.right = right
+		self.fn = BINARY_OPERATORS[op.category]	# resolved once, at parse time
+
+
+class Assign(AST):
+	__slots__ = ('left', 'token', 'right')
+
+	def __init__(self, left, token, right):
+		self.left = left	# Var
+		self.token = token
+		self.right = right	# expression, String or FunctionCall
+
+
+class Put(AST):
+	__slots__ = ('value', 'token', 'knowledge', 'each')
+
+	def __init__(self, value, token, knowledge, each=False):
+		self.value = value
+		self.token = token
+		self.knowledge = knowledge	# Knowledge or KnowledgeQueue
+		self.each = each			# put every item of the value to the KnowledgeQueue
+
+
+class Get(AST):
+	__slots__ = ('var', 'token', 'knowledge', 'limit', 'timeout', 'default')
+
+	def __init__(self, var, token, knowledge, limit=None, timeout=None, default=None):
+		self.var = var
+		self.token = token
+		self.knowledge = knowledge	# Knowledge or KnowledgeQueue
+		# KnowledgeQueue only: a list of up to limit items, 0 for all, None for one item.
+		# default is the value got if no item came within timeout seconds, None waits for ever
+		self.limit = limit
+		self.timeout = timeout
+		self.default = default
+
+
+class Modify(AST):
+	"""Atomic read-modify-write of a Knowledge: get var, put value if guard holds."""
+	__slots__ = ('var', 'token', 'knowledge', 'value', 'guard', 'locked')
+
+	def __init__(self, var, token, knowledge, value, guard=None):
+		self.var = var
+		self.token = token
+		self.knowledge = knowledge	# Knowledge only
+		self.value = value
+		self.guard = guard			# expression or None
+		self.locked = False			# whether the enclosing Compound holds the Knowledge, set by the SemanticAnalyzer
+
+
+class Watch(AST):
+	"""Wait for a write of a Knowledge, or until condition holds on var, without polling."""
+	__slots__ = ('var', 'token', 'knowledge', 'condition', 'timeout')
+
+	def __init__(self, var, token, knowledge, condition=None, timeout=None):
+		self.var = var
+		self.token = token
+		self.knowledge = knowledge	# Knowledge only
+		self.condition = condition	# expression or None for the next write
+		self.timeout = timeout		# seconds, None waits for ever
@@ -1,20 +1,27 @@
 from base.error import ParserError, ErrorCode
 from lexer.token import *
+from lexer.tokenStream import TokenStream
 from parser.element import *
-from parser.operator import NoOp, UnaryOp, BinOp
+from parser.operator import NoOp, UnaryOp, BinOp, Assign, Put, Get, Modify, Watch
 
 
 class BaseParser(object):
 	def __init__(self, lexer):
 		self.lexer = lexer
+		# tokens scanned ahead of current_token are kept in the stream
+		self.tokens = TokenStream(lexer)
 		# set current token to the first token taken from the input
-		self.current_token = self.lexer.get_next_token()
+		self.current_token = self.tokens.next()
 
 	def get_next_token(self):
-		return self.lexer.get_next_token()
+		return self.tokens.next()
+
+	def peek(self, n=1):
+		# the n-th token after current_token
+		return self.tokens.peek(n)
 
 	def peek_next_token(self):
-		return self.lexer.peek_next_token()
+		return self.tokens.peek()
 
 	def error(self, error_code, token):
 		raise ParserError(
@@ -74,7 +81,7 @@ class Parser(BaseParser):
 		# library ::= "Import" variable
 		self.eat(TokenType.IMPORT)
 		node = self.variable()
-		node = Library(node)
+		node = Library(name=node, token=node.token)
 		return node
 	
 	def library_call(self):
@@ -113,7 +120,7 @@ class Parser(BaseParser):
 			formal_params_nodes = self.formal_parameters()
 		self.eat(TokenType.R_PAREN)
 		action_compound_node = self.action_compound()
-		node = Action(name=action_name, formal_params=formal_params_nodes, compound_statement=action_compound_node)
+		node = Action(name=action_name, formal_params=formal_params_nodes, compound_statement=action_compound_node, token=var_node.token)
 		return node
 
 	def action_compound(self):
@@ -134,6 +141,8 @@ class Parser(BaseParser):
 		# 					| assignment_statement
 		# 					| put_statement
 		# 					| get_statement
+		# 					| modify_statement
+		# 					| watch_statement
 		# 					| empty_statement 
 		if self.current_token.category == TokenType.IF:
 			node = self.action_if_else()
@@ -148,6 +157,10 @@ class Parser(BaseParser):
 			node = self.put_statement()
 		elif self.current_token.category == TokenType.GET:
 			node = self.get_statement()
+		elif self.current_token.category == TokenType.MODIFY:
+			node = self.modify_statement()
+		elif self.current_token.category == TokenType.WATCH:
+			node = self.watch_statement()
 		else:
 			node = self.empty_statement()
 		return node
@@ -196,7 +209,7 @@ class Parser(BaseParser):
 				node = self.variable()
 				ability_root.children.append(node)
 			self.eat(TokenType.SEMI)
-		agent_node = Agent(name=agent_name, abilities=ability_root)
+		agent_node = Agent(name=agent_name, abilities=ability_root, token=var_node.token)
 		self.eat(TokenType.R_BRACE)
 		return agent_node
 
@@ -231,7 +244,7 @@ class Parser(BaseParser):
 		goal_node = self.behavior_goal_block()
 		routine_node = self.behavior_routine_block()
 		node = Behavior(name=behavior_name, formal_params=formal_params_nodes,
-						init_block=init_node, goal_block=goal_node, routine_block=routine_node)
+						init_block=init_node, goal_block=goal_node, routine_block=routine_node, token=var_node.token)
 		self.eat(TokenType.R_BRACE)
 		return node
 
@@ -243,8 +256,11 @@ class Parser(BaseParser):
 		return node
 
 	def behavior_goal_block(self):
-		# behavior_goal_block ::= "@goal" "{" ( behavior_statement* "$" expression )? "}"
+		# behavior_goal_block ::= "@goal" goal_period? "{" ( behavior_statement* "$" expression )? "}"
 		self.eat(TokenType.GOAL)
+		period_node = None
+		if self.current_token.category == TokenType.L_PAREN:
+			period_node = self.goal_period()
 		self.eat(TokenType.L_BRACE)
 		statements_root = Compound()
 		if self.current_token.category != TokenType.R_BRACE:
@@ -256,10 +272,20 @@ class Parser(BaseParser):
 			goal_node = Expression(self.expression())
 		else:
 			goal_node = Expression(NoOp())
-		node = GoalBlock(statements=statements_root, goal=goal_node)
+		node = GoalBlock(statements=statements_root, goal=goal_node, period=period_node)
 		self.eat(TokenType.R_BRACE)
 		return node
 
+	def goal_period(self):
+		# goal_period ::= "(" ( integer | float ) ")"
+		self.eat(TokenType.L_PAREN)
+		if self.current_token.category == TokenType.FLOAT:
+			node = self.float()
+		else:
+			node = self.integer()
+		self.eat(TokenType.R_PAREN)
+		return node
+
 	def behavior_routine_block(self):
 		# behavior_routine_block ::= "@routine" behavior_compound ( "||" behavior_compound )*
 		self.eat(TokenType.ROUTINE)
@@ -353,7 +379,7 @@ class Parser(BaseParser):
 		routine_node = self.task_routine_block()
 		node = Task(name=task_name, formal_params_agent_list=formal_params_agent_list,
 					formal_params=formal_params_nodes,
-					init_block=init_node, goal_block=goal_node, routine_block=routine_node)
+					init_block=init_node, goal_block=goal_node, routine_block=routine_node, token=var_node.token)
 		self.eat(TokenType.R_BRACE)
 		return node
 
@@ -365,8 +391,11 @@ class Parser(BaseParser):
 		return node
 
 	def task_goal_block(self):
-		# task_goal_block ::= "@goal" "{" ( task_statement* "$" expression )? "}"
+		# task_goal_block ::= "@goal" goal_period? "{" ( task_statement* "$" expression )? "}"
 		self.eat(TokenType.GOAL)
+		period_node = None
+		if self.current_token.category == TokenType.L_PAREN:
+			period_node = self.goal_period()
 		self.eat(TokenType.L_BRACE)
 		statements_root = Compound()
 		if self.current_token.category != TokenType.R_BRACE:
@@ -378,7 +407,7 @@ class Parser(BaseParser):
 			goal_node = Expression(self.expression())
 		else:
 			goal_node = Expression(NoOp())
-		node = GoalBlock(statements=statements_root, goal=goal_node)
+		node = GoalBlock(statements=statements_root, goal=goal_node, period=period_node)
 		self.eat(TokenType.R_BRACE)
 		return node
 
@@ -413,6 +442,8 @@ class Parser(BaseParser):
 		# 					| assignment_statement
 		# 					| put_statement
 		# 					| get_statement
+		# 					| modify_statement
+		# 					| watch_statement
 		# 					| empty_statement
 		if self.current_token.category == TokenType.ORDER:
 			node = self.task_order()
@@ -428,6 +459,10 @@ class Parser(BaseParser):
 			node = self.put_statement()
 		elif self.current_token.category == TokenType.GET:
 			node = self.get_statement()
+		elif self.current_token.category == TokenType.MODIFY:
+			node = self.modify_statement()
+		elif self.current_token.category == TokenType.WATCH:
+			node = self.watch_statement()
 		else:
 			node = self.empty_statement()
 		return node
@@ -525,40 +560,114 @@ class Parser(BaseParser):
 		else:
 			right = self.expression()
 			self.eat(TokenType.SEMI)
-		node = BinOp(left, token, right)
+		node = Assign(left, token, right)
 		return node
 
 	def put_statement(self):
-		# put_statement ::= "put" ( string | expression ) "to" ( knowledge | knowledge_queue ) ";"
+		# put_statement ::= "put" "each"? ( string | expression ) "to" ( knowledge | knowledge_queue ) ";"
 		token = self.current_token
 		self.eat(TokenType.PUT)
+		each = self.current_token.category == TokenType.EACH
+		if each:
+			self.eat(TokenType.EACH)
 		if self.current_token.category == TokenType.STRING:
 			value = self.string()
 		else:
 			value = self.expression()
 		self.eat(TokenType.TO)
 		# knowledge or knowledge queue
-		if self.lexer.peek_next_token().category == TokenType.L_BRACKET:
+		if self.peek_next_token().category == TokenType.L_BRACKET:
 			knowledge = self.knowledgeQueue()
 		else:
 			knowledge = self.knowledge()
+		if each and not isinstance(knowledge, KnowledgeQueue):
+			self.error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=knowledge.token)
 		self.eat(TokenType.SEMI)
-		node = BinOp(value, token, knowledge)
+		node = Put(value, token, knowledge, each)
 		return node
 
 	def get_statement(self):
-		# get_statement ::= "get" variable "from" ( knowledge | knowledge_queue ) ";"
+		# get_statement ::= "get" get_batch? variable "from" ( knowledge | knowledge_queue get_timeout? ) ";"
 		token = self.current_token
 		self.eat(TokenType.GET)
+		limit = None
+		if self.current_token.category == TokenType.EACH:
+			limit = self.get_batch()
 		var = self.variable()
 		self.eat(TokenType.FROM)
 		# knowledge or knowledge queue
-		if self.lexer.peek_next_token().category == TokenType.L_BRACKET:
+		timeout = default = None
+		if self.peek_next_token().category == TokenType.L_BRACKET:
 			knowledge = self.knowledgeQueue()
+			if self.current_token.category in (TokenType.WITHIN, TokenType.ELSE):
+				timeout, default = self.get_timeout()
 		else:
 			knowledge = self.knowledge()
+			if limit is not None:
+				self.error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=knowledge.token)
 		self.eat(TokenType.SEMI)
-		node = BinOp(var, token, knowledge)
+		node = Get(var, token, knowledge, limit, timeout, default)
+		return node
+
+	def get_batch(self):
+		# get_batch ::= "each" ( "(" integer ")" )?
+		self.eat(TokenType.EACH)
+		limit = 0		# every item
+		if self.current_token.category == TokenType.L_PAREN:
+			self.eat(TokenType.L_PAREN)
+			limit = self.integer().value
+			self.eat(TokenType.R_PAREN)
+		return limit
+
+	def get_timeout(self):
+		# get_timeout ::= ( "within" ( integer | float ) )? "else" expression
+		timeout = 0		# no waiting
+		if self.current_token.category == TokenType.WITHIN:
+			self.eat(TokenType.WITHIN)
+			if self.current_token.category == TokenType.FLOAT:
+				timeout = self.float().value
+			else:
+				timeout = self.integer().value
+		self.eat(TokenType.ELSE)
+		default = self.expression()
+		return timeout, default
+
+	def modify_statement(self):
+		# modify_statement ::= "modify" variable "from" knowledge "to" expression ( "when" expression )? ";"
+		token = self.current_token
+		self.eat(TokenType.MODIFY)
+		var = self.variable()
+		self.eat(TokenType.FROM)
+		knowledge = self.knowledge()
+		self.eat(TokenType.TO)
+		value = self.expression()
+		guard = None
+		if self.current_token.category == TokenType.WHEN:
+			self.eat(TokenType.WHEN)
+			guard = self.expression()
+		self.eat(TokenType.SEMI)
+		node = Modify(var, token, knowledge, value, guard)
+		return node
+
+	def watch_statement(self):
+		# watch_statement ::= "watch" variable "from" knowledge ( "until" expression )? ( "within" ( integer | float ) )? ";"
+		token = self.current_token
+		self.eat(TokenType.WATCH)
+		var = self.variable()
+		self.eat(TokenType.FROM)
+		knowledge = self.knowledge()
+		condition = timeout = None
+		if self.current_token.category == TokenType.UNTIL:
+			self.eat(TokenType.UNTIL)
+			condition = self.expression()
+		if self.current_token.category == TokenType.WITHIN:
+			self.eat(TokenType.WITHIN)
+			if self.current_token.category == TokenType.FLOAT:
+				timeout = self.float().value
+			else:
+				timeout = self.integer().value
+		self.eat(TokenType.SEMI)
+		node = Watch(var, token, knowledge, condition, timeout)
 		return node
 
 	def empty_statement(self):
@@ -783,12 +892,15 @@ class Parser(BaseParser):
 		return node
 	
 	def knowledgeQueue(self):
-		# knowledge_queue ::= variable "[" "]"
-		node = KnowledgeQueue(self.current_token)
+		# knowledge_queue ::= variable "[" integer? "]"
+		token = self.current_token
 		self.eat(TokenType.ID)
 		self.eat(TokenType.L_BRACKET)
+		capacity = None
+		if self.current_token.category == TokenType.INTEGER:
+			capacity = self.integer().value
 		self.eat(TokenType.R_BRACKET)
-		return node
+		return KnowledgeQueue(token, capacity)
 	
 	def boolean(self):
 		# boolean ::= "False" | "True"
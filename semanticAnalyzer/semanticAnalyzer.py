@@ -1,14 +1,103 @@
+from base.ast import AST
 from base.error import SemanticError, ErrorCode
 from base.nodeVisitor import NodeVisitor
 from lexer.token import TokenType
+from parser.element import Compound, FunctionCall, Knowledge, Var
+from parser.operator import Assign, Get, Modify, Put, Watch
 from semanticAnalyzer.symbolTable import *
 
 
+def children(node):
+	"""The AST nodes and lists of nodes held by the slots of node."""
+	values = []
+	for cls in type(node).__mro__:
+		for name in getattr(cls, '__slots__', ()):
+			values.append(getattr(node, name, None))
+	return values
+
+
+def walk(node):
+	"""Yield node and the AST nodes below it, in source order."""
+	stack = [node]
+	while stack:
+		node = stack.pop()
+		if isinstance(node, AST):
+			yield node
+			stack.extend(reversed(children(node)))
+		elif isinstance(node, list):
+			stack.extend(reversed(node))
+
+
+def watches(node):
+	"""Yield the Watch statements below node and in the Actions and Behaviors it calls."""
+	seen = set()
+	stack = [node]
+	while stack:
+		for child in walk(stack.pop()):
+			if isinstance(child, Watch):
+				yield child
+			elif isinstance(child, FunctionCall) and child.symbol is not None and child.symbol.ast is not None:
+				if id(child.symbol.ast) not in seen:
+					seen.add(id(child.symbol.ast))
+					stack.append(child.symbol.ast)
+
+
+class GoalDependencies(object):
+	"""What a @goal reads: the slots of Behavior/Task variables and the names of Knowledge."""
+	__slots__ = ('slots', 'knowledge')
+
+	def __init__(self, slots=(), knowledge=()):
+		self.slots = tuple(slots)
+		self.knowledge = tuple(knowledge)
+
+	def __repr__(self):
+		return f'GoalDependencies({self.slots!r}, {self.knowledge!r})'
+
+
+def goal_dependencies(goal_block):
+	"""The GoalDependencies of an analyzed GoalBlock, including the Knowledge got by the Actions it calls.
+
+	A variable the goal assigns before reading it is computed by the goal,
+	not one of its inputs. State outside the ActivationRecords, like what a
+	library call returns, is not tracked.
+	"""
+	slots, knowledge = set(), set()
+	assigned = set()
+	called = set()
+
+	def read(node, local):
+		targets = set()
+		for child in walk(node):
+			if isinstance(child, Assign):
+				targets.add(id(child.left))
+			elif isinstance(child, (Get, Modify, Watch)):
+				targets.add(id(child.var))
+				if isinstance(child.knowledge, Knowledge):
+					knowledge.add(child.knowledge.value)
+			elif isinstance(child, FunctionCall) and child.symbol.name not in called:
+				called.add(child.symbol.name)
+				read(child.symbol.ast, local=False)		# variables of the callee are its own
+			elif local and type(child) is Var and id(child) not in targets:
+				if child.value not in assigned and child.slot is not None:
+					slots.add(child.slot)
+
+	for statement in goal_block.statements.children:
+		read(statement, local=True)
+		if isinstance(statement, Assign):
+			assigned.add(statement.left.value)
+		elif isinstance(statement, (Get, Modify, Watch)):
+			assigned.add(statement.var.value)
+	read(goal_block.goal, local=True)
+	return GoalDependencies(sorted(slots), sorted(knowledge))
+
+
 class SemanticAnalyzer(NodeVisitor):
 	def __init__(self, log_or_not=False):
 		self.current_scope = None
 		self.global_scope = None
 		self.log_or_not = log_or_not
+		self.knowledge = set()		# names of the Knowledge put or got in the program
+		self.queues = {}		# KnowledgeQueue name -> capacity declared in its brackets
 
 	def visit_Program(self, node):
 		self.log('Enter scope: global')
@@ -30,6 +119,11 @@ class SemanticAnalyzer(NodeVisitor):
 		self.visit(node.behavior_list)
 		self.visit(node.task_list)
 		self.visit(node.main)
+		# after every Action has been analyzed, a goal may call any of them
+		for routine in node.behavior_list.children + node.task_list.children:
+			routine.goal_block.dependencies = goal_dependencies(routine.goal_block)
+		node.knowledge = tuple(sorted(self.knowledge))
+		node.queues = {name: capacity or 0 for name, capacity in self.queues.items()}
 
 		self.log(self.current_scope)
 		self.current_scope = self.current_scope.enclosing_scope
@@ -94,8 +188,10 @@ class SemanticAnalyzer(NodeVisitor):
 			param_category = None  # self.current_scope.lookup(param_name)
 			var_symbol = VarSymbol(param_name, param_category)
 			self.current_scope.insert(var_symbol)
+			var_symbol.slot = self.current_scope.slot(param_name)
 
 		self.visit(node.compound_statement)
+		node.layout = self.resolve_slots(node.compound_statement)
 		self.log(action_scope)
 		self.current_scope = self.current_scope.enclosing_scope
 		self.log('Leave ACTION scope: %s \n\n' % action_name)
@@ -149,6 +245,7 @@ class SemanticAnalyzer(NodeVisitor):
 		if agent_symbol is None:
 			self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.agent.token)
 		self.current_scope.insert(agent_symbol)
+		self.current_scope.slot(agent_name)
 		node.symbol = agent_symbol
 
 	def visit_AgentCallList(self, node):
@@ -189,12 +286,14 @@ class SemanticAnalyzer(NodeVisitor):
 			param_category = None  # self.current_scope.lookup(param_name)
 			var_symbol = VarSymbol(param_name, param_category)
 			self.current_scope.insert(var_symbol)
+			var_symbol.slot = self.current_scope.slot(param_name)
 
 		# visit routine_block before goal_block,
 		# because variables may be defined in routine_block
 		self.visit(node.init_block)
 		self.visit(node.routine_block)
 		self.visit(node.goal_block)
+		node.layout = self.resolve_slots(node.init_block, node.routine_block, node.goal_block)
 		self.log(behavior_scope)
 		self.current_scope = self.current_scope.enclosing_scope
 		self.log('Leave BEHAVIOR scope: %s \n\n' % behavior_name)
@@ -252,17 +351,21 @@ class SemanticAnalyzer(NodeVisitor):
 			self.current_scope.insert(st_smbl)
 			nd_smbl = VarSymbol(agent_range.end.value, None)
 			self.current_scope.insert(nd_smbl)
+			for smbl in (agt_smbl, st_smbl, nd_smbl):
+				smbl.slot = self.current_scope.slot(smbl.name)
 		for param in node.formal_params.children:
 			param_name = param.value
 			param_category = None  # self.current_scope.lookup(param_name)
 			var_symbol = VarSymbol(param_name, param_category)
 			self.current_scope.insert(var_symbol)
+			var_symbol.slot = self.current_scope.slot(param_name)
 
 		# visit routine_block before goal_block,
 		# because variables may be defined in routine_block
 		self.visit(node.init_block)
 		self.visit(node.routine_block)
 		self.visit(node.goal_block)
+		node.layout = self.resolve_slots(node.init_block, node.routine_block, node.goal_block)
 		self.log(task_scope)
 		self.current_scope = self.current_scope.enclosing_scope
 		self.log('Leave TASK scope: %s \n\n' % task_name)
@@ -318,6 +421,7 @@ class SemanticAnalyzer(NodeVisitor):
 		self.current_scope = main_scope
 		self.visit(node.agent_call_list)
 		self.visit(node.task_call)
+		node.layout = self.resolve_slots(node.agent_call_list, node.task_call)
 		self.current_scope = self.current_scope.enclosing_scope
 		self.log('Leave MAIN scope')
 
@@ -335,6 +439,39 @@ class SemanticAnalyzer(NodeVisitor):
 	def visit_Compound(self, node):
 		for child in node.children:
 			self.visit(child)
+		# locked in this order while the Compound runs, for writing those it puts
+		knowledge = {
+			child.knowledge.value for child in node.children
+			if isinstance(child, (Put, Get)) and isinstance(child.knowledge, Knowledge)
+		}
+		puts = {
+			child.knowledge.value for child in node.children
+			if isinstance(child, Put) and isinstance(child.knowledge, Knowledge)
+		}
+		# a modify locks its Knowledge only while it runs, unless the Compound locks Knowledge: then the Compound
+		# holds the write lock of the modified names too, taking them in the sorted order of its other locks.
+		# A Compound writing Knowledge also takes the locks of the Compounds of its if/else bodies, which would lock
+		# them a second time, one only reading it holds no lock while it runs
+		if knowledge:
+			below = list(walk(node))[1:]
+			modifies = [child for child in below if isinstance(child, Modify)]
+			compounds = [child for child in below if isinstance(child, Compound)]
+			if puts or modifies or any(compound.knowledge_puts for compound in compounds):
+				for compound in compounds:
+					knowledge.update(compound.knowledge)
+					puts.update(compound.knowledge_puts)
+					compound.knowledge = ()
+					compound.knowledge_puts = frozenset()
+				for modify in modifies:
+					modify.locked = True
+					knowledge.add(modify.knowledge.value)
+					puts.add(modify.knowledge.value)
+		node.knowledge = tuple(sorted(knowledge))
+		node.knowledge_puts = frozenset(puts)
+		# a watch waits for writers, which the locks of the Compound would keep out
+		if puts:
+			for watch in watches(node):
+				self.error(error_code=ErrorCode.WATCH_UNDER_LOCK, token=watch.token)
 
 	def visit_IfElse(self, node):
 		self.visit(node.expression)
@@ -426,52 +563,114 @@ class SemanticAnalyzer(NodeVisitor):
 				return right_symbol.category
 			else:
 				return None
-		elif node.op.category == TokenType.ASSIGN:
-			left_var_name = node.left.value
-			category_symbol = self.current_scope.lookup(left_var_name)
-			if category_symbol is None:
-				right_symbol = self.visit(node.right)
-				if isinstance(right_symbol, BuiltinTypeSymbol):
-					var_symbol = VarSymbol(left_var_name, right_symbol)
-				else:
-					var_symbol = VarSymbol(left_var_name, right_symbol.category)
-				self.current_scope.insert(var_symbol)
-			elif isinstance(category_symbol, LibrarySymbol):
-				self.error(error_code=ErrorCode.LIBRARY_CANNOT_BE_ASSIGNED, token=node.left.token)
-				# library can only be accessed, can't be assigned.
-			else:
-				self.visit(node.right)	# node.right is a action_call, should visit it to set node.symbol.ast
-		elif node.op.category == TokenType.PUT:
-			expr_node = node.left
-			expr_symbol = self.visit(expr_node)
-			stigmergy_name = node.right.value
-			stigmergy_symbol = self.global_scope.lookup(stigmergy_name)
-			if stigmergy_symbol is None:
-				var_symbol = VarSymbol(stigmergy_name, expr_symbol)
-				self.global_scope.insert(var_symbol)
-		elif node.op.category == TokenType.GET:
-			var_node = node.left
-			var_symbol = self.current_scope.lookup(var_node.value)
-			# if var_symbol is not None:
-			# 	self.error(error_code=ErrorCode.DUPLICATE_ID, token=node.left.token)
-			stigmergy_name = node.right.value
-			stigmergy_symbol = self.global_scope.lookup(stigmergy_name)
-			# if stigmergy_symbol is None:
-			# 	self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.right.token)
-			# var_symbol = VarSymbol(var_node.value, stigmergy_symbol.category)
-			var_symbol = VarSymbol(var_node.value, None)
-			self.current_scope.insert(var_symbol)
 		else:
 			# do not need to check symbol category
 			# because both side can be formal_param whose category is 'None' or anything
 			return
 
+	def visit_Assign(self, node):
+		left_var_name = node.left.value
+		category_symbol = self.current_scope.lookup(left_var_name)
+		if category_symbol is None:
+			right_symbol = self.visit(node.right)
+			if isinstance(right_symbol, BuiltinTypeSymbol):
+				var_symbol = VarSymbol(left_var_name, right_symbol)
+			else:
+				var_symbol = VarSymbol(left_var_name, right_symbol.category)
+			self.current_scope.insert(var_symbol)
+		elif isinstance(category_symbol, LibrarySymbol):
+			self.error(error_code=ErrorCode.LIBRARY_CANNOT_BE_ASSIGNED, token=node.left.token)
+			# library can only be accessed, can't be assigned.
+		else:
+			self.visit(node.right)	# node.right is a action_call, should visit it to set node.symbol.ast
+
+	def visit_Put(self, node):
+		expr_node = node.value
+		expr_symbol = self.visit(expr_node)
+		stigmergy_name = node.knowledge.value
+		if isinstance(node.knowledge, Knowledge):
+			self.knowledge.add(stigmergy_name)
+		else:
+			self.declare_queue(node.knowledge)
+		stigmergy_symbol = self.global_scope.lookup(stigmergy_name)
+		if stigmergy_symbol is None:
+			var_symbol = VarSymbol(stigmergy_name, expr_symbol)
+			self.global_scope.insert(var_symbol)
+
+	def visit_Get(self, node):
+		var_node = node.var
+		var_symbol = self.current_scope.lookup(var_node.value)
+		# if var_symbol is not None:
+		# 	self.error(error_code=ErrorCode.DUPLICATE_ID, token=node.var.token)
+		stigmergy_name = node.knowledge.value
+		if isinstance(node.knowledge, Knowledge):
+			self.knowledge.add(stigmergy_name)
+		else:
+			self.declare_queue(node.knowledge)
+		if node.default is not None:
+			self.visit(node.default)
+		stigmergy_symbol = self.global_scope.lookup(stigmergy_name)
+		# if stigmergy_symbol is None:
+		# 	self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.knowledge.token)
+		# var_symbol = VarSymbol(var_node.value, stigmergy_symbol.category)
+		var_symbol = VarSymbol(var_node.value, None)
+		self.current_scope.insert(var_symbol)
+
+	def declare_queue(self, node):
+		"""Record the capacity of a KnowledgeQueue, which every bracket declaring one must agree on."""
+		capacity = self.queues.get(node.value)
+		if node.capacity is not None and capacity is not None and capacity != node.capacity:
+			self.error(error_code=ErrorCode.QUEUE_CAPACITY_MISMATCH, token=node.token)
+		if capacity is None:
+			self.queues[node.value] = node.capacity
+
+	def visit_Modify(self, node):
+		# the variable holds the value got, before the new one is computed from it
+		self.current_scope.insert(VarSymbol(node.var.value, None))
+		self.visit(node.value)
+		if node.guard is not None:
+			self.visit(node.guard)
+		stigmergy_name = node.knowledge.value
+		self.knowledge.add(stigmergy_name)
+		if self.global_scope.lookup(stigmergy_name) is None:
+			self.global_scope.insert(VarSymbol(stigmergy_name, None))
+
+	def visit_Watch(self, node):
+		self.current_scope.insert(VarSymbol(node.var.value, None))
+		if node.condition is not None:
+			self.visit(node.condition)
+		stigmergy_name = node.knowledge.value
+		self.knowledge.add(stigmergy_name)
+		if self.global_scope.lookup(stigmergy_name) is None:
+			self.global_scope.insert(VarSymbol(stigmergy_name, None))
+
 	def visit_UnaryOp(self, node):
 		return self.visit(node.expr)
 
 	def visit_NoOp(self, node):
 		return None
 
+	def resolve_slots(self, *nodes):
+		"""Give every variable assigned in the current scope a slot, and every Var the slot of its name.
+
+		A Var whose name is never assigned in the scope keeps slot None, it is
+		not found at runtime, as the ActivationRecord has no such member.
+		"""
+		scope = self.current_scope
+		nodes = [child for node in nodes for child in walk(node)]
+		for node in nodes:
+			if isinstance(node, Assign):
+				scope.slot(node.left.value)
+			elif isinstance(node, (Get, Modify, Watch)):
+				scope.slot(node.var.value)
+		for node in nodes:
+			if type(node) is Var:
+				node.slot = scope.layout.get(node.value)
+		for symbol in scope._symbols.values():
+			if isinstance(symbol, VarSymbol) and symbol.name in scope.layout:
+				symbol.slot = scope.layout[symbol.name]
+		return scope.layout
+
 	def log(self, msg):
 		if self.log_or_not:
 			print(msg)
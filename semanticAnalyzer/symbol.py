@@ -26,6 +26,7 @@ class Symbol(object):
 class VarSymbol(Symbol):
 	def __init__(self, name, category):
 		super().__init__(name, category)
+		self.slot = None	# index in the ActivationRecord of its scope
 
 	def __repr__(self):
 		return "<{class_name}(name='{name}', category='{category}')>".format(
@@ -8,6 +8,7 @@ class ScopedSymbolTable(object):
 		self.scope_level = scope_level
 		self.enclosing_scope = enclosing_scope
 		self.log_or_not = log_or_not
+		self.layout = {}	# variable name -> slot index, for scopes that have an ActivationRecord
 
 	def _init_builtins(self):
 		self.insert(BuiltinTypeSymbol('INTEGER'))
@@ -49,6 +50,11 @@ class ScopedSymbolTable(object):
 		symbol.scope_level = self.scope_level
 		self._symbols[symbol.name] = symbol
 
+	def slot(self, name):
+		if name not in self.layout:
+			self.layout[name] = len(self.layout)
+		return self.layout[name]
+
 	def lookup(self, name, current_scope_only=False, log_or_not=True):
 		if log_or_not:
 			self.log('Lookup: %s. (Scope name: %s)' % (name, self.scope_name))
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class ASTCacheTestCase(unittest.TestCase):
+	def setUp(self):
+		self.tmp_dir = tempfile.mkdtemp()
+		self.source_path = os.path.join(self.tmp_dir, 'mission.swarm')
+		with open(os.path.join(os.path.dirname(__file__), 'test_example.swarm'), 'r', encoding='utf-8') as f:
+			self.text = f.read()
+
+	def tearDown(self):
+		shutil.rmtree(self.tmp_dir)
+
+	def makeCache(self):
+		from base.astCache import ASTCache
+		return ASTCache(self.source_path)
+
+	def analyze(self, text):
+		from lexer.lexer import Lexer
+		from parser.parser import Parser
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		tree = Parser(Lexer(text)).parse()
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		return tree
+
+	def nodes(self, tree):
+		from base.ast import AST
+		nodes, stack = [], [tree]
+		while stack:
+			node = stack.pop()
+			if isinstance(node, AST) and all(node is not n for n in nodes):
+				nodes.append(node)
+				for cls in type(node).__mro__:
+					stack.extend(getattr(node, slot, None) for slot in getattr(cls, '__slots__', ()))
+			elif isinstance(node, list):
+				stack.extend(node)
+		return nodes
+
+	def test_roundtrip_keeps_bound_symbols(self):
+		self.makeCache().store(self.text, self.analyze(self.text))
+		tree = self.makeCache().load(self.text)
+		self.assertIsNotNone(tree)
+		nodes = self.nodes(tree)
+		bound = [node for node in nodes if getattr(getattr(node, 'symbol', None), 'ast', None) is not None]
+		self.assertTrue(bound)
+		for node in bound:
+			self.assertTrue(any(node.symbol.ast is n for n in nodes))
+
+	def test_miss(self):
+		self.assertIsNone(self.makeCache().load(self.text))
+
+	def test_stale_entry_is_evicted(self):
+		cache = self.makeCache()
+		cache.store(self.text, self.analyze(self.text))
+		self.assertIsNone(cache.load(self.text + '\n'))
+		self.assertFalse(os.path.exists(cache.path))
+
+	def test_corrupt_entry_is_evicted(self):
+		cache = self.makeCache()
+		cache.store(self.text, self.analyze(self.text))
+		with open(cache.path, 'r+b') as f:
+			f.seek(-16, os.SEEK_END)
+			f.truncate()
+		self.assertIsNone(cache.load(self.text))
+		self.assertFalse(os.path.exists(cache.path))
+
+
+if __name__ == '__main__':
+	unittest.main()
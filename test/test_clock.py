@@ -0,0 +1,58 @@
+import asyncio
+import concurrent.futures
+import time
+import unittest
+
+from interpreter.clock import VirtualClock, VirtualTimeLoop
+
+
+class VirtualClockTestCase(unittest.TestCase):
+
+	def test_sleeps_keep_their_order(self):
+		"""Coroutines and library threads wake in the order of their virtual times, without waiting."""
+		clock = VirtualClock()
+		loop = VirtualTimeLoop(clock)
+		executor = concurrent.futures.ThreadPoolExecutor(4)
+		woken = []
+
+		def library(name, seconds):
+			sum(range(100000))		# time stands still while it computes
+			clock.sleep(seconds)
+			woken.append((name, clock.now()))
+
+		async def call(name, seconds):
+			with clock.running():
+				await loop.run_in_executor(executor, library, name, seconds)
+
+		async def routine(name, seconds):
+			await asyncio.sleep(seconds)
+			woken.append((name, clock.now()))
+
+		async def mission():
+			await asyncio.gather(
+				call('takePicture', 5), routine('flyTo', 3), call('getPosition', 0.5), routine('hover', 60),
+			)
+
+		start = time.perf_counter()
+		try:
+			loop.run_until_complete(mission())
+		finally:
+			executor.shutdown()
+			loop.close()
+		self.assertLess(time.perf_counter() - start, 1)
+		self.assertEqual([name for name, _ in woken], ['getPosition', 'flyTo', 'takePicture', 'hover'])
+		self.assertEqual([at for _, at in woken], [0.5, 3, 5, 60])
+
+	def test_sleep_on_the_loop_moves_the_time(self):
+		clock = VirtualClock()
+		loop = VirtualTimeLoop(clock)
+		try:
+			clock.sleep(2)		# e.g. the wait of set_home, nothing else runs
+			loop.run_until_complete(asyncio.sleep(1))
+		finally:
+			loop.close()
+		self.assertEqual(clock.now(), 3)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,64 @@
+import threading
+import unittest
+
+from interpreter.context import ExecutionContext, call_api, context_api
+from interpreter.memory import ARType, ActivationRecord, CallStack
+
+
+class ExecutionContextTestCase(unittest.TestCase):
+	def make_context(self):
+		call_stack = CallStack()
+		call_stack.push(ActivationRecord(name='Program', category=ARType.PROGRAM, nesting_level=0))
+		call_stack.push(ActivationRecord(name='patrol', category=ARType.BEHAVIOR, nesting_level=1))
+		call_stack.push(ActivationRecord(name='fly', category=ARType.ACTION, nesting_level=2))
+		goal_reached = {'Tasks': {}, 'Behaviors': {'patrol': {'uav_3': threading.Event()}}}
+		return ExecutionContext(wrapper='wrapper', agent='uav', id=3, call_stack=call_stack, goal_reached=goal_reached)
+
+	def test_replace_returns_a_copy(self):
+		ctx = self.make_context()
+		other = ctx.replace(id=4)
+		self.assertEqual((ctx.id, ctx.vehicle_name), (3, 'uav_3'))
+		self.assertEqual((other.id, other.vehicle_name), (4, 'uav_4'))
+		self.assertIs(other.call_stack, ctx.call_stack)
+
+	def test_goal_caller_and_event(self):
+		ctx = self.make_context()
+		self.assertEqual(ctx.goal_caller(), ('Behaviors', 'patrol'))
+		self.assertIs(ctx.goal_event(), ctx.goal_reached['Behaviors']['patrol']['uav_3'])
+
+	def test_call_api(self):
+		ctx = self.make_context()
+
+		@context_api
+		def new_API(ctx, *swarm_args):
+			return ctx.vehicle_name, swarm_args
+
+		def legacy_API(*swarm_args, **kwargs):
+			return f'{kwargs["agent"]}_{kwargs["id"]}', swarm_args, kwargs['goal_caller'], kwargs['wrapper']
+
+		self.assertEqual(call_api(new_API, [1, 2], ctx), ('uav_3', (1, 2)))
+		self.assertEqual(call_api(legacy_API, [1], ctx), ('uav_3', (1,), ('Behaviors', 'patrol'), 'wrapper'))
+
+	def test_async_api(self):
+		import asyncio
+		import concurrent.futures
+		from interpreter.context import call_api_async
+		ctx = self.make_context()
+
+		@context_api
+		async def wait_API(ctx, *swarm_args):
+			await asyncio.sleep(0)
+			return ctx.vehicle_name, swarm_args
+
+		@context_api
+		def blocking_API(ctx, *swarm_args):
+			return threading.current_thread() is threading.main_thread()
+
+		self.assertEqual(call_api(wait_API, [1], ctx), ('uav_3', (1,)))
+		with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+			self.assertEqual(asyncio.run(call_api_async(wait_API, [2], ctx, executor)), ('uav_3', (2,)))
+			self.assertFalse(asyncio.run(call_api_async(blocking_API, [], ctx, executor)))
+
+
+if __name__ == '__main__':
+	unittest.main()
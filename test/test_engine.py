@@ -0,0 +1,357 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import re
+import socket
+import threading
+import time
+import unittest
+import unittest.mock
+
+from base.error import ErrorCode, InterpreterError
+from interpreter.asyncInterpreter import AsyncInterpreter
+from interpreter.codegen import GeneratedInterpreter
+from interpreter.compiler import CompiledInterpreter
+from interpreter.interpreter import Interpreter
+from interpreter.knowledge import KnowledgeStore
+from interpreter.processInterpreter import ProcessInterpreter, run_node
+from interpreter.transport import TcpTransport
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+
+ENGINES = (Interpreter, CompiledInterpreter, GeneratedInterpreter, AsyncInterpreter)
+
+
+def swarm(actions, init=(), routines=(), goal=('$ True',), behaviors=(), agents=1):
+	"""Source of a program of `agents` drones able to run `actions`, whose Task mission puts `init`
+	and runs the parallel `routines` until `goal`. Every argument but agents holds source lines."""
+	abilities = ', '.join(re.findall(r'Action (\w+)\(', '\n'.join(actions)))
+	routine_blocks = '\n\t}\n\t||\n\t{\n'.join('\n'.join(routine) for routine in routines)
+	return '\n'.join([
+		'import testUav', '', *actions, '', f'Agent drone {{ {abilities}; }}', '', *behaviors, '',
+		'Task mission({agt[st~ed]}){', '\t@init{', *init, '\t}', '\t@goal{', *goal, '\t}',
+		'\t@routine{', routine_blocks, '\t}', '}', '',
+		'Main {', f'\tAgent drone {agents};', f'\tmission({{drone[0~{agents}]}});', '}', '',
+	])
+
+
+def each(*calls):
+	"""A routine running the calls for every agent of the Task."""
+	return ['\t\teach agt[st~ed] {', *calls, '\t\t}']
+
+
+def behavior(name, *routines):
+	"""Lines of a Behavior name(h) running the parallel `routines` until h rounds have passed."""
+	routine_blocks = '\n\t}\n\t||\n\t{\n'.join('\n'.join([*routine, '\t\tstep = step + 1;']) for routine in routines)
+	return [
+		f'Behavior {name}(h){{', '\t@init{', '\t\tstep = 0;', '\t}', '\t@goal{', '\t\t$ step >= h', '\t}',
+		'\t@routine{', routine_blocks, '\t}', '}',
+	]
+
+
+def analyze(text):
+	tree = Parser(Lexer(text)).parse()
+	SemanticAnalyzer(log_or_not=False).visit(tree)
+	return tree
+
+
+def ready(interpreter):
+	interpreter.wrapper.set_home = lambda agents_list: None		# skip the 2 s wait for the simulator
+	return interpreter
+
+
+def run_in_thread(interpreter, timeout):
+	"""(whether interpret() returned within timeout seconds, the exception it raised), its output dropped."""
+	raised = []
+
+	def interpret():
+		try:
+			with contextlib.redirect_stdout(io.StringIO()):
+				interpreter.interpret()
+		except Exception as e:
+			raised.append(e)
+
+	thread = threading.Thread(target=interpret, daemon=True)
+	thread.start()
+	thread.join(timeout)
+	return not thread.is_alive(), raised[0] if raised else None
+
+
+def logged(interpreter):
+	"""The arguments of the log_API calls of a run."""
+	output = io.StringIO()
+	with contextlib.redirect_stdout(output):
+		interpreter.interpret()
+	return [line.split(', ', 1)[1] for line in output.getvalue().splitlines() if 'log_API' in line]
+
+
+FAIL_ACTIONS = ['Action fail_Action(){', '\tput 1 to A;', '\tx = 1 / 0;', '}']
+
+
+def fail_swarm(agents):
+	"""Every agent raises in two routines, while its Compound holds the write lock of A."""
+	return swarm(
+		FAIL_ACTIONS, init=['\t\tput 0 to A;'], routines=[each('\t\t\tfail_Behavior(1000);')],
+		behaviors=behavior('fail_Behavior', ['\t\tfail_Action();'], ['\t\tfail_Action();']), agents=agents,
+	)
+
+
+COUNT_ACTIONS = ['Action count_Action(){', '\tmodify cnt from findCount to cnt + 1;', '\tput cnt to found[];', '}']
+
+
+class EngineTestCase(unittest.TestCase):
+	"""Every engine prints the same lines as the tree-walking Interpreter."""
+
+	def analyze(self, file_name):
+		with open(os.path.join(os.path.dirname(__file__), file_name), 'r', encoding='utf-8') as f:
+			return analyze(f.read())
+
+	def run_engine(self, interpreter_class, file_name):
+		output = io.StringIO()
+		with contextlib.redirect_stdout(output):
+			interpreter_class(self.analyze(file_name)).interpret()
+		return sorted(output.getvalue().splitlines())
+
+	def test_compiled(self):
+		expected = self.run_engine(Interpreter, 'engine_example.swarm')
+		self.assertIn('search_drone_1 :-> log_API, (2, 15)', expected)
+		self.assertEqual(self.run_engine(CompiledInterpreter, 'engine_example.swarm'), expected)
+
+	def test_codegen(self):
+		expected = self.run_engine(Interpreter, 'engine_example.swarm')
+		self.assertEqual(self.run_engine(GeneratedInterpreter, 'engine_example.swarm'), expected)
+
+	def test_async(self):
+		expected = self.run_engine(Interpreter, 'engine_example.swarm')
+		self.assertEqual(self.run_engine(AsyncInterpreter, 'engine_example.swarm'), expected)
+
+	def test_async_virtual_time(self):
+		"""On a virtual clock the sleeps of the platform and the libraries take no real time."""
+		expected = self.run_engine(Interpreter, 'engine_example.swarm')
+		interpreter = AsyncInterpreter(self.analyze('engine_example.swarm'), virtual_time=True)
+		output = io.StringIO()
+		start = time.perf_counter()
+		with contextlib.redirect_stdout(output):
+			interpreter.interpret()
+		self.assertLess(time.perf_counter() - start, 1.5)
+		self.assertGreaterEqual(interpreter.clock.now(), 2)		# the wait of set_home
+		self.assertEqual(sorted(output.getvalue().splitlines()), expected)
+
+	def test_knowledge_queue_waits(self):
+		"""The consumer routine waits in get until the producer routine has put an item."""
+		tree = analyze(swarm(
+			['Action idle_Action(){', '\tx = 0;', '}'], init=['\t\tput 0 to last;'],
+			routines=[['\t\tget item from jobs[];', '\t\tput item to last;'], ['\t\tput 7 to jobs[];']],
+			goal=['\t\tget v from last;', '\t\t$ v == 7'],
+		))
+		for engine in (Interpreter, AsyncInterpreter):
+			with self.subTest(engine=engine.__name__):
+				finished, error = run_in_thread(ready(engine(tree, workers=1)), 10)
+				self.assertTrue(finished)
+				self.assertIsNone(error)
+
+	def test_modify_is_atomic(self):
+		"""Every increment of a shared counter is kept, and one agent wins the compare-and-set, on every engine."""
+		tree = analyze(swarm(
+			[
+				'Action count_Action(){', '\tmodify cnt from findCount to cnt + 1;',
+				'\tmodify w from winner to cnt when w < 0;',
+				'\tif(w < 0){', '\t\ttestUav.log_API(w);', '\t}', '\tif(cnt == 99){', '\t\ttestUav.log_API(cnt);', '\t}',
+				'}',
+			],
+			init=['\t\tput 0 to findCount;', '\t\tput -1 to winner;'], routines=[each('\t\t\tcount_Behavior(10);')],
+			behaviors=behavior('count_Behavior', ['\t\tcount_Action();']), agents=10,
+		))
+		self.assertFalse(tree.action_list.children[0].compound_statement.knowledge)		# no Compound lock
+		for engine in ENGINES:
+			with self.subTest(engine=engine.__name__):
+				self.assertEqual(sorted(logged(ready(engine(tree, workers=4)))), ['(-1,)', '(99,)'])
+
+	def test_error_releases_knowledge_locks(self):
+		"""A Compound raising while it holds a put lock releases it, the other routine fails instead of waiting."""
+		tree = analyze(fail_swarm(1))
+		for engine in ENGINES:
+			with self.subTest(engine=engine.__name__):
+				interpreter = ready(engine(tree, workers=4))
+				finished, error = run_in_thread(interpreter, 20)
+				self.assertTrue(finished)
+				self.assertIsInstance(error, ZeroDivisionError)
+				self.assertFalse(interpreter.knowledge.locks['A'].locked())
+
+	def test_error_in_put_compound_reaches_join(self):
+		"""The error of one agent holding a put lock is raised by interpret(), while the other agents wait for the lock."""
+		interpreter = ready(Interpreter(analyze(fail_swarm(4)), workers=4))
+		finished, error = run_in_thread(interpreter, 20)
+		self.assertTrue(finished)
+		self.assertIsInstance(error, ZeroDivisionError)
+		self.assertFalse(interpreter.knowledge.locks['A'].locked())
+
+	def test_modify_follows_the_lock_order(self):
+		"""Compounds putting one Knowledge and modifying the other, in both orders, do not deadlock."""
+		tree = analyze(swarm(
+			[
+				'Action ab_Action(){', '\tput 1 to A;', '\tlength = testUav.plan_API(20);',
+				'\tmodify b from B to b + 1;', '}',
+				'Action ba_Action(){', '\tput 1 to B;', '\tlength = testUav.plan_API(20);',
+				'\tmodify a from A to a + 1;', '}',
+			],
+			init=['\t\tput 0 to A;', '\t\tput 0 to B;'], routines=[each('\t\t\tswap_Behavior(20);')],
+			behaviors=behavior('swap_Behavior', ['\t\tab_Action();'], ['\t\tba_Action();']), agents=4,
+		))
+		compound = tree.action_list.children[0].compound_statement
+		self.assertEqual(compound.knowledge, ('A', 'B'))		# the modified B is locked in order with A
+		for engine in ENGINES:
+			with self.subTest(engine=engine.__name__):
+				finished, error = run_in_thread(ready(engine(tree, workers=4)), 30)
+				self.assertTrue(finished)
+				self.assertIsNone(error)
+
+	def test_locked_modify_calls_library(self):
+		"""A modify calling a library, in a Compound holding its Knowledge, does not wait for the Compound's lock."""
+		tree = analyze(swarm(
+			[
+				'Action count_Action(){', '\tget a from findCount;',
+				'\tmodify c from findCount to c + testUav.getState_API() + 1;', '}',
+			],
+			init=['\t\tput 0 to findCount;'], routines=[each('\t\t\tcount_Behavior(5);')],
+			behaviors=behavior('count_Behavior', ['\t\tcount_Action();']), agents=4,
+		))
+		self.assertTrue(tree.action_list.children[0].compound_statement.children[1].locked)
+		for engine in ENGINES:
+			with self.subTest(engine=engine.__name__):
+				interpreter = ready(engine(tree, workers=4))
+				finished, error = run_in_thread(interpreter, 10)
+				self.assertTrue(finished)
+				self.assertIsNone(error)
+				self.assertEqual(interpreter.knowledge.get('findCount'), 20)
+
+	def test_nested_modify_is_locked(self):
+		"""The modifies in the if bodies of a Compound holding Knowledge are covered by its locks."""
+		tree = analyze(swarm(
+			[
+				'Action count_Action(){', '\tget a from findCount;', '\tput a to findCount;',
+				'\tif(1 == 1){', '\t\tmodify c from findCount to c + 1;', '\t\tmodify b from B to b + 1;', '\t}', '}',
+				'Action read_Action(){', '\tget a from findCount;', '\tif(a >= 0){', '\t\tget b from B;', '\t}', '}',
+			],
+			init=['\t\tput 0 to findCount;', '\t\tput 0 to B;'], routines=[each('\t\t\tcount_Behavior(5);')],
+			behaviors=behavior('count_Behavior', ['\t\tcount_Action();', '\t\tread_Action();']), agents=4,
+		))
+		compound = tree.action_list.children[0].compound_statement
+		self.assertEqual(compound.knowledge, ('B', 'findCount'))
+		self.assertEqual(compound.children[2].true_compound.knowledge, ())
+		# a Compound only reading takes a snapshot, the Compound of its if body its own
+		compound = tree.action_list.children[1].compound_statement
+		self.assertEqual(compound.knowledge, ('findCount',))
+		self.assertEqual(compound.children[1].true_compound.knowledge, ('B',))
+		for engine in ENGINES:
+			with self.subTest(engine=engine.__name__):
+				interpreter = ready(engine(tree, workers=4))
+				finished, error = run_in_thread(interpreter, 10)
+				self.assertTrue(finished)
+				self.assertIsNone(error)
+				self.assertEqual(interpreter.knowledge.get('findCount'), 20)
+				self.assertEqual(interpreter.knowledge.get('B'), 20)
+
+	def test_queue_batches_and_timeouts(self):
+		"""A batch get takes every item, and a get gives up on an empty KnowledgeQueue, on every engine."""
+		tree = analyze(swarm(
+			[
+				'Action drain_Action(){', '\tget each jobs from found[] else 0;', '\ttestUav.log_API(jobs);',
+				'\tput each jobs to done[4];', '\tget each(1) first from done[];', '\ttestUav.log_API(first);',
+				'\tget late from found[] within 0.05 else -1;', '\ttestUav.log_API(late);', '}',
+			],
+			init=['\t\tput 7 to found[];', '\t\tput 8 to found[];'], routines=[each('\t\t\tdrain_Action();')],
+		))
+		for engine in ENGINES:
+			with self.subTest(engine=engine.__name__):
+				interpreter = ready(engine(tree, workers=4))
+				self.assertEqual(logged(interpreter), ['([7, 8],)', '([7],)', '(-1,)'])
+				self.assertEqual(interpreter.knowledge.queues['done'].stats()['depth'], 1)
+
+	def test_watch_wakes_on_writes(self):
+		"""A routine sleeps until a Knowledge holds a condition, the other one counting it up, on every engine."""
+		tree = analyze(swarm(
+			['Action idle_Action(){', '}'],
+			init=['\t\tput 0 to ready;', '\t\tput 0 to result;', '\t\tput 1 to idle;'],
+			routines=[
+				[
+					'\t\twatch w from idle within 0.05;', '\t\twatch v from ready until v >= 3;',
+					'\t\tmodify r from result to v + w - 1;',
+				],
+				['\t\tmodify n from ready to n + 1;'],
+			],
+			goal=['\t\tget r from result;', '\t\t$ r >= 3'],
+		))
+		for engine in ENGINES:
+			with self.subTest(engine=engine.__name__):
+				interpreter = ready(engine(tree, workers=1))
+				finished, error = run_in_thread(interpreter, 10)
+				self.assertTrue(finished)
+				self.assertIsNone(error)
+				self.assertGreaterEqual(interpreter.knowledge.get('result'), 3)
+				self.assertEqual(interpreter.knowledge.watchers, 0)
+
+	def test_async_watch_after_locked_snapshot(self):
+		"""A Compound only getting Knowledge while a writer holds it reads it under the locks, then watches without them."""
+		tree = analyze(swarm(
+			['Action idle_Action(){', '}'], init=['\t\tput 0 to gate;', '\t\tput 0 to ready;'],
+			routines=[
+				['\t\tget g from gate;', '\t\twatch v from ready until v >= 1;'],
+				['\t\tput 1 to gate;', '\t\tmodify n from ready to n + 1;'],
+			],
+			goal=['\t\tget r from ready;', '\t\t$ r >= 1'],
+		))
+		try_snapshot = KnowledgeStore.try_snapshot
+
+		def held(store, names):
+			return None if 'gate' in names else try_snapshot(store, names)		# as if a suspended writer held gate
+
+		interpreter = ready(AsyncInterpreter(tree, workers=1))
+		with unittest.mock.patch.object(KnowledgeStore, 'try_snapshot', held):
+			finished, error = run_in_thread(interpreter, 10)
+		self.assertTrue(finished)
+		self.assertIsNone(error)
+		self.assertFalse(interpreter.knowledge.locks['gate'].locked())
+
+	def test_process_engine_shares_knowledge(self):
+		"""Agents in worker processes count into the Knowledge and a KnowledgeQueue of the coordinator."""
+		text = swarm(
+			COUNT_ACTIONS, init=['\t\tput 0 to findCount;'], routines=[each('\t\t\tcount_Behavior(5);')],
+			behaviors=behavior('count_Behavior', ['\t\tcount_Action();']), agents=8,
+		)
+		interpreter = ready(ProcessInterpreter(analyze(text), processes=2))
+		interpreter.interpret()
+		self.assertEqual(interpreter.knowledge.get('findCount'), 40)
+		self.assertEqual(sorted(interpreter.knowledge.queues['found'].items), list(range(40)))
+
+		# an error of an agent is raised by the coordinator
+		tree = analyze(text.replace('modify cnt from', 'get cnt from missing;\n\tmodify cnt from', 1))
+		interpreter = ready(ProcessInterpreter(tree, processes=2))
+		with self.assertRaises(InterpreterError) as cm:
+			interpreter.interpret()
+		self.assertEqual(cm.exception.error_code, ErrorCode.ID_NOT_FOUND)
+		self.assertEqual(cm.exception.token.value, 'missing')
+
+		# a node joined over TCP shares the agents with a node of the coordinator
+		with socket.socket() as s:
+			s.bind(('127.0.0.1', 0))
+			port = s.getsockname()[1]
+		transport = TcpTransport(port=port)
+		interpreter = ready(ProcessInterpreter(analyze(text), processes=1, transport=transport, remote_nodes=1))
+		node = multiprocessing.get_context('forkserver').Process(
+			target=run_node, args=(('127.0.0.1', port), transport, 'remote')
+		)
+		node.start()
+		interpreter.interpret()
+		node.join()
+		self.assertEqual(interpreter.knowledge.get('findCount'), 40)
+		stats = {node['name']: node for node in interpreter.node_stats()}
+		self.assertEqual(sorted(stats), ['local-0', 'remote'])
+		self.assertEqual(stats['remote']['agents'] + stats['local-0']['agents'], 8)
+		self.assertGreater(stats['remote']['knowledge_calls'], 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,223 @@
+import contextlib
+import io
+import unittest
+
+from interpreter.goalWatch import GoalWatch
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanticAnalyzer.semanticAnalyzer import GoalDependencies, SemanticAnalyzer
+
+SWARM = """
+import testUav
+
+Action count_Action(){
+	get cnt from findCount;
+	put cnt + 1 to findCount;
+}
+
+Action getFindCount_Action(){
+	get cnt from findCount;
+	return cnt;
+}
+
+Agent drone {
+	count_Action, getFindCount_Action;
+}
+
+Behavior patrol_Behavior(rounds){
+	@init{
+		step = 0;
+		idle = 0;
+	}
+	@goal{
+		find_cnt = getFindCount_Action();
+		$ step >= rounds
+	}
+	@routine{
+		count_Action();
+		step = step + 1;
+	}
+	||
+	{
+		idle = idle + 1;
+	}
+	||
+	{
+		idle = idle - 1;
+	}
+}
+
+Task mission({agt[st~ed]}){
+	@init{
+		put 0 to findCount;
+	}
+	@goal{
+		get cnt from findCount;
+		$ cnt >= 10
+	}
+	@routine{
+		each agt[st~ed] {
+			patrol_Behavior(5);
+		}
+	}
+}
+
+Main {
+	Agent drone 2;
+	mission({drone[0~2]});
+}
+"""
+
+
+class GoalWatchTestCase(unittest.TestCase):
+	def setUp(self):
+		self.tree = Parser(Lexer(SWARM)).parse()
+		SemanticAnalyzer(log_or_not=False).visit(self.tree)
+
+	def test_dependencies(self):
+		behavior = self.tree.behavior_list.children[0]
+		dependencies = behavior.goal_block.dependencies
+		# find_cnt is computed by the goal, idle is not read by it
+		self.assertEqual(dependencies.slots, tuple(sorted(behavior.layout[name] for name in ('rounds', 'step'))))
+		self.assertEqual(dependencies.knowledge, ('findCount',))
+		task = self.tree.task_list.children[0]
+		self.assertEqual(task.goal_block.dependencies.slots, ())
+		self.assertEqual(task.goal_block.dependencies.knowledge, ('findCount',))
+
+	def test_due_when_an_input_changes(self):
+		from interpreter.context import ExecutionContext
+		from interpreter.memory import ARType, ActivationRecord, CallStack
+		call_stack = CallStack()
+		program = ActivationRecord(name='Program', category=ARType.PROGRAM, nesting_level=0)
+		behavior = ActivationRecord(name='patrol', category=ARType.BEHAVIOR, nesting_level=1, layout={'step': 0, 'idle': 1})
+		call_stack.push(program)
+		call_stack.push(behavior)
+		ctx = ExecutionContext(call_stack=call_stack)
+		goal_watch = GoalWatch(GoalDependencies(slots=(0,), knowledge=('found',)), interval=60)
+
+		self.assertTrue(goal_watch.due(ctx))		# never evaluated
+		self.assertFalse(goal_watch.due(ctx))
+		behavior['idle'] = 1
+		self.assertFalse(goal_watch.due(ctx))
+		behavior['step'] = 1
+		self.assertTrue(goal_watch.due(ctx))
+		program.members['found'] = 'target'
+		self.assertTrue(goal_watch.due(ctx))
+		self.assertFalse(goal_watch.due(ctx))
+		goal_watch.interval = 0
+		self.assertTrue(goal_watch.due(ctx))
+
+	def test_fewer_goal_evaluations(self):
+		from interpreter.interpreter import Interpreter
+
+		class CountingInterpreter(Interpreter):
+			def visit_GoalBlock(self, node, ctx):
+				self.evaluations += 1
+				return super().visit_GoalBlock(node, ctx)
+
+		def evaluations(goal_interval):
+			interpreter = CountingInterpreter(self.tree, workers=1, goal_interval=goal_interval)
+			interpreter.evaluations = 0
+			interpreter.wrapper.set_home = lambda agents_list: None
+			with contextlib.redirect_stdout(io.StringIO()):
+				interpreter.interpret()
+			return interpreter.evaluations
+
+		every_round = evaluations(0)
+		on_change = evaluations(60)
+		# a drone evaluates its goal at most once per change of step or of findCount, put 10 times
+		self.assertLessEqual(on_change, 2 * (1 + 5 + 10) + 1)
+		self.assertLess(on_change, every_round)
+
+
+	def test_period_limits_evaluations(self):
+		from interpreter.context import ExecutionContext
+		from interpreter.memory import ARType, ActivationRecord, CallStack
+		call_stack = CallStack()
+		call_stack.push(ActivationRecord(name='Program', category=ARType.PROGRAM, nesting_level=0))
+		behavior = ActivationRecord(name='patrol', category=ARType.BEHAVIOR, nesting_level=1, layout={'step': 0})
+		call_stack.push(behavior)
+		ctx = ExecutionContext(call_stack=call_stack)
+		goal_watch = GoalWatch(GoalDependencies(slots=(0,)), interval=0, period=60)
+
+		self.assertTrue(goal_watch.due(ctx))
+		behavior['step'] = 1
+		self.assertFalse(goal_watch.due(ctx))		# changed, but evaluated less than a period ago
+		goal_watch.evaluated_at -= 60
+		self.assertTrue(goal_watch.due(ctx))
+
+	def test_empty_routine_waits_for_the_goal_period(self):
+		import time
+		from interpreter.asyncInterpreter import AsyncInterpreter
+		from interpreter.codegen import GeneratedInterpreter
+		from interpreter.compiler import CompiledInterpreter
+		from interpreter.interpreter import Interpreter
+		text = """
+Action tick_Action(){
+	get n from ticks;
+	put n + 1 to ticks;
+	return n;
+}
+
+Agent drone {
+	tick_Action;
+}
+
+Behavior wait_Behavior(){
+	@init{
+		n = 0;
+	}
+	@goal(0.02){
+		n = tick_Action();
+		$ n >= 5
+	}
+	@routine{
+	}
+}
+
+Task mission({agt[st~ed]}){
+	@init{
+		put 0 to ticks;
+	}
+	@goal{
+		$ True
+	}
+	@routine{
+		each agt[st~ed] {
+			wait_Behavior();
+		}
+	}
+}
+
+Main {
+	Agent drone 1;
+	mission({drone[0~1]});
+}
+"""
+		tree = Parser(Lexer(text)).parse()
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		for engine in (Interpreter, CompiledInterpreter, GeneratedInterpreter, AsyncInterpreter):
+			interpreter = engine(tree, workers=1)
+			interpreter.wrapper.set_home = lambda agents_list: None
+			start = time.monotonic()
+			interpreter.interpret()
+			elapsed = time.monotonic() - start
+			self.assertGreaterEqual(elapsed, 5 * 0.02, engine.__name__)		# 6 evaluations, a period apart
+			self.assertLess(elapsed, 2, engine.__name__)
+
+		class CountingInterpreter(Interpreter):
+			rounds = 0
+
+			def visit_Compound(self, node, ctx):
+				if not node.children:
+					self.rounds += 1
+				super().visit_Compound(node, ctx)
+
+		interpreter = CountingInterpreter(tree, workers=1)
+		interpreter.wrapper.set_home = lambda agents_list: None
+		interpreter.interpret()
+		self.assertLess(interpreter.rounds, 10)		# about one round per goal check, no busy loop
+
+
+if __name__ == '__main__':
+	unittest.main()
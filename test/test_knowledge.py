@@ -0,0 +1,135 @@
+import threading
+import unittest
+
+from interpreter.knowledge import ItemQueue, KnowledgeStore, ReadWriteLock
+
+
+class KnowledgeStoreTestCase(unittest.TestCase):
+	def setUp(self):
+		self.store = KnowledgeStore(('alpha', 'beta'))
+		self.store.put('alpha', 1)
+		self.store.put('beta', 2)
+
+	def test_readers_share_the_lock(self):
+		lock = ReadWriteLock()
+		lock.acquire_read()
+		reader = threading.Thread(target=lock.acquire_read)
+		reader.start()
+		reader.join(5)
+		self.assertFalse(reader.is_alive())
+		self.assertEqual(lock.readers, 2)
+
+		written = threading.Event()
+
+		def write():
+			lock.acquire_write()
+			written.set()
+			lock.release_write()
+		writer = threading.Thread(target=write)
+		writer.start()
+		self.assertFalse(written.wait(0.1))		# until both readers are gone
+		lock.release_read()
+		lock.release_read()
+		self.assertTrue(written.wait(5))
+		writer.join()
+
+	def test_snapshot_while_written(self):
+		names = ('alpha', 'beta')
+		self.assertEqual(self.store.try_snapshot(names), {'alpha': 1, 'beta': 2})
+		self.store.acquire(names, ('beta',))
+		self.store.put('beta', 3)
+		self.assertIsNone(self.store.try_snapshot(names))
+		self.assertEqual(self.store.try_snapshot(('alpha',)), {'alpha': 1})
+
+		snapshots = []
+		reader = threading.Thread(target=lambda: snapshots.append(self.store.snapshot(names)))
+		reader.start()
+		reader.join(0.1)
+		self.assertTrue(reader.is_alive())		# waits for the writer
+		self.store.release(names, ('beta',))
+		reader.join(5)
+		self.assertEqual(snapshots, [{'alpha': 1, 'beta': 3}])
+
+	def test_snapshots_are_consistent(self):
+		names = ('alpha', 'beta')
+		self.store.put('beta', 1)
+		stop = threading.Event()
+
+		def write():
+			while not stop.is_set():
+				self.store.acquire(names, names)
+				value = self.store.get('alpha') + 1
+				self.store.put('alpha', value)
+				self.store.put('beta', value)
+				self.store.release(names, names)
+		writer = threading.Thread(target=write)
+		writer.start()
+		try:
+			for _ in range(2000):
+				snapshot = self.store.snapshot(names)
+				self.assertEqual(snapshot['alpha'], snapshot['beta'])
+		finally:
+			stop.set()
+			writer.join()
+
+	def test_watch_sleeps_until_written(self):
+		self.assertEqual(list(self.store.watch('alpha', timeout=0.05)), [1])
+		self.assertEqual(list(self.store.watch('alpha', timeout=0.05, changed=True)), [])
+
+		seen = []
+
+		def watch():
+			for value in self.store.watch('alpha', timeout=5):
+				seen.append(value)
+				if value >= 3:
+					break
+		watcher = threading.Thread(target=watch)
+		watcher.start()
+		for value in (2, 3):
+			while len(seen) < value - 1 or not self.store.watchers:		# the watcher sleeps
+				watcher.join(0.01)
+			self.store.acquire(('alpha',), ('alpha',))
+			self.store.put('alpha', value)
+			self.store.release(('alpha',), ('alpha',))
+		watcher.join(5)
+		self.assertEqual(seen, [1, 2, 3])
+		self.assertEqual(self.store.watchers, 0)
+
+
+class ItemQueueTestCase(unittest.TestCase):
+	def test_batches_and_timeouts(self):
+		queue = ItemQueue()
+		self.assertEqual(queue.get(timeout=0), [])
+		self.assertEqual(queue.get(timeout=0.05), [])
+		queue.put([1, 2, 3, 4])
+		self.assertEqual(queue.get(2), [1, 2])
+		self.assertEqual(queue.get(0), [3, 4])
+
+		got = []
+		consumer = threading.Thread(target=lambda: got.extend(queue.get(timeout=5)))
+		consumer.start()
+		queue.put([5])
+		consumer.join(5)
+		self.assertEqual(got, [5])
+		stats = queue.stats()
+		self.assertEqual((stats['depth'], stats['max_depth'], stats['put'], stats['got']), (0, 4, 5, 5))
+		self.assertGreater(stats['get_wait'], 0)
+
+	def test_capacity_holds_producers_back(self):
+		queue = ItemQueue(2)
+		self.assertEqual(queue.try_put([1, 2, 3]), 2)
+		self.assertTrue(queue.full())
+		producer = threading.Thread(target=queue.put, args=([3, 4],))
+		producer.start()
+		producer.join(0.1)
+		self.assertTrue(producer.is_alive())		# until a consumer makes room
+		self.assertEqual(queue.get(0), [1, 2])
+		self.assertEqual(queue.get(timeout=5) + queue.get(timeout=5), [3, 4])
+		producer.join(5)
+		self.assertFalse(producer.is_alive())
+		self.assertEqual(queue.stats()['max_depth'], 2)
+		self.assertGreater(queue.stats()['put_wait'], 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+
+
+class LexerTestCase(unittest.TestCase):
+	def makeLexer(self, text):
+		from lexer.lexer import Lexer
+		lexer = Lexer(text)
+		return lexer
+
+	def tokens(self, text):
+		from lexer.token import TokenType
+		lexer = self.makeLexer(text)
+		tokens = []
+		token = lexer.get_next_token()
+		while token.category != TokenType.EOF:
+			tokens.append(token)
+			token = lexer.get_next_token()
+		return tokens
+
+	def test_lexer_positions(self):
+		from lexer.token import TokenType
+		tokens = self.tokens('Action a(){\n\tx = 3.5;\n}')
+		self.assertEqual(
+			[(t.category, t.value, t.lineno, t.column) for t in tokens],
+			[
+				(TokenType.ACTION, 'ACTION', 1, 1),
+				(TokenType.ID, 'a', 1, 8),
+				(TokenType.L_PAREN, '(', 1, 9),
+				(TokenType.R_PAREN, ')', 1, 10),
+				(TokenType.L_BRACE, '{', 1, 11),
+				(TokenType.ID, 'x', 2, 2),
+				(TokenType.ASSIGN, '=', 2, 4),
+				(TokenType.FLOAT, 3.5, 2, 6),
+				(TokenType.SEMI, ';', 2, 9),
+				(TokenType.R_BRACE, '}', 3, 1),
+			]
+		)
+
+	def test_lexer_double_character_symbols(self):
+		from lexer.token import TokenType
+		tokens = self.tokens('a<=b || c!=d')
+		self.assertEqual(
+			[t.category for t in tokens],
+			[TokenType.ID, TokenType.LESS_EQUAL, TokenType.ID, TokenType.PARALLEL,
+			 TokenType.ID, TokenType.NOT_EQUAL, TokenType.ID]
+		)
+
+	def test_lexer_decorator(self):
+		from lexer.token import TokenType
+		token = self.makeLexer('  @goal').get_next_token()
+		self.assertEqual((token.category, token.value, token.column), (TokenType.GOAL, 'GOAL', 4))
+
+	def test_lexer_boolean(self):
+		tokens = self.tokens('True False')
+		self.assertEqual([t.value for t in tokens], [True, False])
+
+	def test_lexer_string_escapes(self):
+		tokens = self.tokens('"a\\nb\\"c" x')
+		self.assertEqual(tokens[0].value, 'a\nb"c')
+		self.assertEqual((tokens[1].lineno, tokens[1].column), (1, 11))
+
+	def test_lexer_comment_lines(self):
+		tokens = self.tokens('/* one\ntwo */ x\n/*/ y')
+		self.assertEqual([(t.value, t.lineno, t.column) for t in tokens], [('x', 2, 8), ('y', 3, 5)])
+
+	def test_lexer_unterminated_comment(self):
+		from base.error import LexerError
+		lexer = self.makeLexer('x /* never closed')
+		lexer.get_next_token()
+		with self.assertRaises(LexerError):
+			lexer.get_next_token()
+
+	def test_lexer_unknown_character(self):
+		from base.error import LexerError
+		lexer = self.makeLexer('\n  ?')
+		with self.assertRaises(LexerError) as cm:
+			lexer.get_next_token()
+		self.assertIn("'?' line: 2 column: 3", cm.exception.message)
+
+	def test_lexer_identifier_starts_with_letter(self):
+		from base.error import LexerError
+		self.assertEqual([token.value for token in self.tokens('x² é1')], ['x²', 'é1'])
+		lexer = self.makeLexer('a\n ²b')
+		lexer.get_next_token()
+		with self.assertRaises(LexerError) as cm:
+			lexer.get_next_token()
+		self.assertIn("'²' line: 2 column: 2", cm.exception.message)
+
+
+class TokenStreamTestCase(unittest.TestCase):
+	def makeTokenStream(self, text):
+		from lexer.lexer import Lexer
+		from lexer.tokenStream import TokenStream
+		return TokenStream(Lexer(text))
+
+	def test_peek_does_not_consume(self):
+		tokens = self.makeTokenStream('a b c')
+		self.assertEqual(tokens.peek(3).value, 'c')
+		self.assertEqual(tokens.peek().value, 'a')
+		self.assertEqual([tokens.next().value for _ in range(3)], ['a', 'b', 'c'])
+
+	def test_peek_past_eof(self):
+		from lexer.token import TokenType
+		tokens = self.makeTokenStream('a')
+		self.assertEqual(tokens.peek(5).category, TokenType.EOF)
+		self.assertEqual(tokens.next().value, 'a')
+
+	def test_parser_scans_each_character_once(self):
+		import os
+		from lexer.lexer import Lexer
+		from parser.parser import Parser
+
+		class CountingLexer(Lexer):
+			scanned_chars = 0
+
+			def scan(self):
+				pos = self.pos
+				scanned = super().scan()
+				self.scanned_chars += self.pos - pos
+				return scanned
+
+		path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_example.swarm')
+		text = open(path, 'r', encoding='utf-8').read()
+		lexer = CountingLexer(text)
+		Parser(lexer).parse()
+		self.assertEqual(lexer.scanned_chars, len(text))
+
+
+class TokenArrayTestCase(unittest.TestCase):
+	def test_same_tokens_as_lexer(self):
+		from lexer.lexer import Lexer
+		from lexer.tokenArray import TokenArray
+		from lexer.token import TokenType
+		text = 'Action a(x){\n\tput "s\\t" to k[];\n\t@init 1.5 True;\n}'
+		lexer = Lexer(text)
+		tokens = TokenArray(Lexer(text))
+		expected = lexer.get_next_token()
+		while True:
+			token = tokens.get_next_token()
+			self.assertEqual(
+				(token.category, token.value, token.lineno, token.column),
+				(expected.category, expected.value, expected.lineno, expected.column)
+			)
+			if expected.category == TokenType.EOF:
+				break
+			expected = lexer.get_next_token()
+
+	def test_token_has_no_dict(self):
+		from lexer.token import Token, TokenType
+		token = Token(TokenType.ID, 'a', lineno=1, column=1)
+		self.assertFalse(hasattr(token, '__dict__'))
+
+
+if __name__ == '__main__':
+	unittest.main()
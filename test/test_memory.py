@@ -0,0 +1,123 @@
+import unittest
+
+from interpreter.memory import ARType, ActivationRecord, CallStack
+
+
+class CallStackTestCase(unittest.TestCase):
+	def test_child_caches_its_parents(self):
+		root = CallStack()
+		program = ActivationRecord(name='Program', category=ARType.PROGRAM, nesting_level=0)
+		task = ActivationRecord(name='mission', category=ARType.TASK, nesting_level=1)
+		root.push(program)
+		root.push(task)
+
+		agent = root.create_child('drone:0')
+		routine = agent.create_child('drone_0')
+		self.assertIs(routine.peek(), task)
+		self.assertIs(routine.bottom(), program)
+		self.assertEqual(routine.get_base_level(), 2)
+
+		behavior = ActivationRecord(name='search', category=ARType.BEHAVIOR, nesting_level=2)
+		agent.push(behavior)
+		routine = agent.create_child('drone_0')
+		self.assertIs(routine.peek(), behavior)
+		self.assertIs(routine.bottom(), program)
+		self.assertEqual(routine.get_base_level(), 3)
+
+	def test_finished_children_are_released(self):
+		root = CallStack()
+		root.push(ActivationRecord(name='Program', category=ARType.PROGRAM, nesting_level=0))
+		children = [root.create_child(f'drone:{i}') for i in range(3)]
+		self.assertEqual(root.children, set(children))
+		for child in children:
+			self.assertIs(child.back_to_parent(), root)
+		self.assertEqual(root.children, set())
+
+	def test_interpreter_releases_children(self):
+		import contextlib
+		import io
+		import os
+		from interpreter.interpreter import Interpreter
+		from lexer.lexer import Lexer
+		from parser.parser import Parser
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		with open(os.path.join(os.path.dirname(__file__), 'engine_example.swarm'), 'r', encoding='utf-8') as f:
+			tree = Parser(Lexer(f.read())).parse()
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+
+		created = []
+		create_child = CallStack.create_child
+
+		def recording(self, nm):
+			child = create_child(self, nm)
+			created.append(child)
+			return child
+
+		CallStack.create_child = recording
+		try:
+			with contextlib.redirect_stdout(io.StringIO()):
+				Interpreter(tree).interpret()
+		finally:
+			CallStack.create_child = create_child
+		self.assertTrue(created)
+		self.assertFalse([child for child in created if child in child.parent.children])
+
+	def test_knowledge_locks_are_created_once(self):
+		from lexer.lexer import Lexer
+		from parser.parser import Parser
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		text = """
+Action count_Action(){
+	get b from beta;
+	get a from alpha;
+	put a + b to beta;
+	put a to jobs[];
+}
+
+Agent drone {
+	count_Action;
+}
+
+Task mission({agt[st~ed]}){
+	@init{
+		put 0 to beta;
+		put 1 to alpha;
+	}
+	@goal{
+		$ True
+	}
+	@routine{
+		each agt[st~ed] {
+			count_Action();
+		}
+	}
+}
+
+Main {
+	Agent drone 1;
+	mission({drone[0~1]});
+}
+"""
+		tree = Parser(Lexer(text)).parse()
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		action = tree.action_list.children[0]
+		# sorted lock order, without the KnowledgeQueue
+		self.assertEqual(action.compound_statement.knowledge, ('alpha', 'beta'))
+		self.assertEqual(action.compound_statement.knowledge_puts, {'beta'})
+		self.assertEqual(tree.knowledge, ('alpha', 'beta'))
+
+		program = ActivationRecord(name='Program', category=ARType.PROGRAM, nesting_level=0, knowledge=tree.knowledge)
+		locks = dict(program.knowledge.locks)
+		self.assertEqual(sorted(locks), ['alpha', 'beta'])
+		program.knowledge.acquire(('alpha', 'beta'), {'beta'})
+		program.put_knowledge('beta', 1)
+		program.knowledge.release(('alpha', 'beta'), {'beta'})
+		self.assertEqual(program.knowledge.locks, locks)
+
+	def test_empty_root_has_no_parent(self):
+		with self.assertRaises(Exception):
+			CallStack().peek()
+
+
+if __name__ == '__main__':
+	unittest.main()
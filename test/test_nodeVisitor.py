@@ -0,0 +1,42 @@
+import unittest
+
+from base.ast import AST
+from base.nodeVisitor import NodeVisitor
+
+
+class Leaf(AST):
+	__slots__ = ()
+
+
+class SubLeaf(Leaf):
+	__slots__ = ()
+
+
+class NodeVisitorTestCase(unittest.TestCase):
+	def test_dispatch_by_class_name(self):
+		class Visitor(NodeVisitor):
+			def visit_Leaf(self, node, **kwargs):
+				return 'leaf', kwargs
+
+		visitor = Visitor()
+		self.assertEqual(visitor.visit(Leaf(), id=1), ('leaf', {'id': 1}))
+		self.assertEqual(visitor.visit(Leaf()), ('leaf', {}))
+		with self.assertRaises(Exception):
+			visitor.visit(SubLeaf())
+
+	def test_tables_are_per_visitor_class(self):
+		class Visitor(NodeVisitor):
+			def visit_Leaf(self, node):
+				return 'base'
+
+		class Override(Visitor):
+			def visit_Leaf(self, node):
+				return 'override'
+
+		self.assertEqual(Visitor().visit(Leaf()), 'base')
+		self.assertEqual(Override().visit(Leaf()), 'override')
+		self.assertEqual(Visitor().visit(Leaf()), 'base')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+
+
+class ParserTestCase(unittest.TestCase):
+	def parse(self, text):
+		from lexer.lexer import Lexer
+		from parser.parser import Parser
+		return Parser(Lexer(text)).parse()
+
+	def example(self):
+		import os
+		with open(os.path.join(os.path.dirname(__file__), 'test_example.swarm'), 'r', encoding='utf-8') as f:
+			return f.read()
+
+	def test_nodes_have_no_dict(self):
+		tree = self.parse(self.example())
+		nodes = [tree, tree.main, tree.task_list.children[0], tree.action_list.children[0].compound_statement]
+		for node in nodes:
+			self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+
+	def test_statement_nodes_and_operators(self):
+		import operator
+		from parser.operator import Assign, BinOp, Get, Put
+		tree = self.parse(self.example())
+		actions = {action.name: action.compound_statement.children for action in tree.action_list.children}
+		get_cnt, put_dest, put_cnt = actions['putCargoDest_Action'][:3]
+		self.assertIsInstance(get_cnt, Get)
+		self.assertIsInstance(put_dest, Put)
+		self.assertIsInstance(put_cnt, Put)
+		self.assertIsInstance(put_cnt.value, BinOp)
+		self.assertIs(put_cnt.value.fn, operator.add)
+		self.assertIsInstance(actions['getPosition_Action'][0], Assign)
+
+	def test_variables_get_slots(self):
+		from interpreter.memory import ARType, ActivationRecord
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		tree = self.parse(self.example())
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		action = [action for action in tree.action_list.children if action.name == 'putCargoDest_Action'][0]
+		self.assertEqual(action.layout, {'dest': 0, 'cnt': 1})
+		get_cnt, put_dest, put_cnt = action.compound_statement.children[:3]
+		self.assertEqual(get_cnt.var.slot, 1)
+		self.assertEqual(put_dest.value.slot, 0)
+		self.assertEqual(put_cnt.value.left.slot, 1)
+
+		ar = ActivationRecord(name=action.name, category=ARType.ACTION, nesting_level=2, layout=action.layout)
+		ar['cnt'] = 3
+		self.assertEqual(ar.slots, [None, 3])
+		self.assertEqual((ar['cnt'], ar['dest'], 'dest' in ar), (3, None, False))
+
+	def test_goal_period(self):
+		text = self.example()
+		tree = self.parse(text)
+		self.assertTrue(all(behavior.goal_block.period is None for behavior in tree.behavior_list.children))
+		tree = self.parse(text.replace('@goal{}', '@goal(2){}', 1).replace('@goal{', '@goal(0.25){', 1))
+		periods = [node.goal_block.period for node in tree.behavior_list.children + tree.task_list.children]
+		self.assertEqual([period.value for period in periods if period is not None], [0.25, 2])
+
+	def test_modify(self):
+		from parser.operator import Modify
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		text = self.example().replace(
+			'\tput cnt+1 to findCount;\n}', '\tput cnt+1 to findCount;\n\tmodify n from findCount to n + 1 when n > 0;\n}', 1
+		)
+		tree = self.parse(text)
+		action = [action for action in tree.action_list.children if action.name == 'putCargoDest_Action'][0]
+		modify = action.compound_statement.children[-1]
+		self.assertIsInstance(modify, Modify)
+		self.assertEqual((modify.var.value, modify.knowledge.value), ('n', 'findCount'))
+		self.assertIsNotNone(modify.guard)
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		self.assertTrue(modify.locked)		# the Compound gets and puts findCount already
+		self.assertEqual(action.layout['n'], modify.var.slot)
+
+	def test_watch(self):
+		from base.error import ErrorCode, SemanticError
+		from parser.operator import Watch
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		text = self.example().replace(
+			'\tget dest from cargoDest[];', '\twatch n from findCount until n > 2 within 0.5;\n\tget dest from cargoDest[];', 1
+		)
+		tree = self.parse(text)
+		actions = {action.name: action for action in tree.action_list.children}
+		watch = actions['getCargoDest_Action'].compound_statement.children[0]
+		self.assertIsInstance(watch, Watch)
+		self.assertEqual((watch.var.value, watch.knowledge.value, watch.timeout), ('n', 'findCount', 0.5))
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		self.assertEqual(actions['getCargoDest_Action'].layout['n'], watch.var.slot)
+
+		# the writers of findCount would wait for the Compound holding its lock
+		tree = self.parse(self.example().replace('\tput cnt+1 to findCount;\n}', '\tput cnt+1 to findCount;\n\twatch n from findCount;\n}', 1))
+		with self.assertRaises(SemanticError) as cm:
+			SemanticAnalyzer(log_or_not=False).visit(tree)
+		self.assertEqual(cm.exception.error_code, ErrorCode.WATCH_UNDER_LOCK)
+
+		# and so would a watch in an Action called there
+		tree = self.parse(text.replace('\tput c to findCount;\n}', '\tput c to findCount;\n\tn = getCargoDest_Action();\n}', 1))
+		with self.assertRaises(SemanticError) as cm:
+			SemanticAnalyzer(log_or_not=False).visit(tree)
+		self.assertEqual(cm.exception.error_code, ErrorCode.WATCH_UNDER_LOCK)
+
+	def test_queue_batches_and_timeouts(self):
+		from base.error import ErrorCode, SemanticError
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		text = self.example().replace('\tput dest to cargoDest[];', '\tput each dest to cargoDest[8];', 1).replace(
+			'\tget dest from cargoDest[];',
+			'\tget dest from cargoDest[] within 0.5 else -1;\n\tget each(3) batch from cargoDest[] else dest;', 1
+		)
+		tree = self.parse(text)
+		actions = {action.name: action.compound_statement.children for action in tree.action_list.children}
+		put = actions['putCargoDest_Action'][1]
+		get, batch = actions['getCargoDest_Action'][:2]
+		self.assertTrue(put.each)
+		self.assertEqual(put.knowledge.capacity, 8)
+		self.assertEqual((get.limit, get.timeout, get.knowledge.capacity), (None, 0.5, None))
+		self.assertEqual((batch.limit, batch.timeout, batch.default.value), (3, 0, 'dest'))
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		self.assertEqual(tree.queues, {'cargoDest': 8})
+
+		tree = self.parse(text.replace('\tget dest from cargoDest[]', '\tget dest from cargoDest[4]', 1))
+		with self.assertRaises(SemanticError) as cm:
+			SemanticAnalyzer(log_or_not=False).visit(tree)
+		self.assertEqual(cm.exception.error_code, ErrorCode.QUEUE_CAPACITY_MISMATCH)
+
+	def test_duplicate_action_reports_its_name(self):
+		from base.error import ErrorCode, SemanticError
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		text = self.example()
+		action_start = text.index('Action')
+		action_end = text.index('\n}', action_start) + 2
+		tree = self.parse(text[:action_end] + '\n' + text[action_start:])
+		with self.assertRaises(SemanticError) as cm:
+			SemanticAnalyzer(log_or_not=False).visit(tree)
+		self.assertEqual(cm.exception.error_code, ErrorCode.DUPLICATE_ID)
+		self.assertEqual(cm.exception.token.value, tree.action_list.children[0].name)
+
+
+if __name__ == '__main__':
+	unittest.main()
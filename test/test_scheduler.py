@@ -0,0 +1,152 @@
+import queue
+import threading
+import unittest
+
+from interpreter.scheduler import Scheduler
+
+
+class SchedulerTestCase(unittest.TestCase):
+	def setUp(self):
+		self.scheduler = Scheduler(workers=1)
+
+	def tearDown(self):
+		self.scheduler.shutdown()
+
+	def test_groups_take_turns(self):
+		order = []
+		release, finished = threading.Event(), threading.Event()
+		gate = self.scheduler.group()
+		gate.spawn(release.wait)		# keeps the only worker busy while the jobs are queued
+
+		def job(name, n):
+			order.append((name, n))
+			if len(order) == 6:
+				finished.set()
+		groups = {name: self.scheduler.group() for name in 'ab'}
+		for name, group in groups.items():
+			for n in range(3):
+				group.spawn(job, name, n)
+		release.set()
+		self.assertTrue(finished.wait(5))
+		for group in [gate, *groups.values()]:
+			group.join()
+		self.assertEqual(order, [('a', 0), ('b', 0), ('a', 1), ('b', 1), ('a', 2), ('b', 2)])
+
+	def test_first_exception_is_raised_by_join(self):
+		ran = []
+		group = self.scheduler.group()
+
+		def fail(n):
+			ran.append(n)
+			raise ValueError(n)
+		for n in range(3):
+			group.spawn(fail, n)
+		with self.assertRaises(ValueError) as cm:
+			group.join()
+		self.assertIn(cm.exception.args[0], ran)
+		self.assertLess(len(ran), 3)		# the jobs not started when the first one failed are dropped
+
+	def test_blocked_worker_is_replaced(self):
+		items = queue.Queue()
+		group = self.scheduler.group()
+
+		def consumer():
+			with self.scheduler.blocking():
+				self.assertEqual(items.get(timeout=5), 'item')
+
+		group.spawn(consumer)
+		group.spawn(items.put, 'item')
+		group.join()
+
+	def test_join_waits_for_delayed_jobs(self):
+		import time
+		ran = []
+		group = self.scheduler.group()
+		start = time.monotonic()
+		group.spawn_after(0.1, ran.append, 'late')
+		group.spawn_after(0.05, ran.append, 'early')
+		group.spawn(ran.append, 'now')
+		group.join()
+		self.assertGreaterEqual(time.monotonic() - start, 0.1)
+		self.assertEqual(ran, ['now', 'early', 'late'])
+
+	def test_nested_joins_with_one_worker(self):
+		total = []
+
+		def agent(depth):
+			if depth == 0:
+				total.append(1)
+				return
+			group = self.scheduler.group()
+			for _ in range(2):
+				group.spawn(agent, depth - 1)
+			group.join()
+
+		group = self.scheduler.group()
+		group.spawn(agent, 5)
+		group.join()
+		self.assertEqual(len(total), 32)
+
+	def test_interpreter_error_reaches_interpret(self):
+		import contextlib
+		import io
+		from base.error import ErrorCode, InterpreterError
+		from interpreter.interpreter import Interpreter
+		from lexer.lexer import Lexer
+		from parser.parser import Parser
+		from semanticAnalyzer.semanticAnalyzer import SemanticAnalyzer
+		text = """
+Action fly_Action(){
+	x = 1;
+}
+
+Action land_Action(){
+	x = 0;
+}
+
+Agent drone {
+	fly_Action;
+}
+
+Behavior patrol_Behavior(){
+	@init{
+		step = 0;
+	}
+	@goal{
+		$ step >= 3
+	}
+	@routine{
+		land_Action();
+		step = step + 1;
+	}
+}
+
+Task mission({agt[st~ed]}){
+	@init{
+		x = 0;
+	}
+	@goal{
+		$ True
+	}
+	@routine{
+		each agt[st~ed] {
+			patrol_Behavior();
+		}
+	}
+}
+
+Main {
+	Agent drone 2;
+	mission({drone[0~2]});
+}
+"""
+		tree = Parser(Lexer(text)).parse()
+		SemanticAnalyzer(log_or_not=False).visit(tree)
+		with self.assertRaises(InterpreterError) as cm:
+			with contextlib.redirect_stdout(io.StringIO()):
+				Interpreter(tree, workers=2).interpret()
+		self.assertEqual(cm.exception.error_code, ErrorCode.ABILITIY_NOT_DEFINE_IN_AGENT)
+
+
+if __name__ == '__main__':
+	unittest.main()